@@ -0,0 +1,61 @@
+from datetime import date
+
+from odoo import api, SUPERUSER_ID
+
+# Rules whose code changed since 1.0, see hr.salary.rule._reload_swedish_rule_code
+RULES = [
+    'hr_salary_rule_se_overtime',
+    'hr_salary_rule_se_sick_pay',
+    'hr_salary_rule_se_parental_supplement',
+    'hr_salary_rule_se_tax',
+    'hr_salary_rule_se_church_tax',
+]
+
+
+def _backfill_rate_history(cr):
+    """Seed the yearly rate history with the rates 1.0 kept on the municipality
+
+    Rates are looked up per year since 1.1, so without history every
+    payslip would fail to compute until the next update. 1.0 taxed all
+    years with the municipality's rates, and all parishes with their
+    municipality's church rate; they are recorded for each year from the
+    first payslip to the current one, keeping rows that already exist.
+    """
+    cr.execute("SELECT EXTRACT(year FROM min(date_to))::integer FROM hr_payslip")
+    current_year = date.today().year
+    first_year = min(cr.fetchone()[0] or current_year, current_year)
+
+    cr.execute("""
+        UPDATE res_parish p
+           SET church_tax_rate = m.church_tax_rate
+          FROM res_municipality m
+         WHERE m.id = p.municipality_id
+           AND p.church_tax_rate IS NULL
+    """)
+    cr.execute("""
+        INSERT INTO res_municipality_tax_rate (municipality_id, year, tax_table_number, total_tax_rate, church_tax_rate,
+                                               create_uid, write_uid, create_date, write_date)
+        SELECT m.id, y.year, m.tax_table_number, m.total_tax_rate, m.church_tax_rate,
+               %(uid)s, %(uid)s, now() AT TIME ZONE 'UTC', now() AT TIME ZONE 'UTC'
+          FROM res_municipality m
+         CROSS JOIN generate_series(%(first_year)s, %(current_year)s) AS y(year)
+         WHERE m.total_tax_rate > 0
+            ON CONFLICT (municipality_id, year) DO NOTHING
+    """, {'uid': SUPERUSER_ID, 'first_year': first_year, 'current_year': current_year})
+    cr.execute("""
+        INSERT INTO res_parish_church_rate (parish_id, year, church_tax_rate,
+                                            create_uid, write_uid, create_date, write_date)
+        SELECT p.id, y.year, p.church_tax_rate,
+               %(uid)s, %(uid)s, now() AT TIME ZONE 'UTC', now() AT TIME ZONE 'UTC'
+          FROM res_parish p
+          JOIN res_municipality m ON m.id = p.municipality_id
+         CROSS JOIN generate_series(%(first_year)s, %(current_year)s) AS y(year)
+         WHERE m.total_tax_rate > 0
+            ON CONFLICT (parish_id, year) DO NOTHING
+    """, {'uid': SUPERUSER_ID, 'first_year': first_year, 'current_year': current_year})
+
+
+def migrate(cr, version):
+    _backfill_rate_history(cr)
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env['hr.salary.rule']._reload_swedish_rule_code(RULES)
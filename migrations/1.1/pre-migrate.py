@@ -0,0 +1,53 @@
+import logging
+
+from psycopg2.extras import execute_values
+
+from odoo.addons.l10n_se_hr.models.hr_employee import _find_duplicate_personnummer, parse_personnummer_batch
+
+_logger = logging.getLogger(__name__)
+
+
+def _column_exists(cr, table, column):
+    cr.execute("""
+        SELECT 1 FROM information_schema.columns
+         WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s
+    """, (table, column))
+    return bool(cr.fetchone())
+
+
+def _fill_personnummer_key(cr):
+    """Create and fill the normalized key columns new in 1.1
+
+    Filled here rather than by the ORM at the end of the upgrade, so
+    hr.employee.init() sees the keys when it checks for duplicates before
+    creating the unique index.
+    """
+    cr.execute("""
+        ALTER TABLE hr_employee ADD COLUMN IF NOT EXISTS swedish_personnummer_key varchar,
+                                ADD COLUMN IF NOT EXISTS swedish_birth_date date
+    """)
+    cr.execute("SELECT id, swedish_personnummer FROM hr_employee WHERE swedish_personnummer IS NOT NULL")
+    rows = cr.fetchall()
+    results = parse_personnummer_batch([value for _id, value in rows])
+    values = [(employee_id, result.normalized or None, result.birth_date or None) for (employee_id, _value), result in zip(rows, results)]
+    if values:
+        execute_values(cr._obj, """
+            UPDATE hr_employee e
+               SET swedish_personnummer_key = v.key, swedish_birth_date = v.birth_date::date
+              FROM (VALUES %s) AS v(id, key, birth_date)
+             WHERE e.id = v.id
+        """, values, page_size=1000)
+
+
+def migrate(cr, version):
+    # The unique constraint became a partial unique index ignoring archived
+    # employees, created by hr.employee.init()
+    cr.execute("ALTER TABLE hr_employee DROP CONSTRAINT IF EXISTS hr_employee_swedish_personnummer_key_unique")
+    if not _column_exists(cr, 'hr_employee', 'swedish_personnummer_key'):
+        _fill_personnummer_key(cr)
+    for key, company_id, employee_ids in _find_duplicate_personnummer(cr):
+        _logger.warning(
+            "Active employees %s of company %s share the personal identity number %s, "
+            "archive or correct them and upgrade again to enforce uniqueness.",
+            employee_ids, company_id, key,
+        )
@@ -1,12 +1,17 @@
 # -*- coding: utf-8 -*-
+from . import hr_employee
 from . import hr_employee_child
+from . import hr_employee_import_wizard
 from . import hr_employee_inherit
 from . import hr_leave_allocation_inherit
 from . import hr_leave_inherit
 from . import hr_leave_type_inherit
 from . import hr_overtime_swedish
+from . import hr_payroll_rule_stat
 from . import hr_payslip_inherit
 from . import hr_salary_rule_inherit
+from . import hr_vacation_balance
+from . import municipality_reference_data
 from . import municipality_updater
 from . import overtime_reject_wizard
 from . import parental_leave_report
@@ -1,23 +1,224 @@
 from odoo import models, fields, api
-from datetime import datetime
+from collections import namedtuple
+from datetime import date
 from odoo.exceptions import ValidationError
-import requests
-import csv
-from io import StringIO
+import calendar
+import re
+from itertools import islice
 import logging
 
 _logger = logging.getLogger(__name__)
 
+# [century] year month day [separator] serial control digit. Days 61-91 are coordination numbers (samordningsnummer).
+_PERSONNUMMER_RE = re.compile(r'^(\d{2})?(\d{2})(\d{2})(\d{2})([-+]?)(\d{3})(\d)$')
+_LUHN_DOUBLED = (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)
+_DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+PERSONNUMMER_REASONS = {
+    'valid': '',
+    'empty': 'No personal identity number given.',
+    'format': 'The personal identity number must contain 10 or 12 digits.',
+    'date': 'The personal identity number contains an invalid date.',
+    'luhn': 'The personal identity number failed the Luhn algorithm check.',
+}
+
+_TRUE_VALUES = {'1', 'true', 'yes', 'ja', 'x'}
+
+# hr.employee fields an import file may set directly, besides the columns
+# import_swedish_employees resolves itself
+_IMPORT_EXTRA_FIELDS = (
+    'work_email', 'work_phone', 'mobile_phone', 'job_title', 'identification_id',
+    'gender', 'birthday', 'marital', 'emergency_contact', 'emergency_phone',
+)
+
+PersonnummerResult = namedtuple('PersonnummerResult', ['normalized', 'birth_date', 'code', 'reason'])
+
+_INVALID_RESULTS = {code: PersonnummerResult(False, False, code, reason) for code, reason in PERSONNUMMER_REASONS.items()}
+
+
+def parse_personnummer_batch(values, today=None):
+    """Validate and normalize raw personal identity numbers in one pass
+
+    Returns one PersonnummerResult per value: the 12-digit normalized form
+    (YYYYMMDDNNNN, coordination numbers keep their day+60), the birth date,
+    a validity code from PERSONNUMMER_REASONS and its reason. The century of
+    10-digit numbers is the latest one not in the future, one further back
+    with the + separator used from the 100th birthday.
+    """
+    today = today or date.today()
+    today_key = (today.year, today.month, today.day)
+    results = []
+    append = results.append
+    for value in values:
+        if not value:
+            append(_INVALID_RESULTS['empty'])
+            continue
+        match = _PERSONNUMMER_RE.match(''.join(str(value).split()))
+        if not match:
+            append(_INVALID_RESULTS['format'])
+            continue
+        century, yy, mm, dd, separator, serial, control = match.groups()
+        month = int(mm)
+        day = int(dd)
+        birth_day = day - 60 if day > 60 else day
+        if century:
+            year = int(century + yy)
+        else:
+            year = today.year - (today.year - int(yy)) % 100
+            if (year, month, birth_day) > today_key:
+                year -= 100
+            if separator == '+':
+                year -= 100
+        if not 1 <= month <= 12 or not 1 <= birth_day <= (
+                29 if month == 2 and calendar.isleap(year) else _DAYS_IN_MONTH[month - 1]):
+            append(_INVALID_RESULTS['date'])
+            continue
+        digits = yy + mm + dd + serial
+        checksum = sum(_LUHN_DOUBLED[int(digit)] for digit in digits[0::2]) + sum(int(digit) for digit in digits[1::2])
+        if (10 - checksum % 10) % 10 != int(control):
+            append(_INVALID_RESULTS['luhn'])
+            continue
+        append(PersonnummerResult('%04d%s%s%s%s' % (year, mm, dd, serial, control), date(year, month, birth_day), 'valid', ''))
+    return results
+
+def _find_duplicate_personnummer(cr):
+    """Return (key, company_id, employee ids) of numbers shared by active employees"""
+    cr.execute("""
+        SELECT swedish_personnummer_key, company_id, array_agg(id ORDER BY id)
+          FROM hr_employee
+         WHERE active AND swedish_personnummer_key IS NOT NULL
+      GROUP BY swedish_personnummer_key, company_id
+        HAVING count(*) > 1
+    """)
+    return cr.fetchall()
+
+
+_PERSONNUMMER_OPERATORS = ('=', 'like', 'ilike', '=like', '=ilike', 'in')
+
+
+def _normalize_personnummer_domain(model, domain):
+    """Rewrite the swedish_personnummer leaves of a domain on model, see
+    hr.employee._normalize_personnummer_domain"""
+    if not domain:
+        return domain
+    normalized = [_normalize_personnummer_leaf(model, leaf) for leaf in domain]
+    if all(new is old for new, old in zip(normalized, domain)):
+        return domain
+    return normalized
+
+
+def _normalize_personnummer_leaf(model, leaf):
+    if not isinstance(leaf, (list, tuple)) or len(leaf) != 3 or not isinstance(leaf[0], str):
+        return leaf
+    path, operator, value = leaf
+    *names, field_name = path.split('.')
+    for name in names:
+        field = model._fields.get(name)
+        if field is None or not field.relational:
+            return leaf
+        model = model.env[field.comodel_name]
+    if model._name != 'hr.employee' or field_name != 'swedish_personnummer' \
+            or operator not in _PERSONNUMMER_OPERATORS or not value:
+        return leaf
+    values = value if operator == 'in' else [value]
+    if not isinstance(values, (list, tuple)):
+        return leaf
+    results = parse_personnummer_batch(values)
+    if not all(result.code == 'valid' for result in results):
+        return leaf
+    return ('.'.join(names + ['swedish_personnummer_key']), 'in', [result.normalized for result in results])
+
+
 class HrEmployee(models.Model):
     _inherit = 'hr.employee'
 
     swedish_personnummer = fields.Char(string='Personal Identity Number', help='Swedish Personal Identity Number')
+    swedish_personnummer_key = fields.Char(
+        string='Normalized Personal Identity Number', compute='_compute_swedish_personnummer_key', store=True, copy=False,
+        help='12-digit form (YYYYMMDDNNNN) used for exact, indexed lookups')
+    swedish_birth_date = fields.Date(string='Birth Date (Personal Identity Number)', compute='_compute_swedish_personnummer_key', store=True)
     region_id = fields.Many2one('res.region', string='Region')
     municipality_id = fields.Many2one('res.municipality', string='Municipality', domain="[('region_id', '=', region_id)]")
     church_member = fields.Boolean(string='Church Member', default=False)
     parish_id = fields.Many2one('res.parish', string='Parish', domain="[('municipality_id', '=', municipality_id)]")
     tax_table_number = fields.Char(related='municipality_id.tax_table_number', string='Tax Table Number', readonly=True)
 
+    def init(self):
+        # Archived employees keep their number, so uniqueness only covers
+        # active ones and needs a partial index instead of a constraint
+        duplicates = _find_duplicate_personnummer(self.env.cr)
+        if duplicates:
+            _logger.error(
+                "Not enforcing unique personal identity numbers, active employees share these numbers: %s",
+                '; '.join("%s (company %s): employees %s" % row for row in duplicates),
+            )
+            return
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS hr_employee_swedish_personnummer_key_unique
+                ON hr_employee (swedish_personnummer_key, company_id)
+             WHERE active AND swedish_personnummer_key IS NOT NULL
+        """)
+
+    @api.depends('swedish_personnummer')
+    def _compute_swedish_personnummer_key(self):
+        results = parse_personnummer_batch(self.mapped('swedish_personnummer'))
+        for employee, result in zip(self, results):
+            employee.swedish_personnummer_key = result.normalized
+            employee.swedish_birth_date = result.birth_date
+
+    @api.model
+    def _search(self, domain, *args, **kwargs):
+        return super(HrEmployee, self)._search(self._normalize_personnummer_domain(domain), *args, **kwargs)
+
+    @api.model
+    def _normalize_personnummer_domain(self, domain):
+        """Turn searches on swedish_personnummer into equality lookups on the normalized key
+
+        Any full number, whatever its format, becomes an indexed lookup on
+        swedish_personnummer_key, also behind dotted paths such as
+        parent_id.swedish_personnummer. Partial values are searched as
+        before.
+        """
+        return _normalize_personnummer_domain(self, domain)
+
+    @api.constrains('swedish_personnummer', 'company_id', 'active')
+    def _check_personnummer_unique(self):
+        # Same rule as the partial unique index, with a readable message
+        employees = self.filtered(lambda employee: employee.active and employee.swedish_personnummer_key)
+        if not employees:
+            return
+        duplicates = self.search_read([
+            ('swedish_personnummer_key', 'in', employees.mapped('swedish_personnummer_key')),
+            ('id', 'not in', employees.ids),
+        ], ['swedish_personnummer_key', 'company_id'])
+        taken = {(employee['swedish_personnummer_key'], employee['company_id'] and employee['company_id'][0]) for employee in duplicates}
+        seen = set()
+        for employee in employees:
+            key = (employee.swedish_personnummer_key, employee.company_id.id)
+            if key in taken or key in seen:
+                raise ValidationError("An employee with this personal identity number already exists in the company.")
+            seen.add(key)
+
+    @api.model
+    def match_personnummer_batch(self, values):
+        """Return {raw value: employee id} for the employees matching a list of numbers
+
+        Meant for matching Försäkringskassan and Skatteverket files: all values
+        are normalized in one pass and resolved with a single indexed query.
+        """
+        keys = {
+            value: result.normalized
+            for value, result in zip(values, parse_personnummer_batch(values))
+            if result.code == 'valid'
+        }
+        if not keys:
+            return {}
+        employee_by_key = {
+            employee['swedish_personnummer_key']: employee['id']
+            for employee in self.search_read([('swedish_personnummer_key', 'in', list(set(keys.values())))], ['swedish_personnummer_key'])
+        }
+        return {value: employee_by_key[key] for value, key in keys.items() if key in employee_by_key}
+
     @api.onchange('municipality_id')
     def _onchange_municipality_id(self):
         if self.municipality_id:
@@ -25,49 +226,146 @@ class HrEmployee(models.Model):
 
     @api.model
     def ensure_municipality_data_loaded(self):
-        _logger.debug("Ensuring municipality data is loaded.")
-        Region = self.env['res.region']
-        Municipality = self.env['res.municipality']
-        
-        if not Region.search([], limit=1) or not Municipality.search([], limit=1):
-            _logger.info("Municipality data not found, updating municipalities.")
-            self.env['municipality.updater'].update_municipalities()
-        else:
-            _logger.debug("Municipality data is already loaded.")
+        ReferenceData = self.env['municipality.reference.data']
+        # Answered from the worker cache, so opening a form runs no queries
+        if not ReferenceData.is_data_loaded():
+            _logger.info("Municipality data not found, loading the reference data snapshot.")
+            self.env['municipality.updater']._load_reference_data()
 
     @api.model
     def default_get(self, fields_list):
         self.ensure_municipality_data_loaded()
         return super(HrEmployee, self).default_get(fields_list)
 
+    @api.model
+    def validate_personnummer_batch(self, values):
+        """Batch validation API, see parse_personnummer_batch"""
+        return parse_personnummer_batch(values)
+
+    @api.model
+    def load(self, fields, data):
+        # Normalize imported personal identity numbers in one pass; invalid
+        # values are left as they are for the constraint to report
+        if 'swedish_personnummer' in fields:
+            index = fields.index('swedish_personnummer')
+            results = parse_personnummer_batch([row[index] for row in data])
+            data = [list(row) for row in data]
+            for row, result in zip(data, results):
+                if result.code == 'valid':
+                    row[index] = self._format_normalized_personnummer(result.normalized)
+        return super(HrEmployee, self).load(fields, data)
+
+    @api.model
+    def import_swedish_employees(self, rows, chunk_size=1000):
+        """Create employees from an iterable of row dicts, one create() per chunk
+
+        Rows carry name, personnummer, municipality_code (SCB code), and
+        optionally region_code, church_member, parish and the contact and
+        personal fields of _IMPORT_EXTRA_FIELDS. Other columns are ignored. Regions, municipalities and parishes are
+        resolved from maps loaded once and personnummer are validated in batch
+        per chunk. Rows that fail are skipped and reported as
+        {'created': int, 'errors': [(row number, message)]}.
+        """
+        ReferenceData = self.env['municipality.reference.data']
+        region_map = ReferenceData._get_region_map()
+        municipality_map = ReferenceData._get_municipality_map()
+        parish_map = {
+            (parish['municipality_id'][0], parish['name'].casefold()): parish['id']
+            for parish in self.env['res.parish'].search_read([], ['name', 'municipality_id'])
+        }
+        passthrough = {name for name in _IMPORT_EXTRA_FIELDS if name in self._fields}
+        Employee = self.with_context(tracking_disable=True, mail_create_nolog=True, mail_create_nosubscribe=True)
+        seen_keys = set()
+        created = 0
+        errors = []
+        rows = enumerate(rows, start=1)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            results = parse_personnummer_batch([row.get('personnummer') or row.get('swedish_personnummer') for _, row in chunk])
+            keys = [result.normalized for result in results if result.code == 'valid']
+            company_id = self.env.company.id
+            existing_keys = {
+                employee['swedish_personnummer_key']
+                for employee in self.search_read(
+                    [('swedish_personnummer_key', 'in', keys)], ['swedish_personnummer_key', 'company_id'])
+                if not employee['company_id'] or employee['company_id'][0] == company_id
+            } if keys else set()
+
+            vals_list = []
+            row_numbers = []
+            for (number, row), result in zip(chunk, results):
+                vals = self._prepare_import_employee_vals(row, result, region_map, municipality_map, parish_map, passthrough)
+                if isinstance(vals, str):
+                    errors.append((number, vals))
+                elif result.normalized in existing_keys or result.normalized in seen_keys:
+                    errors.append((number, "An employee with personal identity number %s already exists." % result.normalized))
+                else:
+                    seen_keys.add(result.normalized)
+                    vals_list.append(vals)
+                    row_numbers.append(number)
+            if not vals_list:
+                continue
+            try:
+                with self.env.cr.savepoint():
+                    Employee.create(vals_list)
+                created += len(vals_list)
+            except Exception:
+                # Retry the chunk row by row to find and report the failing rows
+                for number, vals in zip(row_numbers, vals_list):
+                    try:
+                        with self.env.cr.savepoint():
+                            Employee.create(vals)
+                        created += 1
+                    except Exception as e:
+                        errors.append((number, str(e)))
+        _logger.info("Imported %s employees, %s rows with errors", created, len(errors))
+        return {'created': created, 'errors': errors}
+
+    @api.model
+    def _prepare_import_employee_vals(self, row, result, region_map, municipality_map, parish_map, passthrough):
+        """Return the create values of an import row, or an error message"""
+        if not row.get('name'):
+            return "The employee name is missing."
+        if result.code != 'valid':
+            return result.reason
+        municipality = municipality_map.get((row.get('municipality_code') or '').strip())
+        if not municipality:
+            return "Unknown municipality code %r." % row.get('municipality_code')
+        municipality_id, region_id, _table = municipality
+        region_code = (row.get('region_code') or '').strip()
+        if region_code and region_map.get(region_code) != region_id:
+            return "Municipality %s is not in region %s." % (row['municipality_code'], region_code)
+        vals = {field: value for field, value in row.items() if field in passthrough and value not in (None, '')}
+        vals.update({
+            'name': row['name'],
+            'swedish_personnummer': self._format_normalized_personnummer(result.normalized),
+            'region_id': region_id,
+            'municipality_id': municipality_id,
+            'church_member': (row.get('church_member') or '').strip().lower() in _TRUE_VALUES,
+        })
+        parish = (row.get('parish') or '').strip()
+        if parish:
+            vals['parish_id'] = parish_map.get((municipality_id, parish.casefold()))
+            if not vals['parish_id']:
+                return "Unknown parish %r in municipality %s." % (parish, row['municipality_code'])
+        return vals
+
     @api.onchange('swedish_personnummer')
     def _onchange_swedish_personnummer(self):
         if self.swedish_personnummer:
-            digits_only = ''.join(filter(str.isdigit, self.swedish_personnummer))
-
-            if len(digits_only) == 12:
-                luhn_digits = digits_only[2:]
-            elif len(digits_only) == 10:
-                luhn_digits = digits_only
-            else:
-                self.swedish_personnummer = ''
-                return {
-                    'warning': {
-                        'title': 'Invalid format',
-                        'message': 'The personal identity number must contain 10 or 12 digits.'
-                    }
-                }
-
-            if not self._luhn_check(luhn_digits):
+            result = parse_personnummer_batch([self.swedish_personnummer])[0]
+            if result.code != 'valid':
                 self.swedish_personnummer = ''
                 return {
                     'warning': {
-                        'title': 'Invalid personal identity number',
-                        'message': 'The personal identity number failed the Luhn algorithm check.'
+                        'title': 'Invalid personal identity number' if result.code == 'luhn' else 'Invalid format',
+                        'message': result.reason,
                     }
                 }
 
-            formatted_personnummer = self._format_personnummer(digits_only)
+            formatted_personnummer = self._format_personnummer(result.normalized)
             if formatted_personnummer:
                 self.swedish_personnummer = formatted_personnummer
             else:
@@ -81,44 +379,30 @@ class HrEmployee(models.Model):
 
     @api.constrains('swedish_personnummer')
     def _check_personnummer(self):
-        for employee in self:
-            if employee.swedish_personnummer:
-                digits_only = ''.join(filter(str.isdigit, employee.swedish_personnummer))
-                if len(digits_only) == 12:
-                    luhn_digits = digits_only[2:]
-                else:
-                    luhn_digits = digits_only
+        employees = self.filtered('swedish_personnummer')
+        results = parse_personnummer_batch(employees.mapped('swedish_personnummer'))
+        for employee, result in zip(employees, results):
+            if result.code != 'valid':
+                raise ValidationError("Invalid Swedish personal identity number %s: %s" % (employee.swedish_personnummer, result.reason))
 
-                if not self._luhn_check(luhn_digits):
-                    raise ValidationError("Invalid Swedish personal identity number.")
+    @api.model
+    def _format_normalized_personnummer(self, normalized):
+        return f"{normalized[:8]}-{normalized[8:]}"
 
     def _format_personnummer(self, digits):
-        if len(digits) == 12:
-            year, month, day, extension = digits[:4], digits[4:6], digits[6:8], digits[8:]
-        elif len(digits) == 10:
-            year, month, day, extension = '19' + digits[:2], digits[2:4], digits[4:6], digits[6:]
-        else:
+        result = parse_personnummer_batch([digits])[0]
+        if result.code != 'valid':
             return None
 
-        try:
-            birth_date = datetime.strptime(f"{year}{month}{day}", "%Y%m%d")
-        except ValueError:
-            return None
-
-        age = (datetime.now() - birth_date).days / 365.25
+        today = date.today()
+        age = today.year - result.birth_date.year - ((today.month, today.day) < (result.birth_date.month, result.birth_date.day))
         if age < 15 or age > 75:
             return None
 
-        return f"{year}{month}{day}-{extension}"
+        return self._format_normalized_personnummer(result.normalized)
 
     def _luhn_check(self, digits):
         digits = [int(d) for d in digits]
-        checksum = 0
-        for idx, digit in enumerate(digits[:-1]):
-            if idx % 2 == 0:
-                prod = digit * 2
-                checksum += prod if prod < 10 else prod - 9
-            else:
-                checksum += digit
+        checksum = sum(_LUHN_DOUBLED[digit] for digit in digits[-2::-2]) + sum(digits[-3::-2])
         control_digit = (10 - (checksum % 10)) % 10
-        return control_digit == digits[-1]
\ No newline at end of file
+        return control_digit == digits[-1]
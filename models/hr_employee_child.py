@@ -1,6 +1,17 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api
 from datetime import date
+from dateutil.relativedelta import relativedelta
+from psycopg2.extras import execute_values
+
+# Föräldrapenning per barn (barn födda 2014 eller senare)
+PARENTAL_BENEFIT_DAYS = 480
+RESERVED_DAYS_PER_PARENT = 90
+DAYS_SAVEABLE_AFTER_AGE_4 = 96
+PARENTAL_BENEFIT_AGE_LIMIT = 12
+
+# Benefit days drawn by a parental leave, 50% leave draws half a day per day
+_BENEFIT_DAYS_SQL = "l.number_of_days * COALESCE(NULLIF(l.benefit_percentage, '')::numeric, 100) / 100"
 
 class HrEmployeeChild(models.Model):
     _name = 'hr.employee.child'
@@ -11,9 +22,21 @@ class HrEmployeeChild(models.Model):
     birth_date = fields.Date(string='Birth Date', required=True)
     # Överväg kryptering eller åtkomstkontroll för personnummer
     personnummer = fields.Char(string='Personal Identity Number')
-    employee_id = fields.Many2one('hr.employee', string='Employee', required=True, ondelete='cascade')
+    employee_id = fields.Many2one('hr.employee', string='Employee', required=True, ondelete='cascade', index=True)
     age = fields.Integer(string='Age', compute='_compute_age', store=True) # Lagra ålder för enklare sökning
 
+    # Föräldrapenningsaldo, uppdateras av _refresh_parental_ledger när ledigheter ändras
+    parental_days_used = fields.Float(string='Parental Benefit Days Used', readonly=True,
+                                      help='Benefit days drawn by the employee for this child')
+    parental_days_used_after_4 = fields.Float(string='Days Used After Age 4', readonly=True)
+    other_parent_days_used = fields.Float(string='Days Used by Other Parent',
+                                          help='Benefit days drawn by the other parent, from Försäkringskassan')
+    parental_days_remaining = fields.Float(string='Parental Benefit Days Remaining', compute='_compute_parental_days_remaining')
+    reserved_days_remaining = fields.Float(string='Reserved Days Remaining', compute='_compute_parental_days_remaining',
+                                           help='Days reserved for the employee that cannot be transferred to the other parent')
+    days_to_use_before_4 = fields.Float(string='Days to Use Before Age 4', compute='_compute_parental_days_remaining',
+                                        help='Days lost unless used before the child turns 4')
+
     @api.depends('birth_date')
     def _compute_age(self):
         today = date.today()
@@ -25,4 +48,159 @@ class HrEmployeeChild(models.Model):
             else:
                 child.age = 0
 
-    # TODO: Add constraint to validate personnummer format?
\ No newline at end of file
+    @api.depends('birth_date', 'parental_days_used', 'parental_days_used_after_4', 'other_parent_days_used')
+    def _compute_parental_days_remaining(self):
+        today = date.today()
+        for child in self:
+            remaining = child._remaining_days_from(today, child.parental_days_used, child.parental_days_used_after_4)
+            child.parental_days_remaining = remaining
+            child.reserved_days_remaining = min(max(0.0, RESERVED_DAYS_PER_PARENT - child.parental_days_used), remaining)
+            turns_4 = child.birth_date and child.birth_date + relativedelta(years=4)
+            child.days_to_use_before_4 = max(0.0, remaining - DAYS_SAVEABLE_AFTER_AGE_4) if turns_4 and today < turns_4 else 0.0
+
+    # TODO: Add constraint to validate personnummer format?
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        children = super().create(vals_list)
+        self._refresh_parental_ledger(children.employee_id.ids)
+        return children
+
+    def write(self, vals):
+        employee_ids = set(self.employee_id.ids)
+        res = super().write(vals)
+        if {'birth_date', 'employee_id', 'other_parent_days_used'} & set(vals):
+            self._refresh_parental_ledger(employee_ids | set(self.employee_id.ids))
+        return res
+
+    def unlink(self):
+        employee_ids = self.employee_id.ids
+        res = super().unlink()
+        self._refresh_parental_ledger(employee_ids)
+        return res
+
+    def remaining_days(self, as_of=None):
+        """Return the parental benefit days left for the child on a date
+
+        Uses the stored ledger for today and later dates, and aggregates the
+        leaves drawn up to as_of for earlier dates.
+        """
+        self.ensure_one()
+        today = date.today()
+        as_of = as_of or today
+        if as_of >= today:
+            return self._remaining_days_from(as_of, self.parental_days_used, self.parental_days_used_after_4)
+        self.env['hr.leave'].flush_model()
+        self.env.cr.execute("""
+            SELECT COALESCE(SUM(%s), 0),
+                   COALESCE(SUM(%s) FILTER (WHERE l.date_from >= %%(turns_4)s), 0)
+              FROM hr_leave l
+             WHERE %s AND l.date_from::date <= %%(as_of)s
+        """ % (_BENEFIT_DAYS_SQL, _BENEFIT_DAYS_SQL, self._ledger_leave_filter('%(child)s')),
+            {'child': self.id, 'as_of': as_of, 'turns_4': self.birth_date + relativedelta(years=4),
+             'type': self._get_parental_leave_type_id()})
+        used, used_after_4 = self.env.cr.fetchone()
+        return self._remaining_days_from(as_of, float(used), float(used_after_4))
+
+    def _remaining_days_from(self, as_of, used, used_after_4):
+        if not self.birth_date or as_of >= self.birth_date + relativedelta(years=PARENTAL_BENEFIT_AGE_LIMIT):
+            return 0.0
+        remaining = PARENTAL_BENEFIT_DAYS - used - self.other_parent_days_used
+        if as_of >= self.birth_date + relativedelta(years=4):
+            # Only 96 days can be saved past the fourth birthday
+            remaining = min(remaining, DAYS_SAVEABLE_AFTER_AGE_4 - used_after_4)
+        return max(0.0, remaining)
+
+    @api.model
+    def _get_parental_leave_type_id(self):
+        parental_leave_type = self.env.ref('l10n_se_hr.holiday_status_swedish_parental_leave', raise_if_not_found=False)
+        return parental_leave_type.id if parental_leave_type else 0
+
+    @api.model
+    def _ledger_leave_filter(self, child):
+        """SQL condition selecting the approved parental benefit leaves of a child (alias l)
+
+        Leaves recorded before they were linked to a child are matched on the
+        employee and the child's birth date.
+        """
+        return """
+            l.holiday_status_id = %%(type)s AND l.state IN ('validate', 'validate1')
+            AND l.parental_leave_type = 'parental'
+            AND (l.child_id = %s OR (l.child_id IS NULL AND EXISTS (
+                SELECT 1 FROM hr_employee_child c
+                 WHERE c.id = %s AND c.employee_id = l.employee_id AND c.birth_date = l.child_birth_date)))
+        """ % (child, child)
+
+    @api.model
+    def _refresh_parental_ledger(self, employee_ids=None):
+        """Recompute the benefit days used per child and per employee
+
+        Covers the children of the given employees, or all of them when
+        employee_ids is None, with one UPDATE for the children and one for
+        each of the employees' stored totals. The days left depend on the
+        children's ages, so they are summed per employee in Python and the
+        daily cron keeps them current as children grow older.
+        """
+        if employee_ids is not None and not employee_ids:
+            return
+        self.env['hr.leave'].flush_model()
+        self.flush_model()
+        params = {'type': self._get_parental_leave_type_id(), 'ids': tuple(employee_ids or ())}
+        child_filter = "AND child.employee_id IN %(ids)s" if employee_ids is not None else ""
+        self.env.cr.execute("""
+            UPDATE hr_employee_child ch
+               SET parental_days_used = s.used, parental_days_used_after_4 = s.used_after_4
+              FROM (
+                SELECT child.id,
+                       COALESCE(SUM(%s), 0) AS used,
+                       COALESCE(SUM(%s) FILTER (WHERE l.date_from >= child.birth_date + interval '4 years'), 0) AS used_after_4
+                  FROM hr_employee_child child
+             LEFT JOIN hr_leave l ON %s
+                 WHERE true %s
+              GROUP BY child.id
+              ) s
+             WHERE ch.id = s.id
+               AND (ch.parental_days_used IS DISTINCT FROM s.used OR ch.parental_days_used_after_4 IS DISTINCT FROM s.used_after_4)
+        """ % (_BENEFIT_DAYS_SQL, _BENEFIT_DAYS_SQL, self._ledger_leave_filter('child.id'), child_filter), params)
+
+        employee_filter = "WHERE emp.id IN %(ids)s" if employee_ids is not None else ""
+        self.env.cr.execute("""
+            UPDATE hr_employee e
+               SET parental_leave_days_used = s.used
+              FROM (
+                SELECT emp.id, COALESCE(SUM(%s), 0) AS used
+                  FROM hr_employee emp
+             LEFT JOIN hr_leave l ON l.employee_id = emp.id AND l.holiday_status_id = %%(type)s
+                       AND l.state IN ('validate', 'validate1') AND l.parental_leave_type = 'parental'
+                %s
+              GROUP BY emp.id
+              ) s
+             WHERE e.id = s.id AND e.parental_leave_days_used IS DISTINCT FROM s.used
+        """ % (_BENEFIT_DAYS_SQL, employee_filter), params)
+        self.invalidate_model(['parental_days_used', 'parental_days_used_after_4'])
+
+        today = date.today()
+        remaining = dict.fromkeys(employee_ids or (), 0.0)
+        for child in self.search([('employee_id', 'in', list(employee_ids))] if employee_ids is not None else []):
+            days = child._remaining_days_from(today, child.parental_days_used, child.parental_days_used_after_4)
+            remaining[child.employee_id.id] = remaining.get(child.employee_id.id, 0.0) + days
+        if employee_ids is None:
+            self.env.cr.execute("""
+                UPDATE hr_employee e
+                   SET parental_leave_days_remaining = 0
+                 WHERE e.parental_leave_days_remaining IS DISTINCT FROM 0
+                   AND NOT EXISTS (SELECT 1 FROM hr_employee_child c WHERE c.employee_id = e.id)
+            """)
+        if remaining:
+            execute_values(self.env.cr._obj, """
+                UPDATE hr_employee e
+                   SET parental_leave_days_remaining = v.remaining
+                  FROM (VALUES %s) AS v(id, remaining)
+                 WHERE e.id = v.id AND e.parental_leave_days_remaining IS DISTINCT FROM v.remaining
+            """, sorted(remaining.items()), template='(%s::int, %s::float8)')
+        self.env['hr.employee'].invalidate_model(['parental_leave_days_used', 'parental_leave_days_remaining'])
+
+    @api.model
+    def _cron_refresh_parental_ledger(self):
+        """Daily refresh: the days left shrink as children turn 4 and 12"""
+        self._refresh_parental_ledger()
@@ -0,0 +1,75 @@
+from odoo import models, fields, _
+from odoo.exceptions import UserError
+from contextlib import contextmanager
+import csv
+import io
+
+
+class HrEmployeeImportWizard(models.TransientModel):
+    _name = 'hr.employee.import.wizard'
+    _description = 'Import Swedish Employees'
+
+    file = fields.Binary(string='CSV File', required=True, attachment=True)
+    filename = fields.Char(string='File Name')
+    chunk_size = fields.Integer(string='Chunk Size', default=1000,
+                                help='Number of employees created per batch')
+    state = fields.Selection([('draft', 'Draft'), ('done', 'Done')], default='draft')
+    created_count = fields.Integer(string='Created Employees', readonly=True)
+    error_count = fields.Integer(string='Rows with Errors', readonly=True)
+    error_log = fields.Text(string='Errors', readonly=True)
+
+    def action_import(self):
+        """Stream the CSV file into hr.employee.import_swedish_employees
+
+        The header names the columns (name, personnummer, municipality_code,
+        region_code, church_member, parish and the allowed employee fields).
+        Comma and semicolon separated files are accepted. The file is read
+        from its attachment as it is imported, not loaded into memory.
+        """
+        self.ensure_one()
+        if self.chunk_size <= 0:
+            raise UserError(_("The chunk size must be positive."))
+        with self._open_file() as content:
+            header = content.readline()
+            delimiter = ';' if header.count(';') > header.count(',') else ','
+            columns = [column.strip().lower() for column in next(csv.reader([header], delimiter=delimiter), [])]
+            if 'name' not in columns:
+                raise UserError(_("The file must have a header row with at least a name column."))
+            rows = csv.DictReader(content, fieldnames=columns, delimiter=delimiter)
+
+            # Data rows start on line 2, after the header
+            result = self.env['hr.employee'].import_swedish_employees(rows, chunk_size=self.chunk_size)
+        self.write({
+            'state': 'done',
+            'created_count': result['created'],
+            'error_count': len(result['errors']),
+            'error_log': '\n'.join(_("Line %s: %s") % (number + 1, message) for number, message in result['errors']),
+        })
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    @contextmanager
+    def _open_file(self):
+        """Yield a text stream over the uploaded file
+
+        Files in the filestore are streamed from disk, only files stored in
+        the database are read at once.
+        """
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('res_field', '=', 'file'),
+        ], limit=1)
+        if not attachment:
+            raise UserError(_("Please upload a file to import."))
+        if attachment.store_fname:
+            stream = open(attachment._full_path(attachment.store_fname), 'rb')
+        else:
+            stream = io.BytesIO(attachment.raw)
+        with io.TextIOWrapper(stream, encoding='utf-8-sig', newline='') as content:
+            yield content
@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api
 from datetime import date, timedelta
+from .hr_employee_child import _BENEFIT_DAYS_SQL
+
+# Sjukperioder under de senaste 12 månaderna innan en anställd räknas som ofta sjuk
+_FREQUENTLY_ILL_SPELLS = 6
 
 class HrEmployeeInherit(models.Model):
     _inherit = 'hr.employee'
@@ -15,7 +19,8 @@ class HrEmployeeInherit(models.Model):
     remaining_swedish_vacation_days = fields.Float(
         string='Remaining Vacation Days (Current Year)', # Tydligare namn?
         compute='_compute_remaining_swedish_vacation_days',
-        help="Calculated based on validated allocations and leaves for the current vacation year."
+        search='_search_remaining_swedish_vacation_days',
+        help="Read from the vacation balance of the current vacation year."
     )
     vacation_salary_base = fields.Monetary(
         string='Vacation Salary Base (Earning Year)', # Tydligare namn?
@@ -46,80 +51,38 @@ class HrEmployeeInherit(models.Model):
     )
     
     def _compute_overtime_stats(self):
-        """Compute overtime statistics for employee"""
-        Overtime = self.env['hr.overtime.swedish']
+        """Compute overtime statistics for employee from the yearly overtime summaries"""
+        totals = {}
+        for summary in self.env['hr.overtime.swedish.summary'].search_read(
+                [('employee_id', 'in', self.ids), ('month', '=', 0)], ['employee_id', 'hours', 'overtime_count']):
+            count, hours = totals.get(summary['employee_id'][0], (0, 0.0))
+            totals[summary['employee_id'][0]] = (count + summary['overtime_count'], hours + summary['hours'])
         for employee in self:
-            domain = [
-                ('employee_id', '=', employee.id),
-                ('state', 'in', ['approved', 'paid'])
-            ]
-            
-            overtime_records = Overtime.search(domain)
-            employee.overtime_count = len(overtime_records)
-            employee.overtime_hours = sum(overtime_records.mapped('duration'))
+            employee.overtime_count, employee.overtime_hours = totals.get(employee.id, (0, 0.0))
 
-    # Compute-metod för återstående dagar
+    # Compute-metod för återstående dagar, läses från semestersaldot (hr.swedish.vacation.balance)
     def _compute_remaining_swedish_vacation_days(self):
-        # Denna metod behöver vara robust och hantera fall där ref inte finns
-        swedish_vacation_type = self.env.ref('l10n_se_hr.holiday_status_swedish_vacation', raise_if_not_found=False)
-        if not swedish_vacation_type:
-            for employee in self:
-                employee.remaining_swedish_vacation_days = 0.0
-            return
-
-        # Bestäm innevarande semesterår
-        today = fields.Date.today()
-        year = today.year
-        month = today.month
-        if month < 4:
-            vacation_year = f"{year-1}/{year}"
-            # För att söka i allocation/leave, behöver vi start/slutdatum för året
-            # OBS: Datum i allocation/leave är inte alltid kopplade till semesterår i standard Odoo
-            # Detta kan kräva att vi söker baserat på leave.vacation_year eller allocation.vacation_year om de finns
-            # Eller filtrera på date_from/date_to för perioden
-            start_date = date(year - 1, 4, 1)
-            end_date = date(year, 3, 31)
-        else:
-            vacation_year = f"{year}/{year+1}"
-            start_date = date(year, 4, 1)
-            end_date = date(year + 1, 3, 31)
-
-        # Hämta alla anställdas ID:n
-        employee_ids = self.ids
-        if not employee_ids:
-            return
-
-        # Läs data för alla anställda samtidigt för bättre prestanda
-        allocation_data = self.env['hr.leave.allocation'].read_group(
-             [('employee_id', 'in', employee_ids),
-              ('holiday_status_id', '=', swedish_vacation_type.id),
-              ('state', '=', 'validate'),
-              # Filtrera på datum istället för 'vacation_year'-fältet om det inte är tillförlitligt
-              # ('date_from', '<=', end_date), # Behöver mer komplex logik för att matcha år
-             ],
-             ['employee_id', 'number_of_days:sum'], ['employee_id'])
-
-        leave_data = self.env['hr.leave'].read_group(
-             [('employee_id', 'in', employee_ids),
-              ('holiday_status_id', '=', swedish_vacation_type.id),
-              ('state', 'in', ['validate', 'validate1']),
-              ('date_from', '>=', start_date), # Ledighet tagen under semesteråret
-              ('date_from', '<=', end_date)
-             ],
-             ['employee_id', 'number_of_days:sum'], ['employee_id'])
-
-        # Mappa resultat till dictionary för snabb lookup
-        alloc_map = {data['employee_id'][0]: data['number_of_days'] for data in allocation_data}
-        leave_map = {data['employee_id'][0]: data['number_of_days'] for data in leave_data}
-
+        Balance = self.env['hr.swedish.vacation.balance']
+        balances = Balance.search_read(
+            [('employee_id', 'in', self.ids), ('vacation_year', '=', Balance._current_vacation_year())],
+            ['employee_id', 'remaining_days'])
+        remaining_map = {balance['employee_id'][0]: balance['remaining_days'] for balance in balances}
         for employee in self:
-             # TODO: Förfina allocated_days - bör nog baseras på intjänad rätt snarare än bara allocation?
-             # Detta är en förenkling. Korrekt beräkning kräver intjänanderegler.
-             allocated_days = alloc_map.get(employee.id, 0.0)
-             used_days = leave_map.get(employee.id, 0.0)
-             # Återstående kan inte vara negativt om inte 'allows_negative' är satt på typen
-             remaining = allocated_days - used_days
-             employee.remaining_swedish_vacation_days = remaining # Kan bli negativt om tillåtet
+            employee.remaining_swedish_vacation_days = remaining_map.get(employee.id, 0.0)
+
+    def _search_remaining_swedish_vacation_days(self, operator, value):
+        if operator not in ('=', '!=', '<', '<=', '>', '>='):
+            raise NotImplementedError("Unsupported operator %s on remaining vacation days" % operator)
+        Balance = self.env['hr.swedish.vacation.balance']
+        Balance.flush_model()
+        # Employees without a balance for the year have no days left
+        self.env.cr.execute("""
+            SELECT e.id
+              FROM hr_employee e
+         LEFT JOIN hr_swedish_vacation_balance b ON b.employee_id = e.id AND b.vacation_year = %%s
+             WHERE COALESCE(b.remaining_days, 0) %s %%s
+        """ % operator, (Balance._current_vacation_year(), value or 0.0))
+        return [('id', 'in', [row[0] for row in self.env.cr.fetchall()])]
 
     # Compute-metod för semesterlön
     def _compute_accrued_vacation_pay(self):
@@ -191,71 +154,97 @@ class HrEmployeeInherit(models.Model):
         return False
 
     # --- Fält och metoder från hr_sick_leave_inherit.py ---
+    # Lagras och hålls uppdaterade av _refresh_sick_leave_statistics (vid ändrad sjukfrånvaro och daglig körning)
     sick_leave_counter = fields.Integer(
         string='Sick Leave Count (Last 12 months)',
-        compute='_compute_sick_leave_statistics'
+        readonly=True
     )
     sick_leave_days = fields.Float( # Ändrat till Float för att matcha number_of_days
         string='Sick Leave Days (Last 12 months)',
-        compute='_compute_sick_leave_statistics'
+        readonly=True
     )
     frequently_ill = fields.Boolean(
         string='Frequently Ill (Rehab Needed?)', # Tydligare text
-        compute='_compute_sick_leave_statistics',
+        readonly=True,
+        index=True,
         help='Employee has been on sick leave more than 6 times in the last 12 months, may indicate need for rehabilitation efforts.'
     )
 
-    def _compute_sick_leave_statistics(self):
-        # Denna beräkning verkar rimlig
-        today = fields.Date.today()
-        # Använd relativedelta för exakt 12 månader? Eller är 365 dagar ok?
-        date_12_months_ago = today - timedelta(days=365)
-
+    @api.model
+    def _refresh_sick_leave_statistics(self, employee_ids=None):
+        """Recompute the rolling 12-month sick leave statistics in one UPDATE
+
+        Only the given employees are recomputed, or all of them when
+        employee_ids is None. Rows whose statistics did not change are not
+        written.
+        """
+        if employee_ids is not None and not employee_ids:
+            return
         sick_leave_type = self.env.ref('l10n_se_hr.holiday_status_swedish_sick_leave', raise_if_not_found=False)
         if not sick_leave_type:
-             for employee in self:
-                 employee.sick_leave_counter = 0
-                 employee.sick_leave_days = 0.0
-                 employee.frequently_ill = False
-             return
-
-        employee_ids = self.ids
-        if not employee_ids:
             return
+        self.env['hr.leave'].flush_model(['employee_id', 'holiday_status_id', 'state', 'date_from', 'number_of_days'])
+        self.flush_model(['sick_leave_counter', 'sick_leave_days', 'frequently_ill'])
+        params = {
+            'type': sick_leave_type.id,
+            'since': fields.Date.today() - timedelta(days=365),
+            'threshold': _FREQUENTLY_ILL_SPELLS,
+            'ids': tuple(employee_ids or ()),
+        }
+        employee_filter = "WHERE emp.id IN %(ids)s" if employee_ids is not None else ""
+        self.env.cr.execute("""
+            UPDATE hr_employee e
+               SET sick_leave_counter = s.counter, sick_leave_days = s.days, frequently_ill = s.counter > %%(threshold)s
+              FROM (
+                SELECT emp.id, COALESCE(l.counter, 0) AS counter, COALESCE(l.days, 0) AS days
+                  FROM hr_employee emp
+             LEFT JOIN (
+                    SELECT employee_id, COUNT(*) AS counter, SUM(number_of_days) AS days
+                      FROM hr_leave
+                     WHERE holiday_status_id = %%(type)s AND state IN ('validate', 'validate1') AND date_from >= %%(since)s
+                  GROUP BY employee_id
+                ) l ON l.employee_id = emp.id
+                %s
+              ) s
+             WHERE e.id = s.id
+               AND (e.sick_leave_counter IS DISTINCT FROM s.counter
+                    OR e.sick_leave_days IS DISTINCT FROM s.days
+                    OR e.frequently_ill IS DISTINCT FROM (s.counter > %%(threshold)s))
+        """ % employee_filter, params)
+        self.invalidate_model(['sick_leave_counter', 'sick_leave_days', 'frequently_ill'])
 
-        # Hämta data för alla anställda samtidigt
-        leave_data = self.env['hr.leave'].read_group(
-             [('employee_id', 'in', employee_ids),
-              # Använd holiday_status_id istället för is_swedish_sick_leave för databasfrågan
-              ('holiday_status_id', '=', sick_leave_type.id),
-              ('state', 'in', ['validate', 'validate1']),
-              ('date_from', '>=', date_12_months_ago)
-             ],
-             ['employee_id', 'number_of_days:sum', 'count'], ['employee_id'])
-
-        leave_map = {
-             data['employee_id'][0]: {
-                 'count': data['employee_id_count'], # read_group ger _count
-                 'days': data['number_of_days']
-                 } for data in leave_data
-             }
-
-        for employee in self:
-             stats = leave_map.get(employee.id, {'count': 0, 'days': 0.0})
-             employee.sick_leave_counter = stats['count']
-             employee.sick_leave_days = stats['days']
-             employee.frequently_ill = employee.sick_leave_counter > 6
+    @api.model
+    def _cron_age_sick_leave_statistics(self):
+        """Daily sweep: recompute employees whose sick leaves left the 12-month window since the last run"""
+        sick_leave_type = self.env.ref('l10n_se_hr.holiday_status_swedish_sick_leave', raise_if_not_found=False)
+        if not sick_leave_type:
+            return
+        Param = self.env['ir.config_parameter'].sudo()
+        today = fields.Date.today()
+        last_sweep = fields.Date.to_date(Param.get_param('l10n_se_hr.sick_leave_sweep_date'))
+        if not last_sweep:
+            self._refresh_sick_leave_statistics()
+        elif last_sweep < today:
+            self.env['hr.leave'].flush_model(['employee_id', 'holiday_status_id', 'state', 'date_from'])
+            self.env.cr.execute("""
+                SELECT DISTINCT employee_id FROM hr_leave
+                 WHERE holiday_status_id = %s AND state IN ('validate', 'validate1')
+                   AND date_from >= %s AND date_from < %s
+            """, (sick_leave_type.id, last_sweep - timedelta(days=365), today - timedelta(days=365)))
+            self._refresh_sick_leave_statistics([row[0] for row in self.env.cr.fetchall()])
+        Param.set_param('l10n_se_hr.sick_leave_sweep_date', fields.Date.to_string(today))
 
     # --- Fält och metoder från hr_parental_leave_inherit.py ---
     parental_leave_days_used = fields.Float(
         string='Parental Leave Days Used (Total)', # Tydligare namn?
-        compute='_compute_parental_leave_statistics'
+        readonly=True,
+        help='Parental benefit days drawn, kept up to date by hr.employee.child._refresh_parental_ledger'
+    )
+    parental_leave_days_remaining = fields.Float(
+        string='Parental Leave Days Remaining',
+        readonly=True,
+        help='Sum of the parental benefit days left for each child, kept up to date by hr.employee.child._refresh_parental_ledger'
     )
-    # Behövs remaining? Det är per barn och komplext att beräkna totalt.
-    # parental_leave_days_remaining = fields.Float(
-    #     string='Parental Leave Days Remaining',
-    #     compute='_compute_parental_leave_statistics'
-    # )
     vab_days_used = fields.Float(
         string='VAB Days Used (This Year)',
         compute='_compute_parental_leave_statistics'
@@ -267,40 +256,24 @@ class HrEmployeeInherit(models.Model):
     )
 
     def _compute_parental_leave_statistics(self):
-        # Denna beräkning behöver göras mer effektivt
-        parental_leave_type = self.env.ref('l10n_se_hr.holiday_status_swedish_parental_leave', raise_if_not_found=False)
-        if not parental_leave_type:
-             for employee in self:
-                 # employee.parental_leave_days_used = 0.0
-                 employee.vab_days_used = 0.0
-             return # Kan inte beräkna utan typen
-
-        employee_ids = self.ids
-        if not employee_ids:
-            return
-
-        current_year_start = date(date.today().year, 1, 1)
-        # current_year_end = date(date.today().year, 12, 31) # Behövs inte för VAB-queryn
-
-        # Hämta all relevant data i en sökning om möjligt
-        all_parental_leaves = self.env['hr.leave'].search([
-            ('employee_id', 'in', employee_ids),
-            ('holiday_status_id', '=', parental_leave_type.id), # Använd ID för sökning
-            ('state', 'in', ['validate', 'validate1'])
-        ])
-
-        vab_map = {}
-        # parental_days_map = {} # Totala dagar är svårt att beräkna generellt utan mer info
-
-        for leave in all_parental_leaves:
-             # VAB this year
-             if leave.parental_leave_type == 'temporary' and leave.date_from.date() >= current_year_start:
-                  vab_map[leave.employee_id.id] = vab_map.get(leave.employee_id.id, 0.0) + leave.number_of_days
-             # Parental days total (simplifierat - räknar alla typer utom VAB?)
-             # if leave.parental_leave_type != 'temporary':
-             #      parental_days_map[leave.employee_id.id] = parental_days_map.get(leave.employee_id.id, 0.0) + leave.number_of_days
-
+        # VAB summeras i SQL
+        vab_map = self._get_vab_days_by_year(self.ids, [date.today().year])
         for employee in self:
-             # employee.parental_leave_days_used = parental_days_map.get(employee.id, 0.0)
-             employee.vab_days_used = vab_map.get(employee.id, 0.0)
-             # Beräkning av remaining är utelämnad då den är komplex (per barn etc.)
\ No newline at end of file
+            employee.vab_days_used = vab_map.get((employee.id, date.today().year), 0.0)
+
+    @api.model
+    def _get_vab_days_by_year(self, employee_ids, years):
+        """Return {(employee_id, year): VAB days} for approved temporary parental leaves"""
+        parental_leave_type = self.env.ref('l10n_se_hr.holiday_status_swedish_parental_leave', raise_if_not_found=False)
+        if not parental_leave_type or not employee_ids or not years:
+            return {}
+        self.env['hr.leave'].flush_model()
+        self.env.cr.execute("""
+            SELECT l.employee_id, EXTRACT(YEAR FROM l.date_from)::int, SUM(%s)
+              FROM hr_leave l
+             WHERE l.employee_id IN %%s AND l.holiday_status_id = %%s
+               AND l.state IN ('validate', 'validate1') AND l.parental_leave_type = 'temporary'
+               AND EXTRACT(YEAR FROM l.date_from)::int IN %%s
+          GROUP BY l.employee_id, EXTRACT(YEAR FROM l.date_from)::int
+        """ % _BENEFIT_DAYS_SQL, (tuple(employee_ids), parental_leave_type.id, tuple(years)))
+        return {(employee_id, year): float(days) for employee_id, year, days in self.env.cr.fetchall()}
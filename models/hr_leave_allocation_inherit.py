@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api
 from datetime import date
+from .hr_vacation_balance import _BALANCE_FIELDS
 
 class HrLeaveAllocationInherit(models.Model):
     _inherit = 'hr.leave.allocation'
@@ -18,6 +19,33 @@ class HrLeaveAllocationInherit(models.Model):
         store=True, # Bra att lagra för sökning/gruppering
         help="Format YYYY/YYYY, e.g., 2024/2025"
     )
+    swedish_saved_days = fields.Boolean(
+        string='Saved Days (Sparade dagar)',
+        help="Days carried over from earlier vacation years rather than this year's entitlement"
+    )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        allocations = super().create(vals_list)
+        Balance = self.env['hr.swedish.vacation.balance']
+        Balance._refresh_balances(Balance._get_balance_keys(allocations))
+        return allocations
+
+    def write(self, vals):
+        if not _BALANCE_FIELDS.union(['swedish_saved_days']).intersection(vals):
+            return super().write(vals)
+        Balance = self.env['hr.swedish.vacation.balance']
+        keys = Balance._get_balance_keys(self)
+        res = super().write(vals)
+        Balance._refresh_balances(keys | Balance._get_balance_keys(self))
+        return res
+
+    def unlink(self):
+        Balance = self.env['hr.swedish.vacation.balance']
+        keys = Balance._get_balance_keys(self)
+        res = super().unlink()
+        Balance._refresh_balances(keys)
+        return res
 
     @api.depends('holiday_status_id')
     def _compute_is_swedish_vacation(self):
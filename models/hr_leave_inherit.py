@@ -4,6 +4,7 @@ from odoo import models, fields, api, tools
 from odoo.exceptions import ValidationError
 from datetime import datetime, date, timedelta
 import math
+from .hr_vacation_balance import _BALANCE_FIELDS
 
 class HrLeaveInherit(models.Model):
     _inherit = 'hr.leave'
@@ -30,6 +31,71 @@ class HrLeaveInherit(models.Model):
         # default=12.0 # Behövs inte om related
     )
 
+    # Fields read by the SESICK and SEPARSUPP salary rules
+    _PAYSLIP_INPUT_FIELDS = {
+        'employee_id', 'holiday_status_id', 'state', 'date_from', 'date_to', 'number_of_days',
+        'sickness_benefit_percentage', 'salary_supplement', 'supplement_percentage', 'benefit_percentage',
+        'is_karensdag',
+    }
+
+    # Fields the vacation balances, sick leave statistics and parental benefit ledgers are built from
+    _LEDGER_FIELDS = _BALANCE_FIELDS | {'parental_leave_type', 'benefit_percentage', 'child_id', 'child_birth_date'}
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        leaves = super().create(vals_list)
+        leaves._mark_payslips_dirty()
+        self._refresh_ledgers(leaves._get_ledger_keys())
+        return leaves
+
+    def write(self, vals):
+        dirties_payslips = bool(self._PAYSLIP_INPUT_FIELDS.intersection(vals))
+        moves_ledgers = bool(self._LEDGER_FIELDS.intersection(vals))
+        if not dirties_payslips and not moves_ledgers:
+            return super().write(vals)
+        ledger_keys = self._get_ledger_keys() if moves_ledgers else None
+        if dirties_payslips:
+            self._mark_payslips_dirty()
+        res = super().write(vals)
+        if dirties_payslips:
+            self._mark_payslips_dirty()
+        if moves_ledgers:
+            self._refresh_ledgers(ledger_keys, self._get_ledger_keys())
+        return res
+
+    def unlink(self):
+        self._mark_payslips_dirty()
+        ledger_keys = self._get_ledger_keys()
+        res = super().unlink()
+        self._refresh_ledgers(ledger_keys)
+        return res
+
+    def _get_ledger_keys(self):
+        """Return the vacation balances, sick leave statistics and parental ledgers the leaves count in"""
+        return {
+            'vacation': self.env['hr.swedish.vacation.balance']._get_balance_keys(self),
+            'sick': {leave.employee_id.id for leave in self if leave.is_swedish_sick_leave and leave.employee_id},
+            'parental': {leave.employee_id.id for leave in self if leave.is_swedish_parental_leave and leave.employee_id},
+        }
+
+    @api.model
+    def _refresh_ledgers(self, *key_sets):
+        keys = {ledger: set().union(*(key_set[ledger] for key_set in key_sets)) for ledger in ('vacation', 'sick', 'parental')}
+        self.env['hr.swedish.vacation.balance']._refresh_balances(keys['vacation'])
+        self.env['hr.employee']._refresh_sick_leave_statistics(keys['sick'])
+        self.env['hr.employee.child']._refresh_parental_ledger(keys['parental'])
+
+    def _mark_payslips_dirty(self):
+        leaves = self.filtered(lambda l: l.is_swedish_sick_leave or l.is_swedish_parental_leave)
+        for rule_code, rule_leaves in (
+            ('SESICK', leaves.filtered('is_swedish_sick_leave')),
+            ('SEPARSUPP', leaves.filtered('is_swedish_parental_leave')),
+        ):
+            self.env['hr.payslip']._mark_swedish_dirty([
+                (leave.employee_id.id, leave.date_from.date(), leave.date_to.date())
+                for leave in rule_leaves if leave.date_from and leave.date_to
+            ], [rule_code])
+
     @api.depends('holiday_status_id')
     def _compute_is_swedish_vacation(self):
         # Använd raise_if_not_found=False för att undvika fel om ID inte finns vid installation
@@ -233,6 +299,13 @@ class HrLeaveInherit(models.Model):
         help='Case number from the Swedish Social Insurance Agency',
         tracking=True
     )
+    child_id = fields.Many2one(
+        'hr.employee.child',
+        string='Child',
+        index=True,
+        domain="[('employee_id', '=', employee_id)]",
+        help='Child whose parental benefit days the leave draws from'
+    )
     child_birth_date = fields.Date(string='Child Birth Date', tracking=True)
     child_name = fields.Char(string='Child Name', tracking=True) # Kanske hämta från hr.employee.child?
     child_personnummer = fields.Char(string='Child Personal ID Number', tracking=True) # Kanske hämta?
@@ -263,6 +336,13 @@ class HrLeaveInherit(models.Model):
             else:
                  leave.is_swedish_parental_leave = False
 
+    @api.onchange('child_id')
+    def _onchange_child_id(self):
+        if self.child_id:
+            self.child_name = self.child_id.name
+            self.child_birth_date = self.child_id.birth_date
+            self.child_personnummer = self.child_id.personnummer
+
     # Onchange för att sätta defaultvärden, verkar ok
     @api.onchange('parental_leave_type')
     def _onchange_parental_leave_type(self):
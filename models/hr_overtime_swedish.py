@@ -1,6 +1,9 @@
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError
-from datetime import datetime, date, timedelta
+from psycopg2.extras import execute_values
+
+# Overtime counted against the limits and in the employee statistics
+_COUNTED_STATES = ('approved', 'paid')
 
 class HrOvertime(models.Model):
     _name = 'hr.overtime.swedish'
@@ -81,7 +84,56 @@ class HrOvertime(models.Model):
     manager_id = fields.Many2one('hr.employee', string='Approved By')
     approval_date = fields.Datetime(string='Approval Date')
     rejection_reason = fields.Text(string='Rejection Reason')
+    payslip_id = fields.Many2one('hr.payslip', string='Paid in Payslip', readonly=True, copy=False, index=True)
     
+    # Fields read by the SEOVT salary rule
+    _PAYSLIP_INPUT_FIELDS = {
+        'employee_id', 'date', 'state', 'time_start', 'time_end', 'overtime_type', 'compensation_type',
+    }
+
+    # Fields the overtime summaries and the limit checks depend on
+    _SUMMARY_FIELDS = {'employee_id', 'date', 'state', 'time_start', 'time_end'}
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._mark_payslips_dirty()
+        self.env['hr.overtime.swedish.summary']._refresh_summaries(records._get_summary_keys())
+        records._check_overtime_limits()
+        return records
+
+    def write(self, vals):
+        dirties_payslips = bool(self._PAYSLIP_INPUT_FIELDS.intersection(vals))
+        moves_summary = bool(self._SUMMARY_FIELDS.intersection(vals))
+        if not dirties_payslips and not moves_summary:
+            return super().write(vals)
+        summary_keys = self._get_summary_keys() if moves_summary else set()
+        if dirties_payslips:
+            self._mark_payslips_dirty()
+        res = super().write(vals)
+        if dirties_payslips:
+            self._mark_payslips_dirty()
+        if moves_summary:
+            self.env['hr.overtime.swedish.summary']._refresh_summaries(summary_keys | self._get_summary_keys())
+        if 'employee_id' in vals or 'date' in vals:
+            self._check_overtime_limits()
+        return res
+
+    def unlink(self):
+        self._mark_payslips_dirty()
+        summary_keys = self._get_summary_keys()
+        res = super().unlink()
+        self.env['hr.overtime.swedish.summary']._refresh_summaries(summary_keys)
+        return res
+
+    def _get_summary_keys(self):
+        return {(record.employee_id.id, record.date.year) for record in self if record.employee_id and record.date}
+
+    def _mark_payslips_dirty(self):
+        self.env['hr.payslip']._mark_swedish_dirty(
+            [(record.employee_id.id, record.date, record.date) for record in self], ['SEOVT']
+        )
+
     @api.depends('date')
     def _compute_is_weekend(self):
         for record in self:
@@ -186,63 +238,50 @@ class HrOvertime(models.Model):
             if record.time_start < 0 or record.time_start >= 24 or record.time_end < 0 or record.time_end >= 24:
                 raise ValidationError("Time must be between 0 and 24.")
     
-    @api.constrains('employee_id', 'date')
     def _check_overtime_limits(self):
-        for record in self:
+        """Check the monthly (48 hours) and yearly (200 hours) overtime limits
+
+        Called after the summaries are refreshed, so the totals read from
+        hr.overtime.swedish.summary already include approved and paid records
+        of the batch; their own hours are taken out and added back once.
+        """
+        records = self.filtered(lambda r: r.employee_id and r.date and r.overtime_type != 'emergency')
+        if not records:
+            return
+        hours = self.env['hr.overtime.swedish.summary']._get_hours(
+            records.employee_id.ids, {record.date.year for record in records})
+        for record in records:
+            own_hours = record.duration if record.state in _COUNTED_STATES else 0.0
+            employee_id, year, month = record.employee_id.id, record.date.year, record.date.month
+
             # Check monthly limits (typically 48 hours in Sweden)
-            month_start = record.date.replace(day=1)
-            month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-            
-            domain = [
-                ('employee_id', '=', record.employee_id.id),
-                ('date', '>=', month_start),
-                ('date', '<=', month_end),
-                ('state', 'in', ['approved', 'paid']),
-                ('id', '!=', record.id)
-            ]
-            
-            existing_overtime = self.search(domain)
-            total_hours = sum(existing_overtime.mapped('duration')) + record.duration
-            
-            if total_hours > 48 and record.overtime_type != 'emergency':
+            total_hours = hours.get((employee_id, year, month), (0.0, 0))[0] - own_hours + record.duration
+            if total_hours > 48:
                 raise ValidationError(
                     "Monthly overtime limit (48 hours) would be exceeded. "
                     "Use 'Emergency Overtime' if this is an exceptional situation."
                 )
-            
+
             # Check yearly limits (typically 200 hours in Sweden)
-            year_start = date(record.date.year, 1, 1)
-            year_end = date(record.date.year, 12, 31)
-            
-            domain = [
-                ('employee_id', '=', record.employee_id.id),
-                ('date', '>=', year_start),
-                ('date', '<=', year_end),
-                ('state', 'in', ['approved', 'paid']),
-                ('id', '!=', record.id)
-            ]
-            
-            existing_overtime = self.search(domain)
-            total_hours = sum(existing_overtime.mapped('duration')) + record.duration
-            
-            if total_hours > 200 and record.overtime_type != 'emergency':
+            total_hours = hours.get((employee_id, year, 0), (0.0, 0))[0] - own_hours + record.duration
+            if total_hours > 200:
                 raise ValidationError(
                     "Yearly overtime limit (200 hours) would be exceeded. "
                     "Use 'Emergency Overtime' if this is an exceptional situation."
                 )
-    
+
     def action_submit(self):
         for record in self:
             record.write({'state': 'submitted'})
     
     def action_approve(self):
+        # One write for the whole selection, so the summaries are refreshed once
+        self.write({
+            'state': 'approved',
+            'manager_id': self.env.user.employee_id.id,
+            'approval_date': fields.Datetime.now()
+        })
         for record in self:
-            record.write({
-                'state': 'approved',
-                'manager_id': self.env.user.employee_id.id,
-                'approval_date': fields.Datetime.now()
-            })
-            
             # If time compensation, create time off allocation
             if record.compensation_type in ['time', 'mixed'] and record.time_compensation_hours > 0:
                 self._create_time_off_allocation(record)
@@ -291,3 +330,74 @@ class HrOvertime(models.Model):
             'state': 'validate',
             'date_from': fields.Date.today(),
         })
+
+
+class HrOvertimeSummary(models.Model):
+    _name = 'hr.overtime.swedish.summary'
+    _description = 'Swedish Overtime Summary'
+    _order = 'year desc, month, employee_id'
+
+    employee_id = fields.Many2one('hr.employee', string='Employee', required=True, ondelete='cascade', index=True)
+    year = fields.Integer(string='Year', required=True)
+    month = fields.Integer(string='Month', required=True, help='0 for the whole year')
+    hours = fields.Float(string='Hours', readonly=True)
+    overtime_count = fields.Integer(string='Overtime Records', readonly=True)
+
+    _sql_constraints = [
+        ('employee_period_unique', 'unique(employee_id, year, month)', 'Only one overtime summary per employee and period.')
+    ]
+
+    @api.model
+    def _refresh_summaries(self, keys):
+        """Recompute the month and year rows of the given (employee_id, year) keys
+
+        Approved and paid overtime is summed per month and per year with
+        GROUPING SETS; the rows of the keys are replaced in two statements.
+        Payslip confirmation moves overtime from approved to paid in SQL,
+        which leaves these totals unchanged.
+        """
+        keys = sorted({(employee_id, year) for employee_id, year in keys if employee_id and year})
+        if not keys:
+            return
+        self.env['hr.overtime.swedish'].flush_model(['employee_id', 'date', 'state', 'duration'])
+        cr = self.env.cr._obj
+        execute_values(cr, """
+            DELETE FROM hr_overtime_swedish_summary s
+             USING (VALUES %s) AS k(employee_id, year)
+             WHERE s.employee_id = k.employee_id AND s.year = k.year
+        """, keys, template='(%s::int, %s::int)')
+        execute_values(cr, """
+            INSERT INTO hr_overtime_swedish_summary
+                   (employee_id, year, month, hours, overtime_count, create_uid, create_date, write_uid, write_date)
+            SELECT o.employee_id, k.year, COALESCE(EXTRACT(MONTH FROM o.date)::int, 0),
+                   SUM(o.duration), COUNT(*), %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+              FROM hr_overtime_swedish o
+              JOIN (VALUES %%s) AS k(employee_id, year)
+                ON o.employee_id = k.employee_id AND EXTRACT(YEAR FROM o.date)::int = k.year
+             WHERE o.state IN ('approved', 'paid')
+          GROUP BY GROUPING SETS ((o.employee_id, k.year, EXTRACT(MONTH FROM o.date)::int), (o.employee_id, k.year))
+        """ % {'uid': int(self.env.uid)}, keys, template='(%s::int, %s::int)')
+        self.invalidate_model()
+
+    @api.model
+    def _rebuild_summaries(self):
+        """Recompute every summary, e.g. after installing or upgrading the module"""
+        self.env['hr.overtime.swedish'].flush_model(['employee_id', 'date'])
+        self.env.cr.execute("""
+            SELECT DISTINCT employee_id, EXTRACT(YEAR FROM date)::int FROM hr_overtime_swedish
+             WHERE employee_id IS NOT NULL AND date IS NOT NULL
+             UNION
+            SELECT employee_id, year FROM hr_overtime_swedish_summary
+        """)
+        self._refresh_summaries(self.env.cr.fetchall())
+
+    @api.model
+    def _get_hours(self, employee_ids, years):
+        """Return {(employee_id, year, month): (hours, count)}, month 0 being the whole year"""
+        summaries = self.search_read(
+            [('employee_id', 'in', list(employee_ids)), ('year', 'in', list(years))],
+            ['employee_id', 'year', 'month', 'hours', 'overtime_count'])
+        return {
+            (summary['employee_id'][0], summary['year'], summary['month']): (summary['hours'], summary['overtime_count'])
+            for summary in summaries
+        }
@@ -0,0 +1,108 @@
+from odoo import models, fields, api
+from contextlib import contextmanager
+import base64
+import json
+import time
+
+
+@contextmanager
+def _measure_queries(cr, stats):
+    """Add the wall time, query count and fetched rows of the block to stats"""
+    execute = cr.execute
+    outer_execute = cr.__dict__.get('execute')  # set by an enclosing measurement
+    counters = {'queries': 0, 'rows': 0}
+
+    def counting_execute(query, params=None, log_exceptions=True):
+        res = execute(query, params, log_exceptions)
+        counters['queries'] += 1
+        if cr._obj.description is not None:
+            counters['rows'] += max(cr._obj.rowcount, 0)
+        return res
+
+    cr.execute = counting_execute
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if outer_execute is None:
+            del cr.execute
+        else:
+            cr.execute = outer_execute
+        stats['duration'] += (time.perf_counter() - start) * 1000.0
+        stats['query_count'] += counters['queries']
+        stats['rows_fetched'] += counters['rows']
+
+
+class HrPayrollRuleStat(models.Model):
+    _name = 'hr.payroll.rule.stat'
+    _description = 'Payroll Rule Statistics'
+    _order = 'id desc'
+    _rec_name = 'rule_code'
+
+    payslip_id = fields.Many2one('hr.payslip', string='Payslip', required=True, ondelete='cascade', index=True)
+    payslip_run_id = fields.Many2one(related='payslip_id.payslip_run_id', string='Payslip Batch', store=True)
+    rule_id = fields.Many2one('hr.salary.rule', string='Salary Rule', ondelete='cascade',
+                              help='Empty for the totals of the whole payslip')
+    rule_code = fields.Char(string='Rule Code', readonly=True)
+    duration = fields.Float(string='Wall Time (ms)', group_operator='sum')
+    query_count = fields.Integer(string='SQL Queries', group_operator='sum')
+    rows_fetched = fields.Integer(string='Rows Fetched', group_operator='sum')
+
+    @api.model
+    def _is_instrumentation_enabled(self):
+        return bool(self.env.context.get('payroll_instrumentation')
+                    or self.env['ir.config_parameter'].sudo().get_param('l10n_se_hr.payroll_instrumentation'))
+
+    @api.model
+    def _get_collector(self):
+        """Per-transaction accumulator of rule stats, None when not recording"""
+        return self.env.cr.cache.get('l10n_se_hr_rule_stats')
+
+    @api.model
+    @contextmanager
+    def _record_rule(self, rule):
+        collector = self._get_collector()
+        if collector is None:
+            yield
+            return
+        stats = collector.setdefault(rule.id, {'rule_code': rule.code, 'duration': 0.0, 'query_count': 0, 'rows_fetched': 0})
+        with _measure_queries(self.env.cr, stats):
+            yield
+
+    @api.model
+    def _record_payslip(self, payslip, compute):
+        """Run compute() for one payslip and store its rule and total stats"""
+        cr = self.env.cr
+        cr.cache['l10n_se_hr_rule_stats'] = collector = {}
+        totals = {'duration': 0.0, 'query_count': 0, 'rows_fetched': 0}
+        try:
+            with _measure_queries(cr, totals):
+                compute()
+        finally:
+            del cr.cache['l10n_se_hr_rule_stats']
+        vals_list = [dict(stats, payslip_id=payslip.id, rule_id=rule_id) for rule_id, stats in collector.items()]
+        vals_list.append(dict(totals, payslip_id=payslip.id, rule_code='TOTAL'))
+        self.sudo().create(vals_list)
+
+    def action_export_json(self):
+        """Download the selected statistics as a JSON file"""
+        data = [{
+            'payslip': stat.payslip_id.name,
+            'payslip_id': stat.payslip_id.id,
+            'payslip_run_id': stat.payslip_run_id.id,
+            'rule_code': stat.rule_code,
+            'duration_ms': stat.duration,
+            'query_count': stat.query_count,
+            'rows_fetched': stat.rows_fetched,
+            'recorded_at': fields.Datetime.to_string(stat.create_date),
+        } for stat in self]
+        attachment = self.env['ir.attachment'].create({
+            'name': 'payroll_rule_stats.json',
+            'mimetype': 'application/json',
+            'datas': base64.b64encode(json.dumps(data, indent=2).encode()),
+        })
+        return {
+            'type': 'ir.actions.act_url',
+            'url': '/web/content/%s?download=true' % attachment.id,
+            'target': 'self',
+        }
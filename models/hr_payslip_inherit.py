@@ -1,6 +1,28 @@
-from odoo import models, fields, api
-from datetime import datetime, date
-import math
+import odoo
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.osv import expression
+from psycopg2.extras import execute_values
+from collections import defaultdict
+from datetime import timedelta
+import logging
+import numpy as np
+
+_logger = logging.getLogger(__name__)
+
+# Rates used by the SETAX and SECHURCH rules for employees without a municipality
+_DEFAULT_TAX_RATE = 30.0
+_DEFAULT_CHURCH_TAX_RATE = 1.0
+
+# Copies of the chunk computation cron. Odoo runs a cron in one worker at a
+# time, the copies let several workers compute chunks of a run in parallel.
+_CHUNK_CRON_XMLIDS = (
+    'l10n_se_hr.ir_cron_compute_payslip_chunks',
+    'l10n_se_hr.ir_cron_compute_payslip_chunks_2',
+    'l10n_se_hr.ir_cron_compute_payslip_chunks_3',
+    'l10n_se_hr.ir_cron_compute_payslip_chunks_4',
+)
+
 
 class HrPayslipInherit(models.Model):
     _inherit = 'hr.payslip'
@@ -22,41 +44,420 @@ class HrPayslipInherit(models.Model):
     
     church_tax_applied = fields.Boolean(string='Church Tax Applied', compute='_compute_church_tax_applied')
     tax_table_number = fields.Char(related='employee_id.tax_table_number', string='Tax Table Number', readonly=True)
+
+    # Period data read by the Swedish salary rules, computed for the whole
+    # prefetch batch at once so rule evaluation does not search per employee
+    swedish_overtime_ids = fields.Many2many(
+        'hr.overtime.swedish', string='Overtime to Pay', compute='_compute_swedish_period_data',
+        help='Approved overtime with money compensation in the payslip period')
+    swedish_computed_overtime_ids = fields.Many2many(
+        'hr.overtime.swedish', 'hr_payslip_swedish_overtime_rel', 'payslip_id', 'overtime_id',
+        string='Computed Overtime', copy=False, readonly=True,
+        help='Overtime included when the payslip was last computed, marked as paid on confirmation')
+    swedish_sick_leave_ids = fields.Many2many(
+        'hr.leave', string='Sick Leaves', compute='_compute_swedish_period_data')
+    swedish_parental_leave_ids = fields.Many2many(
+        'hr.leave', string='Parental Leaves with Supplement', compute='_compute_swedish_period_data')
+
+    # Set when overtime, leaves or municipality rates read by the Swedish
+    # rules change after the payslip was computed
+    swedish_dirty = fields.Boolean(string='Needs Recompute', index=True, copy=False, readonly=True)
+    swedish_dirty_rules = fields.Char(string='Outdated Rules', copy=False, readonly=True,
+                                      help='Codes of the salary rules whose inputs changed')
     
     @api.depends('employee_id')
     def _compute_church_tax_applied(self):
         for payslip in self:
             payslip.church_tax_applied = payslip.employee_id.church_member
 
-    def action_compute_tax(self):
+    @api.depends('employee_id', 'date_from', 'date_to')
+    def _compute_swedish_period_data(self):
+        slips = self.filtered(lambda slip: slip.employee_id and slip.date_from and slip.date_to)
+        (self - slips).update({
+            'swedish_overtime_ids': False,
+            'swedish_sick_leave_ids': False,
+            'swedish_parental_leave_ids': False,
+        })
+        if not slips:
+            return
+
+        employee_ids = slips.employee_id.ids
+        period_start = min(slips.mapped('date_from'))
+        period_end = max(slips.mapped('date_to'))
+
+        overtime_by_employee = defaultdict(list)
+        for overtime in self.env['hr.overtime.swedish'].search([
+            ('employee_id', 'in', employee_ids),
+            ('date', '>=', period_start),
+            ('date', '<=', period_end),
+            ('state', '=', 'approved'),
+            ('compensation_type', 'in', ['money', 'mixed'])
+        ]):
+            overtime_by_employee[overtime.employee_id.id].append(overtime)
+
+        leaves_by_employee = defaultdict(list)
+        for leave in self.env['hr.leave'].search([
+            ('employee_id', 'in', employee_ids),
+            ('date_from', '>=', period_start),
+            ('date_to', '<=', period_end + timedelta(days=1)),
+            ('state', 'in', ['validate', 'validate1']),
+            '|',
+            ('is_swedish_sick_leave', '=', True),
+            '&',
+            ('is_swedish_parental_leave', '=', True),
+            ('salary_supplement', '=', True)
+        ]):
+            leaves_by_employee[leave.employee_id.id].append(leave)
+
+        for slip in slips:
+            employee_id = slip.employee_id.id
+            leaves = [
+                leave for leave in leaves_by_employee[employee_id]
+                if leave.date_from.date() >= slip.date_from and leave.date_to.date() <= slip.date_to
+            ]
+            slip.swedish_overtime_ids = [
+                overtime.id for overtime in overtime_by_employee[employee_id]
+                if slip.date_from <= overtime.date <= slip.date_to
+            ]
+            slip.swedish_sick_leave_ids = [leave.id for leave in leaves if leave.is_swedish_sick_leave]
+            slip.swedish_parental_leave_ids = [
+                leave.id for leave in leaves if leave.is_swedish_parental_leave and leave.salary_supplement
+            ]
+
+    @api.model
+    def _mark_swedish_dirty(self, periods, rule_codes):
+        """Flag computed payslips whose inputs changed
+
+        periods is a list of (employee_id, date_from, date_to) touched by the
+        change; every draft or waiting payslip of the employee overlapping
+        the dates is flagged with the given rule codes.
+        """
+        periods = {period for period in periods if period[0] and period[1]}
+        if not periods:
+            return
+        domain = expression.OR([[
+            ('employee_id', '=', employee_id),
+            ('date_from', '<=', date_to or date_from),
+            ('date_to', '>=', date_from),
+        ] for employee_id, date_from, date_to in periods])
+        slips = self.search(expression.AND([[('state', 'in', ['draft', 'verify']), ('line_ids', '!=', False)], domain]))
+        self._flag_swedish_dirty(slips, rule_codes)
+
+    @api.model
+    def _flag_swedish_dirty(self, slips, rule_codes):
+        slips_by_rules = defaultdict(lambda: self.browse())
+        for slip in slips:
+            codes = set(slip.swedish_dirty_rules.split(',')) if slip.swedish_dirty_rules else set()
+            slips_by_rules[','.join(sorted(codes | set(rule_codes)))] |= slip
+        for codes, grouped_slips in slips_by_rules.items():
+            grouped_slips.write({'swedish_dirty': True, 'swedish_dirty_rules': codes})
+
+    def compute_sheet(self):
+        self.filtered('swedish_dirty').write({'swedish_dirty': False, 'swedish_dirty_rules': False})
+        # Remember the overtime SEOVT pays, confirmation settles exactly that
+        self.invalidate_recordset(['swedish_overtime_ids'])
+        for payslip in self:
+            payslip.swedish_computed_overtime_ids = [(6, 0, payslip.swedish_overtime_ids.ids)]
+        RuleStat = self.env['hr.payroll.rule.stat']
+        if not RuleStat._is_instrumentation_enabled():
+            return super().compute_sheet()
+        # One payslip at a time so the statistics can be attributed to it
+        res = True
         for payslip in self:
-            # Get tax rates from municipality
-            total_tax_rate = payslip.employee_id.municipality_id.total_tax_rate / 100.0
-            church_tax_rate = 0.0
-            if payslip.church_tax_applied:
-                church_tax_rate = payslip.employee_id.municipality_id.church_tax_rate / 100.0
-            
-            # Calculate taxes for each line
-            for line in payslip.line_ids.filtered(lambda l: l.category_id.code == 'GROSS'):
-                taxable_amount = line.amount
-                
-                # Basic tax calculation
-                tax_amount = taxable_amount * total_tax_rate
-                
-                # Add church tax if applicable
-                if payslip.church_tax_applied:
-                    church_tax = taxable_amount * church_tax_rate
-                    tax_amount += church_tax
-                
-                # Find or create tax line
-                tax_line = payslip.line_ids.filtered(lambda l: l.code == 'TAX')
-                if tax_line:
-                    tax_line.amount = tax_amount
-                else:
-                    # This would need the appropriate salary rule to be configured
-                    pass
-                    
-                # Calculate net amount
-                net_line = payslip.line_ids.filtered(lambda l: l.code == 'NET')
-                if net_line:
-                    net_line.amount = taxable_amount - tax_amount
\ No newline at end of file
+            def compute(payslip=payslip):
+                nonlocal res
+                res = super(HrPayslipInherit, payslip).compute_sheet()
+            RuleStat._record_payslip(payslip, compute)
+        return res
+
+    def action_payslip_done(self):
+        dirty_slips = self.filtered('swedish_dirty')
+        if dirty_slips:
+            raise UserError(_("The following payslips must be recomputed before confirmation, their inputs changed:\n%s") % '\n'.join(
+                "%s (%s)" % (slip.name, slip.swedish_dirty_rules or "") for slip in dirty_slips
+            ))
+        res = super().action_payslip_done()
+        self._settle_swedish_overtime()
+        return res
+
+    def _settle_swedish_overtime(self):
+        """Mark the overtime the payslips were computed with as paid, in one UPDATE"""
+        values = [(overtime.id, slip.id) for slip in self for overtime in slip.swedish_computed_overtime_ids]
+        if not values:
+            return
+        Overtime = self.env['hr.overtime.swedish']
+        Overtime.flush_model(['state', 'payslip_id'])
+        execute_values(self.env.cr._obj, """
+            UPDATE hr_overtime_swedish AS overtime
+               SET state = 'paid',
+                   payslip_id = v.payslip_id,
+                   write_uid = %s,
+                   write_date = now() at time zone 'UTC'
+              FROM (VALUES %%s) AS v(id, payslip_id)
+             WHERE overtime.id = v.id
+               AND overtime.state = 'approved'
+        """ % self.env.uid, values, page_size=5000)
+        Overtime.invalidate_model(['state', 'payslip_id'])
+
+    def action_compute_tax(self):
+        self._compute_tax_batch()
+
+    def _compute_tax_batch(self):
+        """Compute municipal and church tax for all payslips in one pass
+
+        Gross amounts and tax rates are collected into arrays, the taxes are
+        computed vectorized and the TAX/NET lines are written back with a
+        single UPDATE.
+        """
+        if not self:
+            return
+
+        gross_by_slip = dict.fromkeys(self.ids, 0.0)
+        tax_line_ids = {}
+        net_line_ids = {}
+        for line in self.line_ids:
+            slip_id = line.slip_id.id
+            if line.category_id.code == 'GROSS':
+                gross_by_slip[slip_id] += line.amount
+            if line.code == 'TAX':
+                tax_line_ids[slip_id] = line.id
+            elif line.code == 'NET':
+                net_line_ids[slip_id] = line.id
+
+        gross = np.fromiter((gross_by_slip[slip.id] for slip in self), dtype=float, count=len(self))
+        # Rates in effect in each slip's income year, from one preloaded map per year
+        Municipality = self.env['res.municipality']
+        Parish = self.env['res.parish']
+        slip_rates = []
+        missing = set()
+        for slip in self:
+            year = (slip.date_to or fields.Date.context_today(slip)).year
+            municipality = slip.employee_id.municipality_id
+            if municipality:
+                rates = Municipality._get_rate_map(year).get(municipality.id)
+            else:
+                rates = (_DEFAULT_TAX_RATE, _DEFAULT_CHURCH_TAX_RATE)
+            if rates is None:
+                missing.add("%s (%s)" % (municipality.name, year))
+                continue
+            total_rate, church_rate = rates
+            parish = slip.employee_id.parish_id
+            if parish and slip.church_tax_applied:
+                # Church fees are decided per parish
+                church_rate = Parish._get_church_rate_map(year).get(parish.id)
+                if church_rate is None:
+                    missing.add("%s (%s)" % (parish.name, year))
+                    continue
+            slip_rates.append((total_rate, church_rate))
+        if missing:
+            raise UserError(_("No tax rates for:\n%s\nUpdate the municipality tax rates first.") % '\n'.join(sorted(missing)))
+        tax_rates = np.fromiter((rates[0] for rates in slip_rates), dtype=float, count=len(self)) / 100.0
+        church_rates = np.fromiter(
+            (rates[1] if slip.church_tax_applied else 0.0 for slip, rates in zip(self, slip_rates)),
+            dtype=float, count=len(self)
+        ) / 100.0
+
+        tax_amounts = gross * (tax_rates + church_rates)
+        net_amounts = gross - tax_amounts
+
+        values = []
+        for slip_id, tax_amount, net_amount in zip(self.ids, tax_amounts.tolist(), net_amounts.tolist()):
+            # Slips without a TAX line would need the appropriate salary rule to be configured
+            if slip_id in tax_line_ids:
+                values.append((tax_line_ids[slip_id], tax_amount))
+            if slip_id in net_line_ids:
+                values.append((net_line_ids[slip_id], net_amount))
+        self._write_line_amounts(values)
+
+    def _write_line_amounts(self, values):
+        """Bulk update (line_id, amount) pairs, keeping the stored total in sync
+
+        The lines are then marked as modified, so the stored payslip fields
+        computed from their totals (gross and net wage) are recomputed.
+        """
+        if not values:
+            return
+        Line = self.env['hr.payslip.line']
+        Line.flush_model(['amount', 'quantity', 'rate'])
+        execute_values(self.env.cr._obj, """
+            UPDATE hr_payslip_line AS line
+               SET amount = v.amount,
+                   total = v.amount * line.quantity * line.rate / 100.0,
+                   write_uid = %s,
+                   write_date = now() at time zone 'UTC'
+              FROM (VALUES %%s) AS v(id, amount)
+             WHERE line.id = v.id
+        """ % self.env.uid, values, page_size=5000)
+        lines = Line.browse([line_id for line_id, _amount in values])
+        lines.invalidate_recordset(['amount', 'total', 'write_uid', 'write_date'])
+        lines.modified(['amount', 'total'])
+
+
+class HrPayslipRunInherit(models.Model):
+    _inherit = 'hr.payslip.run'
+
+    def action_compute_tax(self):
+        self.slip_ids._compute_tax_batch()
+
+    def action_recompute_dirty(self):
+        """Recompute only the payslips whose inputs changed since computation"""
+        dirty_slips = self.env['hr.payslip'].search([('payslip_run_id', 'in', self.ids), ('swedish_dirty', '=', True)])
+        if dirty_slips:
+            dirty_slips.compute_sheet()
+        return True
+
+    def action_compute_sheets_parallel(self):
+        """Queue the runs' payslips for computation by the cron workers
+
+        Payslips are chunked per company and department, keeping all slips
+        of an employee in the same chunk so the side effects of the Swedish
+        rules on overtime never race between workers. Each chunk is computed
+        in its own transaction by one of hr.payslip.compute.chunk's crons,
+        as many of them are triggered as there are chunks.
+        """
+        chunk_size = int(self.env['ir.config_parameter'].sudo().get_param('l10n_se_hr.payroll_chunk_size', 200))
+        chunks = self._get_parallel_chunks(chunk_size)
+        if not chunks:
+            return True
+        self.env['hr.payslip.compute.chunk'].create([{
+            'payslip_run_id': self.env['hr.payslip'].browse(slip_ids[0]).payslip_run_id.id,
+            'slip_ids': [(6, 0, slip_ids)],
+        } for slip_ids in chunks])
+        for xmlid in _CHUNK_CRON_XMLIDS[:len(chunks)]:
+            cron = self.env.ref(xmlid, raise_if_not_found=False)
+            if cron:
+                cron._trigger()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Payslip computation queued"),
+                'message': _("%s chunks of payslips will be computed in the background.") % len(chunks),
+                'type': 'info',
+                'sticky': False,
+            },
+        }
+
+    def action_view_compute_chunks(self):
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _("Payslip Computation"),
+            'res_model': 'hr.payslip.compute.chunk',
+            'view_mode': 'tree,form',
+            'domain': [('payslip_run_id', 'in', self.ids)],
+        }
+
+    def _get_parallel_chunks(self, chunk_size):
+        """Split the draft payslips into lists of ids per company/department"""
+        slips_by_employee = defaultdict(list)
+        for slip in self.slip_ids.filtered(lambda slip: slip.state in ('draft', 'verify')):
+            slips_by_employee[slip.employee_id].append(slip.id)
+
+        employees_by_group = defaultdict(list)
+        for employee in slips_by_employee:
+            employees_by_group[(employee.company_id.id, employee.department_id.id)].append(employee)
+
+        chunks = []
+        for employees in employees_by_group.values():
+            chunk = []
+            for employee in employees:
+                chunk.extend(slips_by_employee[employee])
+                if len(chunk) >= chunk_size:
+                    chunks.append(chunk)
+                    chunk = []
+            if chunk:
+                chunks.append(chunk)
+        return chunks
+
+
+class HrPayslipComputeChunk(models.Model):
+    _name = 'hr.payslip.compute.chunk'
+    _description = 'Queued Payslip Computation'
+    _order = 'id'
+
+    payslip_run_id = fields.Many2one('hr.payslip.run', string='Payslip Batch', ondelete='cascade', index=True)
+    slip_ids = fields.Many2many('hr.payslip', string='Payslips')
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Status', default='queued', required=True, index=True)
+    error = fields.Text(string='Error', readonly=True)
+    reported = fields.Boolean(string='Reported', readonly=True,
+                              help='Included in the summary sent once all chunks of the run were computed')
+
+    @api.model
+    def _cron_compute_chunks(self):
+        """Compute queued chunks, each in its own transaction
+
+        Several copies of this cron are triggered together, each runs in
+        its own cron worker. Chunks are claimed with SKIP LOCKED, so the
+        copies share the queue without computing a chunk twice. A failing
+        chunk is rolled back and marked as failed without affecting the
+        others.
+        """
+        registry = odoo.registry(self.env.cr.dbname)
+        while True:
+            with registry.cursor() as cr:
+                env = api.Environment(cr, self.env.uid, self.env.context)
+                chunk = env[self._name]._claim_next_chunk()
+                if not chunk:
+                    return
+                run_id = chunk.payslip_run_id.id
+                chunk._compute_chunk()
+            if run_id:
+                with registry.cursor() as cr:
+                    api.Environment(cr, self.env.uid, self.env.context)[self._name]._report_finished_run(run_id)
+
+    @api.model
+    def _claim_next_chunk(self):
+        self.env.cr.execute("""
+            SELECT id FROM hr_payslip_compute_chunk
+             WHERE state = 'queued'
+          ORDER BY id
+             LIMIT 1
+               FOR UPDATE SKIP LOCKED
+        """)
+        row = self.env.cr.fetchone()
+        return self.browse(row[0] if row else [])
+
+    def _compute_chunk(self):
+        self.ensure_one()
+        slips = self.slip_ids.filtered(lambda slip: slip.state in ('draft', 'verify'))
+        try:
+            with self.env.cr.savepoint():
+                slips.compute_sheet()
+        except Exception as e:
+            _logger.exception("Payslip computation failed for slips %s", slips.ids)
+            self.write({'state': 'failed', 'error': str(e)})
+        else:
+            self.write({'state': 'done', 'error': False})
+
+    @api.model
+    def _report_finished_run(self, run_id):
+        """Notify the users who queued a run once none of its chunks is left
+
+        Called after each chunk's transaction committed and serialized by a
+        lock on the run, so the worker finishing the last chunk sees all the
+        others finished and the summary is sent once.
+        """
+        self.env.cr.execute("SELECT id FROM hr_payslip_run WHERE id = %s FOR UPDATE", (run_id,))
+        chunks = self.search([('payslip_run_id', '=', run_id), ('reported', '=', False)])
+        if not chunks or 'queued' in chunks.mapped('state'):
+            return
+        chunks.write({'reported': True})
+
+        failed = chunks.filtered(lambda chunk: chunk.state == 'failed')
+        slip_count = len(chunks.slip_ids)
+        message = _("%s of %s payslips computed.") % (slip_count - len(failed.slip_ids), slip_count)
+        if failed:
+            message += "\n" + _("%s chunks failed:\n%s") % (len(failed), "\n".join(sorted(set(failed.mapped('error')))))
+        run = chunks.payslip_run_id
+        _logger.log(logging.WARNING if failed else logging.INFO, "Payslip batch %s: %s", run.name, message)
+        for user in chunks.create_uid:
+            self.env['bus.bus']._sendone(user.partner_id, 'simple_notification', {
+                'title': _("Payslip batch %s computed") % run.name,
+                'message': message,
+                'type': 'warning' if failed else 'success',
+                'sticky': bool(failed),
+            })
@@ -1,7 +1,102 @@
-from odoo import models, fields, api
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import UserError
+from odoo.tools.safe_eval import test_expr, check_values, unsafe_eval, _SAFE_OPCODES, _BUILTINS
+from lxml import etree
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# The salary rules are noupdate data, so changes to their code only reach
+# existing databases through _reload_swedish_rule_code in a migration
+_RULES_DATA_FILE = 'l10n_se_hr/data/l10n_se_hr_salary_rules_data.xml'
+_RELOADED_RULE_FIELDS = ('condition_select', 'condition_python', 'amount_select', 'amount_python_compute')
+
+# Lookups and misses of the compiled rule code cache in this worker
+_rule_code_stats = {'lookups': 0, 'misses': 0}
+
 
 class HrSalaryRule(models.Model):
     _inherit = 'hr.salary.rule'
     
     is_swedish_specific = fields.Boolean(string='Swedish Specific Rule')
     applies_church_tax = fields.Boolean(string='Applies Church Tax')
+
+    def write(self, vals):
+        res = super().write(vals)
+        if {'condition_python', 'amount_python_compute'} & set(vals):
+            # write_date does not change within a transaction
+            self._get_compiled_code.clear_cache(self)
+        return res
+
+    @api.model
+    def _reload_swedish_rule_code(self, xmlids):
+        """Rewrite the code of shipped rules from the module's data file
+
+        Only the condition and amount fields are reloaded, other changes
+        made to the rules in the database are kept.
+        """
+        with tools.file_open(_RULES_DATA_FILE, 'rb') as data_file:
+            records = {
+                record.get('id'): record
+                for record in etree.parse(data_file).iterfind('.//record[@model="hr.salary.rule"]')
+            }
+        for xmlid in xmlids:
+            rule = self.env.ref('l10n_se_hr.%s' % xmlid, raise_if_not_found=False)
+            if not rule or xmlid not in records:
+                _logger.warning("Salary rule %s not found, its code is not updated.", xmlid)
+                continue
+            rule.write({
+                field.get('name'): field.text
+                for field in records[xmlid].iterfind('field')
+                if field.get('name') in _RELOADED_RULE_FIELDS
+            })
+            _logger.info("Updated the code of salary rule %s.", xmlid)
+
+    @api.model
+    def get_compiled_code_stats(self):
+        """Return the hit/miss counters of this worker's compiled code cache"""
+        return {
+            'hits': _rule_code_stats['lookups'] - _rule_code_stats['misses'],
+            'misses': _rule_code_stats['misses'],
+        }
+
+    @tools.ormcache('rule_id', 'write_date', 'field_name')
+    def _get_compiled_code(self, rule_id, write_date, field_name):
+        """Compile the rule's python code once per rule version
+
+        The code goes through the opcode check of safe_eval, only the
+        compilation step is cached.
+        """
+        _rule_code_stats['misses'] += 1
+        rule = self.browse(rule_id)
+        try:
+            return test_expr(rule[field_name] or '', _SAFE_OPCODES, mode='exec')
+        except Exception as e:
+            raise UserError(_("Wrong python code defined for salary rule %s (%s).\nError: %s") % (rule.name, rule.code, e))
+
+    def _eval_compiled_code(self, field_name, localdict):
+        """Run the compiled code the way safe_eval runs the code it compiles"""
+        _rule_code_stats['lookups'] += 1
+        code = self._get_compiled_code(self.id, self.write_date, field_name)
+        check_values(localdict)
+        localdict['__builtins__'] = _BUILTINS
+        try:
+            unsafe_eval(code, localdict)
+        except Exception as e:
+            raise UserError(_("Wrong python code defined for salary rule %s (%s).\nError: %s") % (self.name, self.code, e))
+
+    def _satisfy_condition(self, localdict):
+        self.ensure_one()
+        with self.env['hr.payroll.rule.stat']._record_rule(self):
+            if not (self.is_swedish_specific and self.condition_select == 'python'):
+                return super()._satisfy_condition(localdict)
+            self._eval_compiled_code('condition_python', localdict)
+            return localdict.get('result', False)
+
+    def _compute_rule(self, localdict):
+        self.ensure_one()
+        with self.env['hr.payroll.rule.stat']._record_rule(self):
+            if not (self.is_swedish_specific and self.amount_select == 'code'):
+                return super()._compute_rule(localdict)
+            self._eval_compiled_code('amount_python_compute', localdict)
+            return float(localdict['result']), localdict.get('result_qty', 1.0), localdict.get('result_rate', 100.0)
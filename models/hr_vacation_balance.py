@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from psycopg2.extras import execute_values
+
+# Fields of allocations and leaves that move a vacation balance
+_BALANCE_FIELDS = {'employee_id', 'holiday_status_id', 'state', 'number_of_days', 'date_from', 'date_to', 'vacation_year'}
+
+
+class HrSwedishVacationBalance(models.Model):
+    _name = 'hr.swedish.vacation.balance'
+    _description = 'Swedish Vacation Balance'
+    _order = 'vacation_year desc, employee_id'
+    _rec_name = 'employee_id'
+
+    employee_id = fields.Many2one('hr.employee', string='Employee', required=True, ondelete='cascade', index=True)
+    company_id = fields.Many2one(related='employee_id.company_id', string='Company')
+    vacation_year = fields.Char(string='Vacation Year', required=True, index=True, help="Format YYYY/YYYY, e.g., 2024/2025")
+    entitled_days = fields.Float(string='Entitled Days', readonly=True)
+    saved_days = fields.Float(string='Saved Days (Sparade dagar)', readonly=True)
+    used_days = fields.Float(string='Used Days', readonly=True)
+    remaining_days = fields.Float(string='Remaining Days', readonly=True, index=True)
+
+    _sql_constraints = [
+        ('employee_year_unique', 'unique(employee_id, vacation_year)', 'Only one vacation balance per employee and vacation year.')
+    ]
+
+    @api.model
+    def _current_vacation_year(self):
+        today = fields.Date.context_today(self)
+        year = today.year if today.month >= 4 else today.year - 1
+        return f"{year}/{year+1}"
+
+    @api.model
+    def _get_balance_keys(self, records):
+        """Return the (employee, vacation year) balances a set of allocations or leaves count in"""
+        return {
+            (record.employee_id.id, record.vacation_year)
+            for record in records
+            if record.is_swedish_vacation and record.employee_id and record.vacation_year
+        }
+
+    @api.model
+    def _refresh_balances(self, keys):
+        """Recompute the balances of the given (employee_id, vacation_year) keys
+
+        Validated allocations of the vacation year count as entitled days, or
+        as saved days when flagged as such. Approved leaves starting in the
+        vacation year count as used. All keys are recomputed and upserted
+        with a single statement.
+        """
+        keys = {(employee_id, vacation_year) for employee_id, vacation_year in keys if employee_id and vacation_year}
+        vacation_type = self.env.ref('l10n_se_hr.holiday_status_swedish_vacation', raise_if_not_found=False)
+        if not keys or not vacation_type:
+            return
+        self.env['hr.leave.allocation'].flush_model()
+        self.env['hr.leave'].flush_model()
+        self.flush_model()
+        uid = self.env.uid
+        execute_values(self.env.cr._obj, """
+            WITH keys(employee_id, vacation_year) AS (VALUES %%s),
+            allocated AS (
+                SELECT a.employee_id, a.vacation_year,
+                       SUM(CASE WHEN a.swedish_saved_days THEN 0 ELSE a.number_of_days END) AS entitled_days,
+                       SUM(CASE WHEN a.swedish_saved_days THEN a.number_of_days ELSE 0 END) AS saved_days
+                  FROM hr_leave_allocation a
+                  JOIN keys k ON k.employee_id = a.employee_id AND k.vacation_year = a.vacation_year
+                 WHERE a.holiday_status_id = %(type)s AND a.state = 'validate'
+              GROUP BY a.employee_id, a.vacation_year
+            ),
+            used AS (
+                SELECT l.employee_id, l.vacation_year, SUM(l.number_of_days) AS used_days
+                  FROM hr_leave l
+                  JOIN keys k ON k.employee_id = l.employee_id AND k.vacation_year = l.vacation_year
+                 WHERE l.holiday_status_id = %(type)s AND l.state IN ('validate', 'validate1')
+              GROUP BY l.employee_id, l.vacation_year
+            )
+            INSERT INTO hr_swedish_vacation_balance
+                   (employee_id, vacation_year, entitled_days, saved_days, used_days, remaining_days,
+                    create_uid, create_date, write_uid, write_date)
+            SELECT k.employee_id, k.vacation_year,
+                   COALESCE(a.entitled_days, 0), COALESCE(a.saved_days, 0), COALESCE(u.used_days, 0),
+                   COALESCE(a.entitled_days, 0) + COALESCE(a.saved_days, 0) - COALESCE(u.used_days, 0),
+                   %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+              FROM keys k
+              JOIN hr_employee e ON e.id = k.employee_id
+         LEFT JOIN allocated a ON a.employee_id = k.employee_id AND a.vacation_year = k.vacation_year
+         LEFT JOIN used u ON u.employee_id = k.employee_id AND u.vacation_year = k.vacation_year
+            ON CONFLICT (employee_id, vacation_year) DO UPDATE
+               SET entitled_days = EXCLUDED.entitled_days,
+                   saved_days = EXCLUDED.saved_days,
+                   used_days = EXCLUDED.used_days,
+                   remaining_days = EXCLUDED.remaining_days,
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+        """ % {'type': int(vacation_type.id), 'uid': int(uid)}, sorted(keys), template='(%s::int, %s::varchar)')
+        self.invalidate_model()
+
+    @api.model
+    def _rebuild_balances(self):
+        """Recompute every balance, e.g. after installing or upgrading the module"""
+        vacation_type = self.env.ref('l10n_se_hr.holiday_status_swedish_vacation', raise_if_not_found=False)
+        if not vacation_type:
+            return
+        self.env['hr.leave.allocation'].flush_model()
+        self.env['hr.leave'].flush_model()
+        self.env.cr.execute("""
+            SELECT employee_id, vacation_year FROM hr_leave_allocation
+             WHERE holiday_status_id = %(type)s AND employee_id IS NOT NULL AND vacation_year IS NOT NULL
+             UNION
+            SELECT employee_id, vacation_year FROM hr_leave
+             WHERE holiday_status_id = %(type)s AND employee_id IS NOT NULL AND vacation_year IS NOT NULL
+             UNION
+            SELECT employee_id, vacation_year FROM hr_swedish_vacation_balance
+        """, {'type': vacation_type.id})
+        self._refresh_balances(self.env.cr.fetchall())
@@ -0,0 +1,44 @@
+from odoo import models, api, tools
+
+
+class MunicipalityReferenceData(models.AbstractModel):
+    _name = 'municipality.reference.data'
+    _description = 'Swedish Region and Municipality Reference Data'
+
+    # Lookups are cached per worker with ormcache. Anything that changes
+    # regions or municipalities calls invalidate(), which clears the lookup
+    # caches and signals the other workers to do the same.
+
+    @api.model
+    @tools.ormcache()
+    def _get_region_map(self):
+        """Return {region code: region id}"""
+        self.env['res.region'].flush_model(['code'])
+        self.env.cr.execute("SELECT code, id FROM res_region")
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    @tools.ormcache()
+    def _get_municipality_map(self):
+        """Return {municipality code: (municipality id, region id, tax table number)}"""
+        self.env['res.municipality'].flush_model(['code', 'region_id', 'tax_table_number'])
+        self.env.cr.execute("SELECT code, id, region_id, tax_table_number FROM res_municipality")
+        return {code: (municipality_id, region_id, table) for code, municipality_id, region_id, table in self.env.cr.fetchall()}
+
+    @api.model
+    def is_data_loaded(self):
+        return bool(self._get_region_map()) and bool(self._get_municipality_map())
+
+    @api.model
+    def region_by_code(self, code):
+        return self.env['res.region'].browse(self._get_region_map().get(code))
+
+    @api.model
+    def municipality_by_code(self, code):
+        municipality = self._get_municipality_map().get(code)
+        return self.env['res.municipality'].browse(municipality and municipality[0])
+
+    @api.model
+    def invalidate(self):
+        self._get_region_map.clear_cache(self)
+        self._get_municipality_map.clear_cache(self)
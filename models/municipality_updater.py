@@ -1,11 +1,130 @@
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
+from concurrent.futures import ThreadPoolExecutor
+from psycopg2.extras import execute_values
+from requests.adapters import HTTPAdapter
 import requests
+import csv
+import gzip
+import hashlib
 import logging
 import json
+import os
+import re
 from datetime import datetime
+from urllib.parse import urlencode
 
 _logger = logging.getLogger(__name__)
 
+SCB_URL = 'https://api.scb.se/OV0104/v1/doris/sv/ssd/START/OE/OE0101/OE0101A/KommunalSkattMedelKN'
+SKATTEVERKET_URL = 'https://skatteverket.entryscape.net/rowstore/dataset/c67b320b-ffee-4876-b073-dd9236cd2a99/json'
+
+ROWSTORE_PAGE_SIZE = 500
+
+_JSON_SEPARATORS_RE = re.compile(r'[\s,]*')
+_JSON_KEY_SEPARATOR_RE = re.compile(r'\s*:\s*')
+FETCH_CHUNK_SIZE = 64 * 1024
+
+REFERENCE_DATA_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'l10n_se_hr_reference_data.csv.gz')
+
+_session = None
+
+
+def _get_session():
+    """Worker-wide HTTP session so connections to SCB and Skatteverket are reused"""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=2))
+    return _session
+
+
+class _RowstorePage(object):
+    """Walk the top-level object of a rowstore page in one pass
+
+    The records of the results array are decoded one at a time and the
+    other members, among them the next link, on the way, so a page is
+    never decoded as a whole. next_url is known once the walk finished.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.next_url = None
+        self.done = False
+
+    def records(self):
+        """Yield the page's records, capturing the next link"""
+        return self._walk(records=True)
+
+    def skip(self):
+        """Find the next link without decoding the records, if not walked yet"""
+        if not self.done:
+            for _record in self._walk(records=False):
+                pass
+
+    def _walk(self, records):
+        text = self.text
+        decoder = json.JSONDecoder()
+        position = _JSON_SEPARATORS_RE.match(text).end()
+        if text[position:position + 1] != '{':
+            self.done = True
+            return
+        position += 1
+        while True:
+            position = _JSON_SEPARATORS_RE.match(text, position).end()
+            if position >= len(text) or text[position] == '}':
+                break
+            key, position = decoder.raw_decode(text, position)
+            position = _JSON_KEY_SEPARATOR_RE.match(text, position).end()
+            if key == 'results' and records and text[position] == '[':
+                position += 1
+                while True:
+                    position = _JSON_SEPARATORS_RE.match(text, position).end()
+                    if position >= len(text) or text[position] == ']':
+                        position += 1
+                        break
+                    record, position = decoder.raw_decode(text, position)
+                    yield record
+                continue
+            value, position = decoder.raw_decode(text, position)
+            if key == 'next':
+                self.next_url = value
+                if not records:
+                    # A skipped page needs nothing else
+                    break
+        self.done = True
+
+
+class FetchResult(object):
+    """Outcome of downloading one data source
+
+    The payload stays on disk in the cache and is read on access, so
+    fetched pages are not all kept in memory.
+    """
+
+    def __init__(self, status_code=None, body_path=None, changed=False, error=None, meta=None, meta_path=None):
+        self.status_code = status_code
+        self.body_path = body_path
+        self.changed = changed
+        self.error = error
+        self._meta = meta
+        self._meta_path = meta_path
+
+    @property
+    def body(self):
+        if not self.body_path:
+            return None
+        with open(self.body_path, 'rb') as body_file:
+            return body_file.read()
+
+    def json(self):
+        return json.loads(self.body)
+
+    def mark_processed(self):
+        """Record the payload's validators once it has been applied"""
+        if self._meta and self._meta_path:
+            with open(self._meta_path, 'w') as meta_file:
+                json.dump(self._meta, meta_file)
+
 class MunicipalityUpdater(models.Model):
     _name = 'municipality.updater'
     _description = 'Municipality and Tax Rate Updater'
@@ -28,19 +147,25 @@ class MunicipalityUpdater(models.Model):
         success = True
         message = ""
         
+        payloads = {}
+        fetched = []
         try:
+            # Download SCB and Skatteverket data concurrently before touching the database
+            payloads = self._fetch_sources()
+            fetched.extend(payloads.values())
+
             # First, ensure regions are loaded
             success, regions_message = self._update_regions()
             message += regions_message
             
             if success:
                 # Then update municipalities and connect to regions
-                success, municipalities_message = self._update_municipalities_list()
+                success, municipalities_message = self._update_municipalities_list(payloads['scb'])
                 message += municipalities_message
                 
                 if success:
                     # Finally, update tax rates for municipalities
-                    success, tax_message = self._update_tax_rates()
+                    success, tax_message = self._update_tax_rates(payloads['skatteverket'], fetched)
                     message += tax_message
         
         except Exception as e:
@@ -53,22 +178,351 @@ class MunicipalityUpdater(models.Model):
             'update_status': 'success' if success else 'failed',
             'update_message': message
         })
+        if success:
+            self.env.cr.postcommit.add(lambda: [payload.mark_processed() for payload in fetched])
         
         return success
-    
+
+    @api.model
+    def _load_reference_data(self):
+        """Bulk load regions, municipalities and parishes at install/upgrade
+
+        Reads the bundled compressed CSV snapshot and inserts the records of
+        each model with one multi-row INSERT, plus one for their xmlids.
+        Records whose xmlid already exists are left untouched, like noupdate
+        XML data.
+        """
+        with gzip.open(REFERENCE_DATA_FILE, 'rt', encoding='utf-8', newline='') as snapshot:
+            rows = list(csv.DictReader(snapshot))
+
+        cr = self.env.cr
+        cr.execute("""
+            SELECT name, res_id FROM ir_model_data
+             WHERE module = 'l10n_se_hr' AND model IN ('res.region', 'res.municipality', 'res.parish')
+        """)
+        xmlids = dict(cr.fetchall())
+        uid = self.env.uid
+        audit = "%s, now() at time zone 'UTC', %s, now() at time zone 'UTC'" % (uid, uid)
+
+        loaders = [
+            ('region', 'res.region', 'res_region', ['name', 'code'],
+             lambda row: (row['name'], row['code'])),
+            ('municipality', 'res.municipality', 'res_municipality', ['name', 'code', 'region_id', 'tax_table_number'],
+             lambda row: (row['name'], row['code'], xmlids[row['parent_xmlid']], row['tax_table_number'])),
+            ('parish', 'res.parish', 'res_parish', ['name', 'municipality_id'],
+             lambda row: (row['name'], xmlids[row['parent_xmlid']])),
+        ]
+        loaded = 0
+        for kind, model, table, columns, get_values in loaders:
+            new_rows = [row for row in rows if row['type'] == kind and row['xmlid'] not in xmlids]
+            if not new_rows:
+                continue
+            ids = execute_values(cr._obj, """
+                INSERT INTO %s (%s, create_uid, create_date, write_uid, write_date) VALUES %%s RETURNING id
+            """ % (table, ', '.join(columns)), [get_values(row) for row in new_rows],
+                template='(%s, %s)' % (', '.join(['%s'] * len(columns)), audit), fetch=True)
+            execute_values(cr._obj, """
+                INSERT INTO ir_model_data (module, name, model, res_id, noupdate, create_uid, create_date, write_uid, write_date)
+                VALUES %s
+            """, [('l10n_se_hr', row['xmlid'], model, res_id) for row, (res_id,) in zip(new_rows, ids)],
+                template="(%%s, %%s, %%s, %%s, true, %s)" % audit)
+            xmlids.update((row['xmlid'], res_id) for row, (res_id,) in zip(new_rows, ids))
+            self.env[model].invalidate_model()
+            loaded += len(new_rows)
+
+        if loaded:
+            self.env['ir.model.data'].invalidate_model()
+            self.env['municipality.reference.data'].invalidate()
+        _logger.info("Loaded %s regions, municipalities and parishes from the reference data snapshot", loaded)
+        return loaded
+
+    def _get_sources(self):
+        """Return the data sources as {key: (method, url, json body)}
+
+        URLs can be replaced with system parameters, e.g. to point at a local
+        stand-in endpoint or a file:// URL in offline environments and tests.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        return {
+            'scb': ('POST', ICP.get_param('l10n_se_hr.scb_url', SCB_URL),
+                    {"query": [], "response": {"format": "json"}}),
+            'skatteverket': ('GET', self._rowstore_query_url(
+                ICP.get_param('l10n_se_hr.skatteverket_url', SKATTEVERKET_URL), datetime.now().year), None),
+        }
+
+    @api.model
+    def _rowstore_query_url(self, url, year):
+        """Let the rowstore filter on year and return large pages"""
+        if url.startswith('file://'):
+            return url
+        separator = '&' if '?' in url else '?'
+        return f"{url}{separator}{urlencode({'år': year, '_limit': ROWSTORE_PAGE_SIZE})}"
+
+    def _get_cache_dir(self):
+        return os.path.join(tools.config.filestore(self.env.cr.dbname), 'l10n_se_hr', 'http_cache')
+
+    def _fetch_sources(self):
+        """Download all sources concurrently, returning {key: FetchResult}
+
+        Runs outside the ORM: the threads only do HTTP and file I/O.
+        """
+        sources = self._get_sources()
+        cache_dir = self._get_cache_dir()
+        os.makedirs(cache_dir, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=len(sources)) as executor:
+            futures = {
+                key: executor.submit(self._fetch_source, cache_dir, key, method, url, body)
+                for key, (method, url, body) in sources.items()
+            }
+        return {key: future.result() for key, future in futures.items()}
+
+    @staticmethod
+    def _fetch_source(cache_dir, key, method, url, body=None):
+        """Fetch one source with conditional requests and an on-disk cache
+
+        The raw payload is streamed to the cache with its ETag/Last-Modified
+        and checksum; changed is False when the server answers 304 or
+        returns an identical payload, so callers can skip parsing it again.
+        """
+        body_path = os.path.join(cache_dir, key + '.body')
+        meta_path = os.path.join(cache_dir, key + '.json')
+        meta = {}
+        if os.path.exists(meta_path) and os.path.exists(body_path):
+            with open(meta_path) as meta_file:
+                meta = json.load(meta_file)
+
+        # Streamed to a temporary file and hashed on the way, then swapped in
+        tmp_path = '%s.%s.tmp' % (body_path, os.getpid())
+        digest = hashlib.sha1()
+        try:
+            if url.startswith('file://'):
+                status_code, headers = 200, {}
+                with open(url[len('file://'):], 'rb') as source_file, open(tmp_path, 'wb') as body_file:
+                    for chunk in iter(lambda: source_file.read(FETCH_CHUNK_SIZE), b''):
+                        digest.update(chunk)
+                        body_file.write(chunk)
+            else:
+                headers = {}
+                if meta.get('etag'):
+                    headers['If-None-Match'] = meta['etag']
+                if meta.get('last_modified'):
+                    headers['If-Modified-Since'] = meta['last_modified']
+                with _get_session().request(method, url, json=body, headers=headers, timeout=30, stream=True) as response:
+                    if response.status_code == 304 and meta:
+                        return FetchResult(304, body_path, changed=False)
+                    if response.status_code != 200:
+                        return FetchResult(response.status_code)
+                    status_code, headers = response.status_code, response.headers
+                    with open(tmp_path, 'wb') as body_file:
+                        for chunk in response.iter_content(chunk_size=FETCH_CHUNK_SIZE):
+                            digest.update(chunk)
+                            body_file.write(chunk)
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return FetchResult(error=str(e))
+
+        os.replace(tmp_path, body_path)
+        checksum = digest.hexdigest()
+        if meta.get('checksum') == checksum:
+            return FetchResult(status_code, body_path, changed=False)
+        # The validators are only stored by mark_processed(), so a payload
+        # whose update failed is processed again on the next run
+        return FetchResult(status_code, body_path, changed=True, meta={
+            'url': url,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'checksum': checksum,
+        }, meta_path=meta_path)
+
+    @api.model
+    def _parse_tax_record(self, tax_record):
+        """Normalize a Skatteverket row to (code, name, total_tax_rate,
+        church_tax_rate, parish_code, parish_name)
+
+        The municipality code is the first four digits of the parish code
+        when the row has one. Church tax includes the burial fee and belongs
+        to the row's parish.
+        """
+        def rate(key):
+            value = tax_record.get(key) or '0'
+            if isinstance(value, str):
+                value = value.replace(',', '.')
+            return float(value)
+
+        parish_code = str(tax_record.get('församlings-kod') or '').strip()
+        return (
+            parish_code[:4] if len(parish_code) >= 4 else None,
+            tax_record.get('kommun', '').strip(),
+            rate('summa, exkl. kyrkoavgift'),
+            rate('kyrkoavgift') + rate('begravnings-avgift'),
+            parish_code or None,
+            (tax_record.get('församling') or '').strip(),
+        )
+
+    @api.model
+    def _normalize_municipality_name(self, name):
+        name = (name or '').strip().casefold()
+        return name[:-len(' kommun')] if name.endswith(' kommun') else name
+
+    @api.model
+    def _upsert_tax_rates(self, rates, year=None):
+        """Apply parsed tax rows to municipalities and parishes
+
+        All municipalities are loaded once into a code and name index and
+        rows are matched in memory, by code or else by exact normalized
+        name. The dataset has one row per parish: the municipal rate is the
+        same on all of them, the church tax rate is stored on each parish
+        by _upsert_church_rates. The municipality keeps the church rate of
+        its first row, the fallback for employees without a parish. The
+        rates are stored in the year's rate history and, for the current
+        year, on the municipality itself.
+        Changes are written with one write() per distinct set of values.
+        Returns a report with matched, updated, parishes_updated and
+        unmatched.
+        """
+        year = year or datetime.now().year
+        Municipality = self.env['res.municipality']
+        municipalities = Municipality.search_read([], ['code', 'name', 'total_tax_rate', 'church_tax_rate', 'tax_table_number'])
+        by_code = {municipality['code']: municipality for municipality in municipalities}
+        by_name = {self._normalize_municipality_name(municipality['name']): municipality for municipality in municipalities}
+
+        matched = {}
+        parish_rates = []
+        unmatched = set()
+        for code, name, total_tax_rate, church_tax_rate, parish_code, parish_name in rates:
+            municipality = by_code.get(code) or by_name.get(self._normalize_municipality_name(name))
+            if not municipality:
+                unmatched.add(name)
+                continue
+            if municipality['id'] not in matched:
+                matched[municipality['id']] = (
+                    # Tax tables are numbered by the total municipal rate, rounded half up
+                    str(int(total_tax_rate + 0.5)),
+                    total_tax_rate,
+                    church_tax_rate,
+                )
+            parish_rates.append((municipality['id'], parish_code, parish_name, church_tax_rate))
+
+        fields_list = ['tax_table_number', 'total_tax_rate', 'church_tax_rate']
+        Rate = self.env['res.municipality.tax.rate']
+        history = {
+            rate['municipality_id'][0]: rate
+            for rate in Rate.search_read([('year', '=', year), ('municipality_id', 'in', list(matched))], fields_list + ['municipality_id'])
+        }
+        current = {municipality['id']: municipality for municipality in municipalities} if year == datetime.now().year else {}
+
+        new_rates = []
+        rate_ids_by_values = {}
+        municipality_ids_by_values = {}
+        for municipality_id, values in matched.items():
+            stored = history.get(municipality_id)
+            if stored is None:
+                new_rates.append(dict(zip(fields_list, values), municipality_id=municipality_id, year=year))
+            elif tuple(stored[field] for field in fields_list) != values:
+                rate_ids_by_values.setdefault(values, []).append(stored['id'])
+            municipality = current.get(municipality_id)
+            if municipality and tuple(municipality[field] for field in fields_list) != values:
+                municipality_ids_by_values.setdefault(values, []).append(municipality_id)
+
+        if new_rates:
+            Rate.create(new_rates)
+        for values, ids in rate_ids_by_values.items():
+            Rate.browse(ids).write(dict(zip(fields_list, values)))
+        for values, ids in municipality_ids_by_values.items():
+            Municipality.browse(ids).write(dict(zip(fields_list, values)))
+        return {
+            'matched': len(matched),
+            'updated': len(new_rates) + sum(len(ids) for ids in rate_ids_by_values.values()),
+            'parishes_updated': self._upsert_church_rates(parish_rates, year),
+            'unmatched': unmatched,
+        }
+
+    @api.model
+    def _upsert_church_rates(self, parish_rates, year):
+        """Apply (municipality_id, parish_code, parish_name, church_tax_rate) rows to parishes
+
+        Parishes are matched by code or else by name within their
+        municipality; a matched parish without a code gets the row's one.
+        Returns the number of history rows created or changed.
+        """
+        Parish = self.env['res.parish']
+        parishes = Parish.search_read([], ['code', 'name', 'municipality_id', 'church_tax_rate'])
+        by_code = {parish['code']: parish for parish in parishes if parish['code']}
+        by_name = {(parish['municipality_id'][0], parish['name'].casefold()): parish for parish in parishes}
+
+        matched = {}
+        codes = {}
+        for municipality_id, parish_code, parish_name, church_tax_rate in parish_rates:
+            parish = by_code.get(parish_code) or by_name.get((municipality_id, parish_name.casefold()))
+            if not parish:
+                continue
+            matched[parish['id']] = church_tax_rate
+            if parish_code and not parish['code']:
+                codes[parish['id']] = parish_code
+
+        ChurchRate = self.env['res.parish.church.rate']
+        history = {
+            rate['parish_id'][0]: rate
+            for rate in ChurchRate.search_read([('year', '=', year), ('parish_id', 'in', list(matched))], ['parish_id', 'church_tax_rate'])
+        }
+        current = {parish['id']: parish for parish in parishes} if year == datetime.now().year else {}
+
+        new_rates = []
+        rate_ids_by_value = {}
+        parish_ids_by_value = {}
+        for parish_id, church_tax_rate in matched.items():
+            stored = history.get(parish_id)
+            if stored is None:
+                new_rates.append({'parish_id': parish_id, 'year': year, 'church_tax_rate': church_tax_rate})
+            elif stored['church_tax_rate'] != church_tax_rate:
+                rate_ids_by_value.setdefault(church_tax_rate, []).append(stored['id'])
+            parish = current.get(parish_id)
+            if parish and parish['church_tax_rate'] != church_tax_rate:
+                parish_ids_by_value.setdefault(church_tax_rate, []).append(parish_id)
+
+        if new_rates:
+            ChurchRate.create(new_rates)
+        for church_tax_rate, ids in rate_ids_by_value.items():
+            ChurchRate.browse(ids).write({'church_tax_rate': church_tax_rate})
+        for church_tax_rate, ids in parish_ids_by_value.items():
+            Parish.browse(ids).write({'church_tax_rate': church_tax_rate})
+        for parish_id, parish_code in codes.items():
+            Parish.browse(parish_id).write({'code': parish_code})
+        return len(new_rates) + sum(len(ids) for ids in rate_ids_by_value.values())
+
+    @api.model
+    def _set_default_tax_rates(self, municipalities, year):
+        """Give municipalities without tax data the default rates
+
+        The rates are also recorded in the year's history, which is where
+        payslips look them up; existing history rows are kept.
+        """
+        values = {
+            'tax_table_number': '29',
+            'total_tax_rate': 32.0,  # Default average rate
+            'church_tax_rate': 1.0,  # Default church tax rate
+        }
+        municipalities.write(values)
+        Rate = self.env['res.municipality.tax.rate']
+        with_history = Rate.search([('year', '=', year), ('municipality_id', 'in', municipalities.ids)]).municipality_id
+        Rate.create([
+            dict(values, municipality_id=municipality.id, year=year)
+            for municipality in municipalities - with_history
+        ])
+
     def _update_regions(self):
         """Ensure all Swedish regions are loaded"""
-        Region = self.env['res.region']
+        ReferenceData = self.env['municipality.reference.data']
         message = "Regions check completed.\n"
         
         # Check if regions already exist
-        existing_regions = Region.search([])
-        if existing_regions:
+        if ReferenceData._get_region_map():
             return True, "Regions already exist in the system.\n"
         
         try:
-            # The file with regions should already be loaded during module installation
-            regions = Region.search([])
+            # The snapshot with regions should already be loaded during module installation
+            regions = ReferenceData._get_region_map()
             if regions:
                 return True, f"Found {len(regions)} regions.\n"
             else:
@@ -77,39 +531,30 @@ class MunicipalityUpdater(models.Model):
         except Exception as e:
             return False, f"Error checking regions: {str(e)}\n"
     
-    def _update_municipalities_list(self):
+    def _update_municipalities_list(self, payload):
         """Update municipalities list from SCB or static data"""
-        Municipality = self.env['res.municipality']
-        Region = self.env['res.region']
+        ReferenceData = self.env['municipality.reference.data']
         message = "Municipalities update started.\n"
         
         try:
-            # For a production system, we would fetch from SCB API or a similar source
-            # Here using the API endpoint for Swedish municipalities
-            scb_url = 'https://api.scb.se/OV0104/v1/doris/sv/ssd/START/OE/OE0101/OE0101A/KommunalSkattMedelKN'
-            
-            # This would be the proper API call for a production system
+            # The SCB payload was fetched by _fetch_sources
             # For demonstration, we'll use the data already loaded by XML files
-            try:
-                response = requests.post(scb_url, json={
-                    "query": [],
-                    "response": {"format": "json"}
-                }, timeout=30)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    # Process the API response
-                    # This would map municipality codes to regions and create records
-                    message += f"SCB API returned data successfully.\n"
-                else:
-                    message += f"SCB API returned status code {response.status_code}.\n"
-                    message += "Checking for existing municipalities from data files.\n"
-            except Exception as e:
-                message += f"Failed to connect to SCB API: {str(e)}.\n"
+            if payload.error:
+                message += f"Failed to connect to SCB API: {payload.error}.\n"
                 message += "Checking for existing municipalities from data files.\n"
+            elif payload.status_code not in (200, 304):
+                message += f"SCB API returned status code {payload.status_code}.\n"
+                message += "Checking for existing municipalities from data files.\n"
+            elif not payload.changed:
+                message += "SCB data unchanged since last update.\n"
+            else:
+                data = payload.json()
+                # Process the API response
+                # This would map municipality codes to regions and create records
+                message += f"SCB API returned data successfully.\n"
             
-            # Check if municipalities already exist (from XML loading)
-            municipalities = Municipality.search([])
+            # Check if municipalities already exist (from the reference data snapshot)
+            municipalities = ReferenceData._get_municipality_map()
             if municipalities:
                 message += f"Found {len(municipalities)} municipalities already loaded.\n"
                 return True, message
@@ -120,106 +565,91 @@ class MunicipalityUpdater(models.Model):
         except Exception as e:
             return False, f"Error updating municipalities list: {str(e)}\n"
     
-    def _update_tax_rates(self):
+    def _iter_rowstore_pages(self, payload, fetched):
+        """Yield (payload, page) for the first rowstore page and each page
+        behind its next links
+
+        Every page goes through the conditional, cached fetch; pages are
+        appended to fetched so their cache entries can be committed. The
+        next link is read by the caller's walk of the page's records, or by
+        skipping through the page when the caller did not read them.
+        """
+        cache_dir = self._get_cache_dir()
+        page_number = 0
+        while payload is not None:
+            if payload.error:
+                raise Exception(payload.error)
+            if payload.status_code not in (200, 304):
+                raise Exception(f"page {page_number + 1} returned status code {payload.status_code}")
+            page = _RowstorePage(payload.body.decode('utf-8'))
+            yield payload, page
+            page.skip()
+            next_url = page.next_url
+            if not next_url:
+                return
+            page_number += 1
+            payload = self._fetch_source(cache_dir, f'skatteverket_{page_number}', 'GET', next_url)
+            fetched.append(payload)
+
+    def _iter_tax_rates(self, payload, fetched, year, stats):
+        """Yield normalized rate tuples of one year from changed rowstore pages
+
+        Pages are parsed one record at a time and records of other years
+        are dropped before normalization, so memory use is bounded by the
+        page size, not by the dataset. Unchanged pages are only skipped once
+        the year has rate history, a new year reads them all.
+        """
+        skip_unchanged = bool(self.env['res.municipality.tax.rate'].search([('year', '=', year)], limit=1))
+        year = str(year)
+        for payload, page in self._iter_rowstore_pages(payload, fetched):
+            stats['pages'] += 1
+            if not payload.changed and skip_unchanged:
+                stats['unchanged_pages'] += 1
+                continue
+            for tax_record in page.records():
+                stats['records'] += 1
+                if str(tax_record.get('år', year)) != year:
+                    continue
+                try:
+                    yield self._parse_tax_record(tax_record)
+                except (ValueError, TypeError) as e:
+                    stats['errors'] += 1
+                    _logger.warning(f"Error parsing tax rates for {tax_record.get('kommun')}: {str(e)}")
+
+    def _update_tax_rates(self, payload, fetched):
         """Update tax rates from Skatteverket for all municipalities"""
         Municipality = self.env['res.municipality']
         message = "Tax rates update started.\n"
         current_year = datetime.now().year
         
         try:
-            # Skatteverket API or data source for tax rates
-            # In production, this would be the URL for the Skatteverket open data API
-            skatt_url = f'https://skatteverket.entryscape.net/rowstore/dataset/c67b320b-ffee-4876-b073-dd9236cd2a99/json'
-            
+            # The first Skatteverket page was fetched by _fetch_sources
             try:
-                response = requests.get(skatt_url, timeout=30)
-                if response.status_code == 200:
-                    tax_data = response.json()
-                    results = tax_data.get('results', [])
-                    message += f"Found {len(results)} tax records from Skatteverket API.\n"
-                    
-                    # Counting variables for summary
-                    processed = 0
-                    updated = 0
-                    errors = 0
-                    
-                    for tax_record in results:
-                        try:
-                            # Extract information from API response
-                            municipality_name = tax_record.get('kommun', '').strip()
-                            year = tax_record.get('år', str(current_year))
-                            
-                            # Filter for current year only
-                            if year != str(current_year):
-                                continue
-                                
-                            # Find municipality by name
-                            municipalities = Municipality.search([('name', 'ilike', municipality_name)])
-                            
-                            if municipalities:
-                                for municipality in municipalities:
-                                    # Extract tax rates, handling possible format variations
-                                    try:
-                                        # Total tax excluding church tax
-                                        total_tax = tax_record.get('summa, exkl. kyrkoavgift', '0')
-                                        if isinstance(total_tax, str):
-                                            total_tax = total_tax.replace(',', '.')
-                                        total_tax_rate = float(total_tax)
-                                        
-                                        # Church tax
-                                        church_tax = tax_record.get('kyrkoavgift', '0')
-                                        if isinstance(church_tax, str):
-                                            church_tax = church_tax.replace(',', '.')
-                                        church_tax_rate = float(church_tax)
-                                        
-                                        # Burial fee (part of church tax in Sweden)
-                                        burial_fee = tax_record.get('begravnings-avgift', '0')
-                                        if isinstance(burial_fee, str):
-                                            burial_fee = burial_fee.replace(',', '.')
-                                        burial_fee = float(burial_fee)
-                                        
-                                        # Add burial fee to church tax
-                                        church_tax_rate += burial_fee
-                                        
-                                        # Update municipality with tax rates
-                                        municipality.write({
-                                            'tax_table_number': tax_record.get('år', '29'),
-                                            'total_tax_rate': total_tax_rate,
-                                            'church_tax_rate': church_tax_rate
-                                        })
-                                        updated += 1
-                                    except (ValueError, TypeError) as e:
-                                        errors += 1
-                                        _logger.warning(f"Error parsing tax rates for {municipality_name}: {str(e)}")
-                            processed += 1
-                        except Exception as e:
-                            errors += 1
-                            _logger.error(f"Error processing tax record: {str(e)}")
-                    
-                    message += f"Processed {processed} municipalities, updated {updated}, with {errors} errors.\n"
+                if payload.error:
+                    raise Exception(payload.error)
+                if payload.status_code in (200, 304):
+                    stats = dict.fromkeys(['pages', 'unchanged_pages', 'records', 'errors'], 0)
+                    report = self._upsert_tax_rates(self._iter_tax_rates(payload, fetched, current_year, stats), current_year)
+                    message += f"Read {stats['records']} tax records from {stats['pages']} Skatteverket pages"
+                    message += f" ({stats['unchanged_pages']} unchanged since last update).\n"
+                    message += (
+                        f"Processed {report['matched']} municipalities, updated {report['updated']} "
+                        f"and {report['parishes_updated']} parish church rates, with {stats['errors']} errors.\n"
+                    )
+                    if report['unmatched']:
+                        message += f"No municipality found for: {', '.join(sorted(report['unmatched']))}.\n"
                 else:
-                    message += f"Skatteverket API returned status code {response.status_code}. Using default values.\n"
+                    message += f"Skatteverket API returned status code {payload.status_code}. Using default values.\n"
                     # Set default values for municipalities missing tax data
                     default_municipalities = Municipality.search([('total_tax_rate', '=', 0.0)])
-                    for municipality in default_municipalities:
-                        municipality.write({
-                            'tax_table_number': '29',
-                            'total_tax_rate': 32.0,  # Default average rate
-                            'church_tax_rate': 1.0  # Default church tax rate
-                        })
+                    self._set_default_tax_rates(default_municipalities, current_year)
                     message += f"Set default tax rates for {len(default_municipalities)} municipalities.\n"
             except Exception as e:
                 message += f"Failed to connect to Skatteverket API: {str(e)}. Using default values.\n"
-                # Set default values for all municipalities
-                municipalities = Municipality.search([])
-                for municipality in municipalities:
-                    if not municipality.total_tax_rate or municipality.total_tax_rate == 0.0:
-                        municipality.write({
-                            'tax_table_number': '29',
-                            'total_tax_rate': 32.0,  # Default average rate
-                            'church_tax_rate': 1.0  # Default church tax rate
-                        })
-                message += f"Set default tax rates for {len(municipalities)} municipalities.\n"
+                # Set default values for municipalities missing tax data
+                default_municipalities = Municipality.search([]).filtered(lambda municipality: not municipality.total_tax_rate)
+                self._set_default_tax_rates(default_municipalities, current_year)
+                message += f"Set default tax rates for {len(default_municipalities)} municipalities.\n"
             
             return True, message
             
@@ -1,4 +1,6 @@
-from odoo import models, fields, api
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import UserError
+from datetime import date
 
 class ResMunicipality(models.Model):
     _name = 'res.municipality'
@@ -10,7 +12,106 @@ class ResMunicipality(models.Model):
     tax_table_number = fields.Char(required=True)
     total_tax_rate = fields.Float(string='Total Tax Rate', required=False)
     church_tax_rate = fields.Float(string='Church Tax Rate', required=False)
+    rate_ids = fields.One2many('res.municipality.tax.rate', 'municipality_id', string='Tax Rate History')
 
     _sql_constraints = [
         ('code_unique', 'unique(code)', 'Municipality code must be unique.')
-    ]
\ No newline at end of file
+    ]
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        municipalities = super().create(vals_list)
+        self.env['municipality.reference.data'].invalidate()
+        return municipalities
+
+    def write(self, vals):
+        res = super().write(vals)
+        if {'code', 'region_id', 'tax_table_number'} & set(vals):
+            self.env['municipality.reference.data'].invalidate()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['municipality.reference.data'].invalidate()
+        return res
+
+    def rate_at(self, on_date=None):
+        """Return (total_tax_rate, church_tax_rate) in effect on a date
+
+        Rates are decided per income year and read from the rate history.
+        Raises a UserError when the year has no rates, rather than taxing
+        with another year's.
+        """
+        self.ensure_one()
+        on_date = on_date or date.today()
+        rates = self._get_rate_map(on_date.year).get(self.id)
+        if rates is None:
+            raise UserError(_("No tax rates for %s in %s. Update the municipality tax rates first.") % (self.name, on_date.year))
+        return rates
+
+    @api.model
+    @tools.ormcache('year')
+    def _get_rate_map(self, year):
+        """Return {municipality_id: (total_tax_rate, church_tax_rate)} for a year
+
+        Municipalities without history for the year are left out.
+        """
+        self.env['res.municipality.tax.rate'].flush_model(['municipality_id', 'year', 'total_tax_rate', 'church_tax_rate'])
+        self.env.cr.execute("""
+            SELECT r.municipality_id, r.total_tax_rate, r.church_tax_rate
+              FROM res_municipality_tax_rate r
+             WHERE r.year = %s
+        """, (year,))
+        return {municipality_id: (total or 0.0, church or 0.0) for municipality_id, total, church in self.env.cr.fetchall()}
+
+
+class ResMunicipalityTaxRate(models.Model):
+    _name = 'res.municipality.tax.rate'
+    _description = 'Municipality Tax Rate per Year'
+    _order = 'year desc'
+
+    municipality_id = fields.Many2one('res.municipality', string='Municipality', required=True, ondelete='cascade')
+    year = fields.Integer(string='Year', required=True)
+    tax_table_number = fields.Char(string='Tax Table Number')
+    total_tax_rate = fields.Float(string='Total Tax Rate')
+    church_tax_rate = fields.Float(string='Church Tax Rate')
+
+    _sql_constraints = [
+        ('municipality_year_unique', 'unique(municipality_id, year)', 'Only one tax rate per municipality and year.')
+    ]
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        rates = super().create(vals_list)
+        rates._flag_payslips_dirty()
+        self._clear_rate_cache()
+        return rates
+
+    def write(self, vals):
+        res = super().write(vals)
+        if {'municipality_id', 'year', 'total_tax_rate', 'church_tax_rate'} & set(vals):
+            self._flag_payslips_dirty()
+            self._clear_rate_cache()
+        return res
+
+    def unlink(self):
+        self._flag_payslips_dirty()
+        res = super().unlink()
+        self._clear_rate_cache()
+        return res
+
+    def _clear_rate_cache(self):
+        Municipality = self.env['res.municipality']
+        Municipality._get_rate_map.clear_cache(Municipality)
+
+    def _flag_payslips_dirty(self):
+        Payslip = self.env['hr.payslip']
+        for year in set(self.mapped('year')):
+            slips = Payslip.search([
+                ('employee_id.municipality_id', 'in', self.filtered(lambda rate: rate.year == year).municipality_id.ids),
+                ('date_to', '>=', date(year, 1, 1)),
+                ('date_to', '<=', date(year, 12, 31)),
+                ('state', 'in', ['draft', 'verify']),
+                ('line_ids', '!=', False),
+            ])
+            Payslip._flag_swedish_dirty(slips, ['SETAX', 'SECHURCH'])
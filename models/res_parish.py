@@ -1,8 +1,84 @@
-from odoo import models, fields, api
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import UserError
+from datetime import date
 
 class ResParish(models.Model):
     _name = 'res.parish'
     _description = 'Swedish Parish'
 
     name = fields.Char(required=True)
-    municipality_id = fields.Many2one('res.municipality', string='Municipality', required=True)
\ No newline at end of file
+    code = fields.Char(string='Parish Code', help="Skatteverket's församlingskod")
+    municipality_id = fields.Many2one('res.municipality', string='Municipality', required=True)
+    church_tax_rate = fields.Float(string='Church Tax Rate', help='Church fee and burial fee of the current year')
+    church_rate_ids = fields.One2many('res.parish.church.rate', 'parish_id', string='Church Tax Rate History')
+
+    def church_rate_at(self, on_date=None):
+        """Return the church tax rate of the parish in effect on a date
+
+        Church fees are decided per parish and income year and read from
+        the rate history. Raises a UserError when the year has no rate.
+        """
+        self.ensure_one()
+        on_date = on_date or date.today()
+        rate = self._get_church_rate_map(on_date.year).get(self.id)
+        if rate is None:
+            raise UserError(_("No church tax rate for %s in %s. Update the municipality tax rates first.") % (self.name, on_date.year))
+        return rate
+
+    @api.model
+    @tools.ormcache('year')
+    def _get_church_rate_map(self, year):
+        """Return {parish_id: church_tax_rate} for a year"""
+        self.env['res.parish.church.rate'].flush_model(['parish_id', 'year', 'church_tax_rate'])
+        self.env.cr.execute("SELECT parish_id, church_tax_rate FROM res_parish_church_rate WHERE year = %s", (year,))
+        return dict(self.env.cr.fetchall())
+
+
+class ResParishChurchRate(models.Model):
+    _name = 'res.parish.church.rate'
+    _description = 'Parish Church Tax Rate per Year'
+    _order = 'year desc'
+
+    parish_id = fields.Many2one('res.parish', string='Parish', required=True, ondelete='cascade')
+    year = fields.Integer(string='Year', required=True)
+    church_tax_rate = fields.Float(string='Church Tax Rate')
+
+    _sql_constraints = [
+        ('parish_year_unique', 'unique(parish_id, year)', 'Only one church tax rate per parish and year.')
+    ]
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        rates = super().create(vals_list)
+        rates._flag_payslips_dirty()
+        self._clear_church_rate_cache()
+        return rates
+
+    def write(self, vals):
+        res = super().write(vals)
+        if {'parish_id', 'year', 'church_tax_rate'} & set(vals):
+            self._flag_payslips_dirty()
+            self._clear_church_rate_cache()
+        return res
+
+    def unlink(self):
+        self._flag_payslips_dirty()
+        res = super().unlink()
+        self._clear_church_rate_cache()
+        return res
+
+    def _clear_church_rate_cache(self):
+        Parish = self.env['res.parish']
+        Parish._get_church_rate_map.clear_cache(Parish)
+
+    def _flag_payslips_dirty(self):
+        Payslip = self.env['hr.payslip']
+        for year in set(self.mapped('year')):
+            slips = Payslip.search([
+                ('employee_id.parish_id', 'in', self.filtered(lambda rate: rate.year == year).parish_id.ids),
+                ('date_to', '>=', date(year, 1, 1)),
+                ('date_to', '<=', date(year, 12, 31)),
+                ('state', 'in', ['draft', 'verify']),
+                ('line_ids', '!=', False),
+            ])
+            Payslip._flag_swedish_dirty(slips, ['SECHURCH'])
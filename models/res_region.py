@@ -1,4 +1,4 @@
-from odoo import models, fields
+from odoo import models, fields, api
 
 class ResRegion(models.Model):
     _name = 'res.region'
@@ -6,4 +6,21 @@ class ResRegion(models.Model):
 
     name = fields.Char(string='Name', required=True)
     code = fields.Char(string='Code', required=True)
-    municipality_ids = fields.One2many('res.municipality', 'region_id', string='Municipalities')
\ No newline at end of file
+    municipality_ids = fields.One2many('res.municipality', 'region_id', string='Municipalities')
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        regions = super().create(vals_list)
+        self.env['municipality.reference.data'].invalidate()
+        return regions
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'code' in vals:
+            self.env['municipality.reference.data'].invalidate()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['municipality.reference.data'].invalidate()
+        return res
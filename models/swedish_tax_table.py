@@ -1,5 +1,111 @@
-from odoo import models, fields, api, _
-from odoo.exceptions import ValidationError
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import ValidationError, UserError
+from psycopg2.extras import execute_values
+from array import array
+from bisect import bisect_right
+from contextlib import contextmanager
+from collections import defaultdict
+from itertools import chain, groupby
+import csv
+import hashlib
+import logging
+import mmap
+import os
+import requests
+import struct
+import time
+
+_logger = logging.getLogger(__name__)
+
+# Number of bracket rows sent per multi-row INSERT during imports
+_IMPORT_BATCH_SIZE = 5000
+
+# Upper limit used for Skatteverket's open-ended top brackets
+_OPEN_UPPER_LIMIT = 1e12
+
+# Largest difference between a bracket's lower limit and the previous
+# bracket's upper limit that is not reported as a gap
+_BRACKET_GAP_TOLERANCE = 1.0
+
+# Maximum number of bracket problems listed by _validate_tax_brackets
+_VALIDATION_REPORT_LIMIT = 20
+
+# Skatteverket's "antal dgr" period code -> table_type
+_PERIOD_TABLE_TYPES = {
+    '30': 'table_29',  # Monthly salary
+    '7': 'table_30',  # Weekly salary
+    '1': 'table_31',  # Daily salary
+}
+
+# Column layout of the fixed-width tax table text file: (field, start, end)
+_FIXED_WIDTH_LAYOUT = [
+    ('antal dgr', 0, 3),
+    ('tabellnr', 3, 5),
+    ('inkomst fr.o.m.', 5, 12),
+    ('inkomst t.o.m.', 12, 19),
+    ('kolumn 1', 19, 24),
+    ('kolumn 2', 24, 29),
+    ('kolumn 3', 29, 34),
+    ('kolumn 4', 34, 39),
+    ('kolumn 5', 39, 44),
+    ('kolumn 6', 44, 49),
+]
+
+_SNAPSHOT_FILENAME = 'tax_tables.bin'
+_SNAPSHOT_MAGIC = b'SETAXTB1'
+# magic, version, entry count, index offset
+_SNAPSHOT_HEADER = struct.Struct('<8sQIQ')
+# year, table number, table type code, column number, data offset, bracket count
+_SNAPSHOT_ENTRY = struct.Struct('<i8sBBQI')
+_TABLE_TYPE_CODES = {'table_29': 29, 'table_30': 30, 'table_31': 31}
+# cr.precommit.data key set while the transaction changed brackets the
+# snapshot does not have yet
+_SNAPSHOT_STALE_KEY = 'l10n_se_hr.tax_snapshot_stale'
+
+# Per-worker mapped snapshots, by database name
+_tax_snapshots = {}
+
+
+class _TaxSnapshot:
+    """Read-only memory mapping of a tax table snapshot file
+
+    Only the small index is held in Python objects, the bracket arrays are
+    memoryviews on the shared pages of the mapped file.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as snapshot_file:
+            self._mmap = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.version, count, index_offset = _SNAPSHOT_HEADER.unpack_from(self._mmap, 0)
+        if magic != _SNAPSHOT_MAGIC:
+            self._mmap.close()
+            raise ValueError("%s is not a tax table snapshot" % path)
+        self._view = memoryview(self._mmap)
+        self._index = {}
+        for position in range(count):
+            year, table_number, type_code, column_number, offset, length = _SNAPSHOT_ENTRY.unpack_from(
+                self._mmap, index_offset + position * _SNAPSHOT_ENTRY.size
+            )
+            self._index[(year, table_number.rstrip(b'\0').decode(), type_code, column_number)] = (offset, length)
+
+    def get(self, year, table_number, table_type, column_number):
+        """Return (lowers, uppers, amounts, percentages) views, or None"""
+        entry = self._index.get((year, table_number, _TABLE_TYPE_CODES.get(table_type), column_number))
+        if not entry:
+            return None
+        offset, length = entry
+        size = length * 8
+        return tuple(
+            self._view[offset + size * part:offset + size * (part + 1)].cast('d')
+            for part in range(4)
+        )
+
+
+def _parse_tax_number(value):
+    """Parse an amount from a tax table file, None when empty"""
+    value = (value or '').strip().replace(' ', '').replace(',', '.')
+    return float(value) if value else None
+
 
 class SwedishTaxTable(models.Model):
     _name = 'hr.swedish.tax.table'
@@ -16,15 +122,521 @@ class SwedishTaxTable(models.Model):
     column_ids = fields.One2many('hr.swedish.tax.table.column', 'table_id', string='Columns')
     
     _sql_constraints = [
-        ('table_year_unique', 'unique(table_number, year)', 'Tax table must be unique per year.')
+        ('table_year_unique', 'unique(table_number, year, table_type)', 'Tax table must be unique per year and type.')
     ]
-    
+
+    def write(self, vals):
+        res = super().write(vals)
+        if {'year', 'table_number', 'table_type', 'column_ids'} & set(vals):
+            # The stored checksums no longer describe what the next import compares against
+            self.column_ids._reset_checksum()
+            self._invalidate_tax_lookup()
+        return res
+
+    def unlink(self):
+        # Brackets go with the ondelete cascade, bypassing their unlink()
+        res = super().unlink()
+        self._invalidate_tax_lookup()
+        return res
+
+    @api.model
+    def import_tax_tables(self, source=None, year=None):
+        """Import tax tables from Skatteverket
+
+        source is a local file path or an URL pointing to a tax table file,
+        either the CSV export of Skatteverket's dataset or the fixed-width
+        text file (which carries no year, so year must then be given).
+        Defaults to the l10n_se_hr.tax_table_source system parameter so the
+        monthly cron can run it without arguments.
+
+        The file is streamed into a staging table in batches. Each (table,
+        column) block is then hashed and only columns whose checksum differs
+        from the stored one are rewritten, with batched multi-row INSERTs.
+        Returns an hr.swedish.tax.import record summarizing the changes.
+        """
+        source = source or self.env['ir.config_parameter'].sudo().get_param('l10n_se_hr.tax_table_source')
+        if not source:
+            _logger.info("No tax table source configured, skipping tax table import.")
+            return False
+
+        with self._open_tax_table_source(source) as lines:
+            stats = self._load_tax_table_rows(self._parse_tax_table_lines(lines, year))
+        self._export_tax_snapshot()
+        _logger.info("Imported tax tables from %s: %s", source, stats)
+        return self.env['hr.swedish.tax.import'].create(dict(stats, source=source, year=year))
+
+    @api.model
+    @contextmanager
+    def _open_tax_table_source(self, source):
+        """Yield an iterator over the text lines of a local file or an URL"""
+        if source.startswith(('http://', 'https://')):
+            response = requests.get(source, stream=True, timeout=60)
+            try:
+                if response.status_code != 200:
+                    raise UserError(_("Tax table download failed with status code %s.") % response.status_code)
+                # Skatteverket's files start with a byte order mark, which
+                # would otherwise stick to the first header name
+                response.encoding = 'utf-8-sig'
+                yield response.iter_lines(decode_unicode=True)
+            finally:
+                response.close()
+        else:
+            with open(source, encoding='utf-8-sig', newline='') as tax_file:
+                yield tax_file
+
+    @api.model
+    def _parse_tax_table_lines(self, lines, year=None):
+        """Parse tax table lines into bracket rows
+
+        Yields (year, table_number, table_type, is_percentage, lower_limit,
+        upper_limit, amounts) with one amount (or None) per column 1-6.
+        """
+        lines = iter(lines)
+        first_line = next(lines, '')
+        if 'tabellnr' in first_line:
+            delimiter = ';' if ';' in first_line else ','
+            header = [name.strip().strip('"').lower() for name in next(csv.reader([first_line], delimiter=delimiter))]
+            if 'år' not in header and not year:
+                raise UserError(_("The tax table file has no year column, a year is required."))
+            records = (dict(zip(header, values)) for values in csv.reader(lines, delimiter=delimiter))
+        else:
+            if not year:
+                raise UserError(_("A year is required when importing fixed-width tax table files."))
+            records = (
+                {name: line[start:end] for name, start, end in _FIXED_WIDTH_LAYOUT}
+                for line in chain([first_line], lines) if line.strip()
+            )
+
+        for record in records:
+            period = (record.get('antal dgr') or '').strip()
+            table_type = _PERIOD_TABLE_TYPES.get(period.rstrip('B%D'))
+            if not table_type:
+                continue
+            row_year = int(record.get('år') or year)
+            if year and row_year != int(year):
+                continue
+            upper = _parse_tax_number(record.get('inkomst t.o.m.'))
+            yield (
+                row_year,
+                str(int(record['tabellnr'])),
+                table_type,
+                period.endswith('%'),
+                _parse_tax_number(record.get('inkomst fr.o.m.')) or 0.0,
+                upper if upper is not None else _OPEN_UPPER_LIMIT,
+                [_parse_tax_number(record.get('kolumn %s' % column)) for column in range(1, 7)],
+            )
+
     @api.model
-    def import_tax_tables(self):
-        """Import tax tables from Skatteverket"""
-        # This would fetch and parse tax tables from Skatteverket
-        # Implementation depends on available APIs or files
-        pass
+    def _load_tax_table_rows(self, rows):
+        """Synchronize parsed bracket rows with the stored tables
+
+        Rows are staged in a temporary table with batched multi-row INSERTs,
+        so memory use does not grow with the file and the order of the rows
+        in it does not matter. The tables are then synchronized one at a
+        time; columns a table no longer has values for lose their brackets.
+        Returns a dict with the counts of added/removed/changed brackets and
+        of changed/unchanged columns.
+        """
+        stats = dict.fromkeys([
+            'brackets_added', 'brackets_removed', 'brackets_changed', 'columns_changed', 'columns_unchanged',
+        ], 0)
+        table_keys = self._stage_tax_table_rows(rows)
+
+        cr = self.env.cr
+        changed_column_ids = []
+        pending = []
+        for year, table_number, table_type in sorted(table_keys):
+            columns = self._prepare_import_columns(year, table_number, table_type)
+            cr.execute("""
+                SELECT column_number, lower_limit, upper_limit, tax_amount, is_percentage
+                  FROM hr_swedish_tax_import_row
+                 WHERE year = %s AND table_number = %s AND table_type = %s
+              ORDER BY column_number
+            """, (year, table_number, table_type))
+            blocks = {
+                column_number: [row[1:] for row in column_rows]
+                for column_number, column_rows in groupby(cr.fetchall(), key=lambda row: row[0])
+            }
+            for column_number, column in sorted(columns.items()):
+                block = blocks.get(column_number)
+                if not block:
+                    self._clear_tax_column(column, stats)
+                elif self._sync_tax_column(column, block, stats, pending):
+                    changed_column_ids.append(column.id)
+                if len(pending) >= _IMPORT_BATCH_SIZE:
+                    self._insert_tax_brackets(pending)
+                    pending = []
+        if pending:
+            self._insert_tax_brackets(pending)
+        cr.execute("DROP TABLE hr_swedish_tax_import_row")
+        self._validate_tax_brackets(changed_column_ids)
+
+        self.env['hr.swedish.tax.table.column'].invalidate_model(['checksum'])
+        self.env['hr.swedish.tax.bracket'].invalidate_model()
+        self._invalidate_tax_lookup()
+        return stats
+
+    @api.model
+    def _stage_tax_table_rows(self, rows):
+        """Copy parsed rows into the hr_swedish_tax_import_row temporary table
+
+        One staged row is written per column amount, in batches of
+        _IMPORT_BATCH_SIZE. Returns the set of (year, table_number,
+        table_type) keys found, including tables without any amount.
+        """
+        cr = self.env.cr
+        cr.execute("""
+            CREATE TEMPORARY TABLE hr_swedish_tax_import_row (
+                year integer,
+                table_number varchar,
+                table_type varchar,
+                column_number integer,
+                lower_limit double precision,
+                upper_limit double precision,
+                tax_amount double precision,
+                is_percentage boolean
+            ) ON COMMIT DROP
+        """)
+        table_keys = set()
+        batch = []
+        for year, table_number, table_type, is_percentage, lower, upper, amounts in rows:
+            table_keys.add((year, table_number, table_type))
+            batch.extend(
+                (year, table_number, table_type, column_number, lower, upper, amount, is_percentage)
+                for column_number, amount in enumerate(amounts, 1)
+                if amount is not None
+            )
+            if len(batch) >= _IMPORT_BATCH_SIZE:
+                execute_values(cr._obj, "INSERT INTO hr_swedish_tax_import_row VALUES %s", batch, page_size=_IMPORT_BATCH_SIZE)
+                batch = []
+        if batch:
+            execute_values(cr._obj, "INSERT INTO hr_swedish_tax_import_row VALUES %s", batch, page_size=_IMPORT_BATCH_SIZE)
+        cr.execute("CREATE INDEX ON hr_swedish_tax_import_row (year, table_number, table_type)")
+        return table_keys
+
+    @api.model
+    def _sync_tax_column(self, column, block, stats, pending):
+        """Diff one column against its stored brackets
+
+        Unchanged columns are skipped on their checksum alone. Otherwise
+        brackets are matched on their lower and upper limits: only added and
+        changed brackets are queued for insertion into pending and only
+        removed and changed ones are deleted. Returns whether the column
+        was rewritten.
+        """
+        block.sort()
+        checksum = hashlib.sha1(repr(block).encode()).hexdigest()
+        if column.checksum == checksum:
+            stats['columns_unchanged'] += 1
+            return False
+        stats['columns_changed'] += 1
+
+        cr = self.env.cr
+        cr.execute(
+            "SELECT id, lower_limit, upper_limit, tax_amount, is_percentage FROM hr_swedish_tax_bracket WHERE column_id = %s",
+            (column.id,)
+        )
+        # Keyed on both limits, and a list as a column may hold duplicates
+        existing = defaultdict(list)
+        for bracket_id, lower, upper, amount, is_percentage in cr.fetchall():
+            existing[(lower, upper)].append((bracket_id, (lower, upper, amount, is_percentage)))
+        stale_ids = []
+        for row in block:
+            matches = existing.get(row[:2])
+            if not matches:
+                stats['brackets_added'] += 1
+            else:
+                match = next((match for match in matches if match[1] == row), matches[0])
+                matches.remove(match)
+                if match[1] == row:
+                    continue
+                stats['brackets_changed'] += 1
+                stale_ids.append(match[0])
+            pending.append((column.id,) + row)
+        removed_ids = [bracket_id for matches in existing.values() for bracket_id, _stored in matches]
+        stats['brackets_removed'] += len(removed_ids)
+        stale_ids.extend(removed_ids)
+
+        if stale_ids:
+            cr.execute("DELETE FROM hr_swedish_tax_bracket WHERE id IN %s", (tuple(stale_ids),))
+        cr.execute("UPDATE hr_swedish_tax_table_column SET checksum = %s WHERE id = %s", (checksum, column.id))
+        return True
+
+    @api.model
+    def _clear_tax_column(self, column, stats):
+        """Remove the brackets of a column that is missing from the import"""
+        cr = self.env.cr
+        cr.execute("DELETE FROM hr_swedish_tax_bracket WHERE column_id = %s", (column.id,))
+        stats['brackets_removed'] += cr.rowcount
+        if cr.rowcount or column.checksum:
+            stats['columns_changed'] += 1
+            cr.execute("UPDATE hr_swedish_tax_table_column SET checksum = NULL WHERE id = %s", (column.id,))
+
+    def action_validate_brackets(self):
+        self._validate_tax_brackets(self.column_ids.ids)
+        return True
+
+    @api.model
+    def _validate_tax_brackets(self, column_ids):
+        """Check the brackets of whole columns in one query
+
+        Brackets are compared with their predecessor in the column to find
+        inverted limits, overlaps, gaps (limits are inclusive whole kronor,
+        as in Skatteverket's tables) and decreasing amounts. Raises a
+        ValidationError listing the first problems found.
+        """
+        if not column_ids:
+            return
+        self.env['hr.swedish.tax.bracket'].flush_model()
+        self.env.cr.execute("""
+            WITH ordered AS (
+                SELECT b.column_id, b.lower_limit, b.upper_limit, b.tax_amount, b.is_percentage,
+                       LAG(b.upper_limit) OVER w AS prev_upper,
+                       LAG(b.tax_amount) OVER w AS prev_amount,
+                       LAG(b.is_percentage) OVER w AS prev_percentage
+                  FROM hr_swedish_tax_bracket b
+                 WHERE b.column_id IN %s
+                WINDOW w AS (PARTITION BY b.column_id ORDER BY b.lower_limit)
+            )
+            SELECT t.name, c.name, o.lower_limit,
+                   CASE WHEN o.lower_limit >= o.upper_limit THEN 'limits'
+                        WHEN o.lower_limit <= o.prev_upper THEN 'overlap'
+                        WHEN o.lower_limit > o.prev_upper + %s THEN 'gap'
+                        ELSE 'amount' END
+              FROM ordered o
+              JOIN hr_swedish_tax_table_column c ON c.id = o.column_id
+              JOIN hr_swedish_tax_table t ON t.id = c.table_id
+             WHERE o.lower_limit >= o.upper_limit
+                OR o.lower_limit <= o.prev_upper
+                OR o.lower_limit > o.prev_upper + %s
+                OR (o.is_percentage = o.prev_percentage AND o.tax_amount < o.prev_amount)
+          ORDER BY t.name, c.column_number, o.lower_limit
+             LIMIT %s
+        """, (tuple(column_ids), _BRACKET_GAP_TOLERANCE, _BRACKET_GAP_TOLERANCE, _VALIDATION_REPORT_LIMIT))
+        problems = self.env.cr.fetchall()
+        if problems:
+            descriptions = {
+                'limits': _("upper limit not above lower limit"),
+                'overlap': _("overlaps previous bracket"),
+                'gap': _("gap after previous bracket"),
+                'amount': _("amount lower than previous bracket"),
+            }
+            raise ValidationError(_("Invalid tax brackets:\n%s") % '\n'.join(
+                "%s, %s, from %s: %s" % (table, column, lower, descriptions[kind])
+                for table, column, lower, kind in problems
+            ))
+
+    @api.model
+    def _prepare_import_columns(self, year, table_number, table_type):
+        """Get or create a table with its six columns
+
+        Returns a {column_number: column} map.
+        """
+        table = self.search([
+            ('year', '=', year),
+            ('table_number', '=', table_number),
+            ('table_type', '=', table_type),
+        ], limit=1)
+        if not table:
+            table = self.create({
+                'name': f"Tabell {table_number} ({year})",
+                'table_number': table_number,
+                'year': year,
+                'table_type': table_type,
+            })
+        columns = {column.column_number: column for column in table.column_ids}
+        missing = [number for number in range(1, 7) if number not in columns]
+        if missing:
+            new_columns = self.env['hr.swedish.tax.table.column'].create([{
+                'name': f"Kolumn {number}",
+                'column_number': number,
+                'table_id': table.id,
+            } for number in missing])
+            columns.update({column.column_number: column for column in new_columns})
+        return columns
+
+    @api.model
+    def _insert_tax_brackets(self, batch):
+        """Insert (column_id, lower, upper, amount, is_percentage) rows"""
+        uid = self.env.uid
+        execute_values(self.env.cr._obj, """
+            INSERT INTO hr_swedish_tax_bracket
+                (column_id, lower_limit, upper_limit, tax_amount, is_percentage,
+                 create_uid, create_date, write_uid, write_date)
+            VALUES %s
+        """, batch, template="(%%s, %%s, %%s, %%s, %%s, %s, now() at time zone 'UTC', %s, now() at time zone 'UTC')" % (uid, uid),
+            page_size=_IMPORT_BATCH_SIZE)
+        return len(batch)
+
+    @api.model
+    def _invalidate_tax_lookup(self):
+        """Drop the compiled tax tables and rebuild the snapshot on commit
+
+        Until then, lookups in this transaction read the brackets from the
+        database instead of the outdated snapshot. The new snapshot gets a
+        new version, which makes the other workers map it.
+        """
+        self._get_compiled_tax_tables.clear_cache(self)
+        precommit = self.env.cr.precommit
+        if not precommit.data.get(_SNAPSHOT_STALE_KEY):
+            precommit.data[_SNAPSHOT_STALE_KEY] = True
+            precommit.add(self._export_stale_tax_snapshot)
+
+    @api.model
+    def _export_stale_tax_snapshot(self):
+        if self.env.cr.precommit.data.get(_SNAPSHOT_STALE_KEY):
+            self._export_tax_snapshot()
+            # Precommit hooks run after the ORM flush
+            self.env['ir.config_parameter'].flush_model()
+
+    @api.model
+    def _get_tax_snapshot_path(self):
+        return os.path.join(tools.config.filestore(self.env.cr.dbname), 'l10n_se_hr', _SNAPSHOT_FILENAME)
+
+    @api.model
+    @tools.ormcache()
+    def _get_tax_snapshot_version(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param('l10n_se_hr.tax_snapshot_version', 0))
+
+    @api.model
+    def _export_tax_snapshot(self):
+        """Write all brackets to a versioned binary snapshot in the filestore
+
+        Layout: a header (magic, version, entry count, index offset), the
+        float64 arrays of lower limits, upper limits, amounts and percentage
+        flags of each (year, table, column), then the index locating them.
+        The file is replaced atomically so workers still mapping the old one
+        are unaffected.
+        """
+        self.env['hr.swedish.tax.bracket'].flush_model()
+        self.env['hr.swedish.tax.table.column'].flush_model(['table_id', 'column_number'])
+        self.flush_model(['year', 'table_number', 'table_type'])
+        # Timestamp based, so a version is never reused
+        version = time.time_ns() // 1000
+        path = self._get_tax_snapshot_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = '%s.%s.tmp' % (path, os.getpid())
+
+        self.env.cr.execute("""
+            SELECT t.year, t.table_number, t.table_type, c.column_number,
+                   b.lower_limit, b.upper_limit, b.tax_amount, b.is_percentage
+              FROM hr_swedish_tax_bracket b
+              JOIN hr_swedish_tax_table_column c ON c.id = b.column_id
+              JOIN hr_swedish_tax_table t ON t.id = c.table_id
+          ORDER BY t.year, t.table_number, t.table_type, c.column_number, b.lower_limit
+        """)
+        index = []
+        with open(tmp_path, 'wb') as snapshot:
+            snapshot.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, version, 0, 0))
+            for key, rows in groupby(self.env.cr.fetchall(), key=lambda row: row[:4]):
+                rows = list(rows)
+                index.append((key, snapshot.tell(), len(rows)))
+                for position in range(4, 8):
+                    array('d', (float(row[position]) for row in rows)).tofile(snapshot)
+            index_offset = snapshot.tell()
+            for (year, table_number, table_type, column_number), offset, count in index:
+                snapshot.write(_SNAPSHOT_ENTRY.pack(
+                    year, table_number.encode(), _TABLE_TYPE_CODES[table_type], column_number, offset, count
+                ))
+            snapshot.seek(0)
+            snapshot.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, version, len(index), index_offset))
+        os.replace(tmp_path, path)
+
+        self.env['ir.config_parameter'].sudo().set_param('l10n_se_hr.tax_snapshot_version', version)
+        self._get_tax_snapshot_version.clear_cache(self)
+        self.env.cr.precommit.data.pop(_SNAPSHOT_STALE_KEY, None)
+        _logger.info("Exported tax table snapshot version %s with %s columns to %s", version, len(index), path)
+        return version
+
+    @api.model
+    def _get_tax_snapshot(self):
+        """Return this worker's mapping of the current snapshot, or None
+
+        None as well when this transaction changed brackets since the
+        snapshot was written.
+        """
+        if self.env.cr.precommit.data.get(_SNAPSHOT_STALE_KEY):
+            return None
+        version = self._get_tax_snapshot_version()
+        if not version:
+            return None
+        dbname = self.env.cr.dbname
+        snapshot = _tax_snapshots.get(dbname)
+        if snapshot is None or snapshot.version != version:
+            # A replaced mapping is unmapped once the last view on it is gone
+            _tax_snapshots.pop(dbname, None)
+            try:
+                snapshot = _TaxSnapshot(self._get_tax_snapshot_path())
+            except (OSError, ValueError) as e:
+                _logger.warning("Could not open tax table snapshot: %s", e)
+                return None
+            if snapshot.version != version:
+                return None
+            _tax_snapshots[dbname] = snapshot
+        return snapshot
+
+    @api.model
+    def lookup(self, year, table_number, column, monthly_income, table_type='table_29'):
+        """Return the preliminary tax for an income from the compiled tax tables.
+
+        Brackets are read from the memory-mapped snapshot shared by all
+        workers, or compiled once per worker from the database when no
+        current snapshot exists (see _get_compiled_tax_tables), so repeated
+        lookups during a payslip run do not hit the database. Returns None
+        if no bracket matches.
+        """
+        column_number = self._normalize_column_number(column)
+        snapshot = self._get_tax_snapshot()
+        if snapshot is not None:
+            packed = snapshot.get(int(year), str(table_number), table_type, column_number)
+        else:
+            packed = self._get_compiled_tax_tables(int(year)).get((str(table_number), table_type, column_number))
+        if not packed:
+            return None
+        lowers, uppers, amounts, percentages = packed
+        idx = bisect_right(lowers, monthly_income) - 1
+        if idx < 0 or monthly_income > uppers[idx]:
+            return None
+        if percentages[idx]:
+            return monthly_income * amounts[idx] / 100.0
+        return amounts[idx]
+
+    @api.model
+    def _normalize_column_number(self, column):
+        """Accept both 3 and 'column_3' (hr.payslip.tax_column)"""
+        if isinstance(column, str):
+            column = column.replace('column_', '')
+        return int(column)
+
+    @api.model
+    @tools.ormcache('year')
+    def _get_compiled_tax_tables(self, year):
+        """Pack all brackets of a year into sorted arrays per table column.
+
+        Keys are (table_number, table_type, column_number) and values are
+        (lower_limits, upper_limits, amounts, is_percentage) arrays ordered
+        by lower limit, ready for binary search.
+        """
+        self.env.cr.execute("""
+            SELECT t.table_number, t.table_type, c.column_number,
+                   b.lower_limit, b.upper_limit, b.tax_amount, b.is_percentage
+              FROM hr_swedish_tax_bracket b
+              JOIN hr_swedish_tax_table_column c ON c.id = b.column_id
+              JOIN hr_swedish_tax_table t ON t.id = c.table_id
+             WHERE t.year = %s
+          ORDER BY t.table_number, t.table_type, c.column_number, b.lower_limit
+        """, (year,))
+        compiled = {}
+        for table_number, table_type, column_number, lower, upper, amount, is_pct in self.env.cr.fetchall():
+            key = (table_number, table_type, column_number)
+            if key not in compiled:
+                compiled[key] = (array('d'), array('d'), array('d'), array('b'))
+            lowers, uppers, amounts, percentages = compiled[key]
+            lowers.append(lower)
+            uppers.append(upper)
+            amounts.append(amount)
+            percentages.append(1 if is_pct else 0)
+        return compiled
 
 
 class SwedishTaxTableColumn(models.Model):
@@ -35,6 +647,31 @@ class SwedishTaxTableColumn(models.Model):
     column_number = fields.Integer(string='Column Number', required=True)
     table_id = fields.Many2one('hr.swedish.tax.table', string='Tax Table', required=True, ondelete='cascade')
     bracket_ids = fields.One2many('hr.swedish.tax.bracket', 'column_id', string='Tax Brackets')
+    checksum = fields.Char(string='Checksum', readonly=True, copy=False,
+                           help='Hash of the brackets as last imported, used to skip unchanged columns on reimport')
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'bracket_ids' in vals:
+            self._reset_checksum()
+        if {'column_number', 'table_id', 'bracket_ids'} & set(vals):
+            self.env['hr.swedish.tax.table']._invalidate_tax_lookup()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['hr.swedish.tax.table']._invalidate_tax_lookup()
+        return res
+
+    def _reset_checksum(self):
+        """Forget the import checksum of manually edited columns
+
+        The next import then diffs them against the file instead of skipping
+        them as unchanged.
+        """
+        if self.ids:
+            self.env.cr.execute("UPDATE hr_swedish_tax_table_column SET checksum = NULL WHERE id IN %s", (tuple(self.ids),))
+            self.invalidate_recordset(['checksum'])
 
 
 class SwedishTaxBracket(models.Model):
@@ -47,9 +684,52 @@ class SwedishTaxBracket(models.Model):
     upper_limit = fields.Float(string='Upper Income Limit', required=True)
     tax_amount = fields.Float(string='Tax Amount', required=True, help='Fixed amount or percentage depending on table type')
     is_percentage = fields.Boolean(string='Is Percentage', default=False)
-    
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        brackets = super().create(vals_list)
+        TaxTable = self.env['hr.swedish.tax.table']
+        if self.env.context.get('tax_bracket_bulk_load'):
+            TaxTable._validate_tax_brackets(brackets.column_id.ids)
+        brackets.column_id._reset_checksum()
+        TaxTable._invalidate_tax_lookup()
+        return brackets
+
+    def write(self, vals):
+        columns = self.column_id
+        res = super().write(vals)
+        if {'column_id', 'lower_limit', 'upper_limit', 'tax_amount', 'is_percentage'} & set(vals):
+            (columns | self.column_id)._reset_checksum()
+            self.env['hr.swedish.tax.table']._invalidate_tax_lookup()
+        return res
+
+    def unlink(self):
+        columns = self.column_id
+        res = super().unlink()
+        columns._reset_checksum()
+        self.env['hr.swedish.tax.table']._invalidate_tax_lookup()
+        return res
+
     @api.constrains('lower_limit', 'upper_limit')
     def _check_limits(self):
+        if self.env.context.get('tax_bracket_bulk_load'):
+            # Checked per column by _validate_tax_brackets once the load is done
+            return
         for bracket in self:
             if bracket.lower_limit >= bracket.upper_limit:
-                raise ValidationError("Upper limit must be greater than lower limit.")
\ No newline at end of file
+                raise ValidationError("Upper limit must be greater than lower limit.")
+
+
+class SwedishTaxImport(models.Model):
+    _name = 'hr.swedish.tax.import'
+    _description = 'Swedish Tax Table Import'
+    _order = 'create_date desc'
+    _rec_name = 'source'
+
+    source = fields.Char(string='Source', readonly=True)
+    year = fields.Integer(string='Year', readonly=True)
+    brackets_added = fields.Integer(string='Brackets Added', readonly=True)
+    brackets_removed = fields.Integer(string='Brackets Removed', readonly=True)
+    brackets_changed = fields.Integer(string='Brackets Changed', readonly=True)
+    columns_changed = fields.Integer(string='Columns Rewritten', readonly=True)
+    columns_unchanged = fields.Integer(string='Columns Unchanged', readonly=True)
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+from . import test_tax_lookup
+from . import test_tax_table_import
+from . import test_tax_batch
+from . import test_tax_snapshot
+from . import test_salary_rule_cache
+from . import test_payslip_chunks
+from . import test_overtime
+from . import test_municipality_updater
+from . import test_municipality_rates
+from . import test_reference_data
+from . import test_personnummer
+from . import test_employee_import
+from . import test_vacation_balance
+from . import test_sick_leave_statistics
+from . import test_parental_ledger
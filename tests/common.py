@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from datetime import date, datetime, time
+
+from odoo.tests.common import TransactionCase
+
+
+class SwedishHrCase(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env = cls.env(context=dict(cls.env.context, tracking_disable=True))
+        cls.employee = cls.env['hr.employee'].create({
+            'name': 'Anna Andersson',
+            'swedish_personnummer': '811218-9876',
+        })
+        # 16 800 kr a month is 100 kr an hour for overtime
+        cls.contract = cls.env['hr.contract'].create({
+            'name': 'Anna Andersson',
+            'employee_id': cls.employee.id,
+            'wage': 16800.0,
+            'date_start': date(2020, 1, 1),
+            'state': 'open',
+        })
+
+    @classmethod
+    def _create_leave(cls, leave_type, date_from, date_to, number_of_days, **vals):
+        """Create an approved leave without going through the approval flow"""
+        return cls.env['hr.leave'].with_context(leave_fast_create=True, leave_skip_state_check=True).create(dict({
+            'name': 'Test leave',
+            'employee_id': cls.employee.id,
+            'holiday_status_id': leave_type.id,
+            'date_from': datetime.combine(date_from, time(8)),
+            'date_to': datetime.combine(date_to, time(17)),
+            'number_of_days': number_of_days,
+            'state': 'validate',
+        }, **vals))
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import base64
+
+from odoo.tests import tagged
+
+from .common import SwedishHrCase
+
+EMPLOYEES_CSV = (
+    "name;personnummer;municipality_code;region_code;work_email;private_email\n"
+    "Bo Berg;121212-1212;0114;01;bo@example.com;bo@home.example\n"
+    "Anna Andersson;19811218-9876;0114;01;;\n"
+    "Cecilia Ek;811218-9875;0114;;;\n"
+    "David Dahl;701063-2391;9999;;;\n"
+)
+
+
+@tagged('post_install', '-at_install')
+class TestEmployeeImport(SwedishHrCase):
+
+    def test_import_wizard(self):
+        wizard = self.env['hr.employee.import.wizard'].create({
+            'file': base64.b64encode(('\ufeff' + EMPLOYEES_CSV).encode()),
+            'filename': 'employees.csv',
+            'chunk_size': 2,
+        })
+        wizard.action_import()
+        self.assertEqual(wizard.state, 'done')
+        self.assertEqual(wizard.created_count, 1)
+        self.assertEqual(wizard.error_count, 3)
+        for line in (3, 4, 5):
+            self.assertIn("Line %s:" % line, wizard.error_log)
+
+        employee = self.env['hr.employee'].search([('swedish_personnummer', '=', '121212-1212')])
+        self.assertEqual(employee.name, 'Bo Berg')
+        self.assertEqual(employee.municipality_id, self.env.ref('l10n_se_hr.municipality_0114'))
+        self.assertEqual(employee.region_id, self.env.ref('l10n_se_hr.region_01'))
+        self.assertEqual(employee.work_email, 'bo@example.com')
+        # Only allow-listed columns are written
+        self.assertFalse(employee.private_email)
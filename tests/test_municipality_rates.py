@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import importlib.util
+import os
+from datetime import date
+
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+from odoo.addons.l10n_se_hr.models.municipality_updater import FetchResult
+
+
+def _load_migration(version, name):
+    path = os.path.join(os.path.dirname(__file__), '..', 'migrations', version, name + '.py')
+    spec = importlib.util.spec_from_file_location('l10n_se_hr_migration_%s' % name.replace('-', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@tagged('post_install', '-at_install')
+class TestMunicipalityRates(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        region = cls.env['res.region'].create({'name': 'Testlän', 'code': '99'})
+        cls.municipality = cls.env['res.municipality'].create({
+            'name': 'Testby',
+            'code': '9901',
+            'region_id': region.id,
+            'tax_table_number': '33',
+            'total_tax_rate': 32.6,
+            'church_tax_rate': 1.2,
+        })
+        cls.parish = cls.env['res.parish'].create({
+            'name': 'Testby församling',
+            'municipality_id': cls.municipality.id,
+        })
+
+    def test_rate_at_year(self):
+        self.env['res.municipality.tax.rate'].create({
+            'municipality_id': self.municipality.id,
+            'year': 2029,
+            'tax_table_number': '32',
+            'total_tax_rate': 31.9,
+            'church_tax_rate': 1.1,
+        })
+        self.assertEqual(self.municipality.rate_at(date(2029, 12, 31)), (31.9, 1.1))
+        # Another year's rates are never used
+        with self.assertRaises(UserError):
+            self.municipality.rate_at(date(2030, 1, 1))
+
+    def test_migration_backfills_history(self):
+        year = date.today().year
+        self.env['res.municipality.tax.rate'].create({
+            'municipality_id': self.municipality.id,
+            'year': year,
+            'total_tax_rate': 33.0,
+            'church_tax_rate': 1.3,
+        })
+        # Rates kept on the municipality, as in 1.0
+        other = self.municipality.copy({'code': '9902', 'name': 'Gammelby', 'total_tax_rate': 31.5, 'church_tax_rate': 0.9})
+        self.env.flush_all()
+        _load_migration('1.1', 'post-migrate')._backfill_rate_history(self.env.cr)
+        self.env.invalidate_all()
+        self.env.registry.clear_caches()
+
+        self.assertEqual(other.rate_at(), (31.5, 0.9))
+        self.assertEqual(other.rate_ids.filtered(lambda rate: rate.year == year).tax_table_number, '33')
+        # Existing history is kept
+        self.assertEqual(self.municipality.rate_at(), (33.0, 1.3))
+        # Parishes take the church rate 1.0 applied to their municipality
+        self.assertEqual(self.parish.church_tax_rate, 1.2)
+        self.assertEqual(self.parish.church_rate_at(), 1.2)
+
+    def test_default_rates_fallback(self):
+        municipality = self.municipality.copy({'code': '9902', 'name': 'Nollby', 'total_tax_rate': 0.0, 'church_tax_rate': 0.0})
+        success, message = self.env['municipality.updater']._update_tax_rates(FetchResult(500), [])
+        self.assertTrue(success)
+        self.assertEqual(municipality.total_tax_rate, 32.0)
+        # Payslips look rates up in the history, the defaults are recorded there
+        self.assertEqual(municipality.rate_at(), (32.0, 1.0))
+        # Municipalities with rates are left alone
+        self.assertEqual(self.municipality.total_tax_rate, 32.6)
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import tempfile
+from datetime import date
+from unittest.mock import patch
+
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('post_install', '-at_install')
+class TestMunicipalityUpdater(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        region = cls.env['res.region'].create({'name': 'Testlän', 'code': '99'})
+        cls.municipality = cls.env['res.municipality'].create({
+            'name': 'Testby',
+            'code': '9901',
+            'region_id': region.id,
+            'tax_table_number': '30',
+        })
+        cls.updater = cls.env['municipality.updater']
+
+    def _rows(self, total_tax_rate, church_tax_rates):
+        return [
+            ('9901', 'Testby', total_tax_rate, church_tax_rate, '99010%s' % index, 'Församling %s' % index)
+            for index, church_tax_rate in enumerate(church_tax_rates, 1)
+        ]
+
+    def _history(self, year):
+        return self.env['res.municipality.tax.rate'].search([
+            ('municipality_id', '=', self.municipality.id), ('year', '=', year),
+        ])
+
+    def test_history_keeps_church_rate(self):
+        report = self.updater._upsert_tax_rates(self._rows(32.4, [1.25, 1.1]), 2030)
+        self.assertEqual(report['matched'], 1)
+        rate = self._history(2030)
+        self.assertEqual(rate.tax_table_number, '32')
+        self.assertAlmostEqual(rate.total_tax_rate, 32.4)
+        # The municipality takes the church rate of its first parish row
+        self.assertAlmostEqual(rate.church_tax_rate, 1.25)
+        self.assertEqual(self.municipality.rate_at(date(2030, 6, 1)), (32.4, 1.25))
+
+        # Only the church rate changed
+        report = self.updater._upsert_tax_rates(self._rows(32.4, [1.3]), 2030)
+        self.assertEqual(report['updated'], 1)
+        self.assertAlmostEqual(self._history(2030).church_tax_rate, 1.3)
+
+        report = self.updater._upsert_tax_rates(self._rows(32.4, [1.3]), 2030)
+        self.assertEqual(report['updated'], 0)
+
+    def test_current_year_updates_municipality(self):
+        year = date.today().year
+        self.updater._upsert_tax_rates(self._rows(31.6, [0.9]), year)
+        self.assertAlmostEqual(self._history(year).church_tax_rate, 0.9)
+        self.assertAlmostEqual(self.municipality.total_tax_rate, 31.6)
+        self.assertAlmostEqual(self.municipality.church_tax_rate, 0.9)
+
+    def test_rowstore_pages_follow_next_link(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        cache_dir = os.path.join(tmp_dir, 'cache')
+        os.makedirs(cache_dir)
+
+        def write_page(name, page):
+            path = os.path.join(tmp_dir, name)
+            with open(path, 'w') as page_file:
+                json.dump(page, page_file)
+            return 'file://' + path
+
+        def record(parish_code, church_tax_rate):
+            return {
+                'år': '2030', 'kommun': 'Testby', 'församling': 'Församling',
+                'församlings-kod': parish_code, 'summa, exkl. kyrkoavgift': '32,40',
+                'kyrkoavgift': church_tax_rate, 'begravnings-avgift': '0,25',
+            }
+
+        last_url = write_page('page2.json', {'results': [record('990102', '1,10')], 'next': None})
+        # The next link may come before the results
+        first_url = write_page('page1.json', {'next': last_url, 'results': [record('990101', '1,00'), dict(record('990101', '1,00'), år='2029')]})
+
+        with patch.object(type(self.updater), '_get_cache_dir', return_value=cache_dir):
+            payload = self.updater._fetch_source(cache_dir, 'skatteverket', 'GET', first_url)
+            self.assertTrue(payload.changed)
+            fetched = [payload]
+            stats = dict.fromkeys(['pages', 'unchanged_pages', 'records', 'errors'], 0)
+            rates = list(self.updater._iter_tax_rates(payload, fetched, 2030, stats))
+            self.assertEqual([rate[4] for rate in rates], ['990101', '990102'])
+            self.assertEqual(rates[0][3], 1.25)
+            self.assertEqual((stats['pages'], stats['records']), (2, 3))
+            self.assertEqual(len(fetched), 2)
+
+            for page in fetched:
+                page.mark_processed()
+            self.updater._upsert_tax_rates(rates, 2030)
+            payload = self.updater._fetch_source(cache_dir, 'skatteverket', 'GET', first_url)
+            self.assertFalse(payload.changed)
+            # Unchanged pages of a year with history are skipped, their next link is still followed
+            stats = dict.fromkeys(['pages', 'unchanged_pages', 'records', 'errors'], 0)
+            self.assertFalse(list(self.updater._iter_tax_rates(payload, [payload], 2030, stats)))
+            self.assertEqual((stats['pages'], stats['unchanged_pages']), (2, 2))
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+
+from odoo.exceptions import UserError, ValidationError
+from odoo.tests import tagged
+
+from .common import SwedishHrCase
+
+
+@tagged('post_install', '-at_install')
+class TestOvertime(SwedishHrCase):
+
+    def _create_overtime(self, on_date, hours=2.0, state='approved', **vals):
+        return self.env['hr.overtime.swedish'].create(dict({
+            'name': 'Release night',
+            'employee_id': self.employee.id,
+            'date': on_date,
+            'time_start': 17.0,
+            'time_end': 17.0 + hours,
+            'compensation_type': 'money',
+            'state': state,
+        }, **vals))
+
+    def _get_summary(self, year, month):
+        return self.env['hr.overtime.swedish.summary'].search([
+            ('employee_id', '=', self.employee.id), ('year', '=', year), ('month', '=', month),
+        ])
+
+    def _create_payslip(self):
+        return self.env['hr.payslip'].create({
+            'name': 'March 2024',
+            'employee_id': self.employee.id,
+            'contract_id': self.contract.id,
+            'date_from': date(2024, 3, 1),
+            'date_to': date(2024, 3, 31),
+        })
+
+    def test_summary_counts_approved_and_paid(self):
+        # Tuesdays, so the regular 1.5 multiplier applies
+        self._create_overtime(date(2024, 3, 5), hours=2.0)
+        self._create_overtime(date(2024, 3, 12), hours=3.0, state='paid')
+        self._create_overtime(date(2024, 4, 2), hours=4.0)
+        draft = self._create_overtime(date(2024, 4, 9), hours=5.0, state='draft')
+
+        self.assertEqual(self._get_summary(2024, 3).hours, 5.0)
+        self.assertEqual(self._get_summary(2024, 3).overtime_count, 2)
+        self.assertEqual(self._get_summary(2024, 0).hours, 9.0)
+
+        draft.action_approve()
+        self.assertEqual(self._get_summary(2024, 4).hours, 9.0)
+        self.assertEqual(self._get_summary(2024, 0).hours, 14.0)
+        self.assertEqual(self.employee.overtime_hours, 14.0)
+
+    def test_monthly_limit(self):
+        for day in (4, 5, 6, 7):
+            self._create_overtime(date(2024, 3, day), hours=10.0, time_start=8.0)
+        with self.assertRaises(ValidationError):
+            self._create_overtime(date(2024, 3, 11), hours=10.0, time_start=8.0)
+        # Emergency overtime is not counted against the limits
+        self._create_overtime(date(2024, 3, 11), hours=10.0, time_start=8.0, overtime_type='emergency')
+
+    def test_yearly_limit(self):
+        for month in range(1, 6):
+            for day in (8, 9, 10, 11):
+                self._create_overtime(date(2024, month, day), hours=10.0, time_start=8.0)
+        self.assertEqual(self._get_summary(2024, 0).hours, 200.0)
+        with self.assertRaises(ValidationError):
+            self._create_overtime(date(2024, 6, 3), hours=1.0)
+
+    def test_settle_computed_overtime(self):
+        # A Tuesday, so the regular 1.5 multiplier applies
+        computed = self._create_overtime(date(2024, 3, 5))
+        slip = self._create_payslip()
+        slip.compute_sheet()
+        self.assertEqual(slip.swedish_computed_overtime_ids, computed)
+        self.assertEqual(computed.compensation_amount, 300.0)
+
+        # Approved after the computation: not paid by this slip
+        late = self._create_overtime(date(2024, 3, 12))
+        slip._settle_swedish_overtime()
+        self.assertEqual(computed.state, 'paid')
+        self.assertEqual(computed.payslip_id, slip)
+        self.assertEqual(late.state, 'approved')
+        self.assertFalse(late.payslip_id)
+        # Settling moves approved to paid, the totals stay the same
+        self.assertEqual(self._get_summary(2024, 3).hours, 4.0)
+
+    def test_dirty_slip_cannot_be_confirmed(self):
+        slip = self._create_payslip()
+        slip.compute_sheet()
+        slip.write({'swedish_dirty': True, 'swedish_dirty_rules': 'SEOVT'})
+        with self.assertRaises(UserError):
+            slip.action_payslip_done()
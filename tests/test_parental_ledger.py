@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from datetime import date, timedelta
+
+from dateutil.relativedelta import relativedelta
+
+from odoo.tests import tagged
+
+from .common import SwedishHrCase
+
+
+@tagged('post_install', '-at_install')
+class TestParentalLedger(SwedishHrCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.parental_type = cls.env.ref('l10n_se_hr.holiday_status_swedish_parental_leave')
+
+    def test_parental_ledger(self):
+        today = date.today()
+        child = self.env['hr.employee.child'].create({
+            'name': 'Lisa',
+            'birth_date': today - relativedelta(years=2),
+            'employee_id': self.employee.id,
+        })
+        self.assertEqual(child.parental_days_remaining, 480)
+        self.assertEqual(self.employee.parental_leave_days_remaining, 480)
+
+        start = today - timedelta(days=60)
+        # Half time parental leave draws half a benefit day per day
+        self._create_leave(self.parental_type, start, start + timedelta(days=13), 10,
+                           parental_leave_type='parental', benefit_percentage='50', child_id=child.id)
+        self.assertEqual(child.parental_days_used, 5)
+        child.invalidate_recordset()
+        self.assertEqual(child.parental_days_remaining, 475)
+        self.assertEqual(child.reserved_days_remaining, 85)
+        self.assertEqual(self.employee.parental_leave_days_used, 5)
+        self.assertEqual(self.employee.parental_leave_days_remaining, 475)
+        self.assertEqual(child.remaining_days(start - timedelta(days=1)), 480)
+
+        child.other_parent_days_used = 100
+        self.assertEqual(child.remaining_days(), 375)
+        self.assertEqual(child.parental_days_remaining, 375)
+        # Stored on the employee, so it can be searched
+        self.assertEqual(self.employee.parental_leave_days_remaining, 375)
+        self.assertIn(self.employee, self.env['hr.employee'].search([('parental_leave_days_remaining', '=', 375)]))
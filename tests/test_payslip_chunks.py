@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+from unittest.mock import patch
+
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+
+from .common import SwedishHrCase
+
+
+@tagged('post_install', '-at_install')
+class TestPayslipChunks(SwedishHrCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Department = cls.env['hr.department']
+        cls.employee.department_id = Department.create({'name': 'Stockholm'})
+        cls.other_employee = cls.env['hr.employee'].create({
+            'name': 'Bo Berg',
+            'department_id': Department.create({'name': 'Göteborg'}).id,
+        })
+        cls.other_contract = cls.env['hr.contract'].create({
+            'name': 'Bo Berg',
+            'employee_id': cls.other_employee.id,
+            'wage': 30000.0,
+            'date_start': date(2020, 1, 1),
+            'state': 'open',
+        })
+        cls.run = cls.env['hr.payslip.run'].create({
+            'name': 'March 2030',
+            'date_start': date(2030, 3, 1),
+            'date_end': date(2030, 3, 31),
+        })
+        cls.slips = cls.env['hr.payslip'].create([{
+            'name': 'March 2030',
+            'employee_id': contract.employee_id.id,
+            'contract_id': contract.id,
+            'payslip_run_id': cls.run.id,
+            'date_from': date(2030, 3, 1),
+            'date_to': date(2030, 3, 31),
+        } for contract in (cls.contract, cls.other_contract)])
+
+    def test_chunks_per_department(self):
+        chunks = self.run._get_parallel_chunks(200)
+        self.assertEqual(sorted(chunks), sorted([[slip.id] for slip in self.slips]))
+
+    def test_queue_triggers_one_cron_per_chunk(self):
+        self.run.action_compute_sheets_parallel()
+        chunks = self.env['hr.payslip.compute.chunk'].search([('payslip_run_id', '=', self.run.id)])
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(set(chunks.mapped('state')), {'queued'})
+        triggers = self.env['ir.cron.trigger'].search([('cron_id.code', '=', 'model._cron_compute_chunks()')])
+        self.assertEqual(len(triggers.cron_id), 2)
+
+    def test_cron_computes_chunks_and_reports(self):
+        self.run.action_compute_sheets_parallel()
+        other_employee = self.other_employee
+
+        def compute_sheet(slips):
+            if other_employee in slips.employee_id:
+                raise UserError("No salary structure")
+            slips.write({'state': 'verify'})
+            return True
+
+        # The cron opens its own cursors, sharing the test transaction in test mode
+        self.registry.enter_test_mode(self.cr)
+        self.addCleanup(self.registry.leave_test_mode)
+        with patch.object(type(self.env['hr.payslip']), 'compute_sheet', compute_sheet), \
+                patch.object(type(self.env['bus.bus']), '_sendone') as sendone:
+            self.env['hr.payslip.compute.chunk']._cron_compute_chunks()
+
+        chunks = self.env['hr.payslip.compute.chunk'].search([('payslip_run_id', '=', self.run.id)])
+        done = chunks.filtered(lambda chunk: chunk.state == 'done')
+        failed = chunks.filtered(lambda chunk: chunk.state == 'failed')
+        self.assertEqual(done.slip_ids.employee_id, self.employee)
+        self.assertEqual(failed.slip_ids.employee_id, self.other_employee)
+        self.assertIn('No salary structure', failed.error)
+        self.assertTrue(all(chunks.mapped('reported')))
+        self.slips.invalidate_recordset(['state'])
+        self.assertEqual(self.slips.mapped('state'), ['verify', 'draft'])
+
+        # One summary for the run, once its last chunk finished
+        self.assertEqual(sendone.call_count, 1)
+        notification = sendone.call_args[0][2]
+        self.assertEqual(notification['type'], 'warning')
+        self.assertIn('1 of 2 payslips computed', notification['message'])
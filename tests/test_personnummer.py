@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+
+from odoo.exceptions import ValidationError
+from odoo.tests import tagged
+
+from odoo.addons.l10n_se_hr.models.hr_employee import parse_personnummer_batch
+from .common import SwedishHrCase
+
+
+@tagged('post_install', '-at_install')
+class TestPersonnummer(SwedishHrCase):
+
+    def test_parse_formats(self):
+        today = date(2024, 6, 1)
+        for value in ('811218-9876', '8112189876', '19811218-9876', '198112189876', ' 811218 - 9876 '):
+            result = parse_personnummer_batch([value], today=today)[0]
+            self.assertEqual(result.code, 'valid', value)
+            self.assertEqual(result.normalized, '198112189876')
+            self.assertEqual(result.birth_date, date(1981, 12, 18))
+
+    def test_parse_luhn(self):
+        results = parse_personnummer_batch(['811218-9875', '811218-9876'], today=date(2024, 6, 1))
+        self.assertEqual([result.code for result in results], ['luhn', 'valid'])
+
+    def test_parse_invalid(self):
+        results = parse_personnummer_batch(['', 'abc', '811318-9876', '810230-1234'], today=date(2024, 6, 1))
+        self.assertEqual([result.code for result in results], ['empty', 'format', 'date', 'date'])
+
+    def test_parse_coordination_number(self):
+        # Samordningsnummer: day of birth plus 60, the key keeps the 63
+        result = parse_personnummer_batch(['701063-2391'], today=date(2024, 6, 1))[0]
+        self.assertEqual(result.code, 'valid')
+        self.assertEqual(result.normalized, '197010632391')
+        self.assertEqual(result.birth_date, date(1970, 10, 3))
+
+    def test_parse_century(self):
+        today = date(2024, 6, 1)
+        minus, plus = parse_personnummer_batch(['121212-1212', '121212+1212'], today=today)
+        self.assertEqual(minus.birth_date, date(2012, 12, 12))
+        # The + separator is used from the 100th birthday
+        self.assertEqual(plus.birth_date, date(1912, 12, 12))
+        self.assertEqual(plus.normalized, '191212121212')
+
+    def test_search_any_format(self):
+        Employee = self.env['hr.employee']
+        for value in ('811218-9876', '19811218-9876', '8112189876'):
+            self.assertEqual(Employee.search([('swedish_personnummer', '=', value)]), self.employee, value)
+        self.assertEqual(Employee.search([('swedish_personnummer', 'in', ['198112189876'])]), self.employee)
+
+    def test_search_dotted_and_nested(self):
+        Employee = self.env['hr.employee']
+        report = Employee.create({'name': 'Bo Berg', 'parent_id': self.employee.id})
+        self.assertEqual(Employee.search([('parent_id.swedish_personnummer', '=', '8112189876')]), report)
+        self.assertEqual(Employee.search([
+            '|', ('name', '=', 'Nobody'), ('parent_id.swedish_personnummer', '=', '811218-9876'),
+        ]), report)
+
+    def test_unique_among_active(self):
+        Employee = self.env['hr.employee']
+        with self.assertRaises(ValidationError):
+            Employee.create({'name': 'Duplicate', 'swedish_personnummer': '19811218-9876'})
+        # Archived employees keep their number without blocking a new one
+        self.employee.active = False
+        rehired = Employee.create({'name': 'Anna Andersson', 'swedish_personnummer': '19811218-9876'})
+        self.assertEqual(rehired.swedish_personnummer_key, '198112189876')
+
+    def test_match_batch(self):
+        matches = self.env['hr.employee'].match_personnummer_batch(['8112189876', '811218-9875', '121212-1212'])
+        self.assertEqual(matches, {'8112189876': self.employee.id})
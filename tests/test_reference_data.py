@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('post_install', '-at_install')
+class TestReferenceData(TransactionCase):
+
+    def test_load_snapshot(self):
+        municipality = self.env.ref('l10n_se_hr.municipality_0114')
+        self.assertEqual(municipality.code, '0114')
+        self.assertEqual(municipality.region_id, self.env.ref('l10n_se_hr.region_01'))
+
+        Updater = self.env['municipality.updater']
+        # Loaded at install, existing xmlids are left untouched
+        self.assertEqual(Updater._load_reference_data(), 0)
+
+        municipality.unlink()
+        self.assertEqual(Updater._load_reference_data(), 1)
+        municipality = self.env.ref('l10n_se_hr.municipality_0114')
+        self.assertEqual(municipality.name, 'Upplands Väsby')
+        self.assertEqual(municipality.tax_table_number, '32')
+        self.assertEqual(municipality.region_id, self.env.ref('l10n_se_hr.region_01'))
+
+    def test_lookups_follow_changes(self):
+        ReferenceData = self.env['municipality.reference.data']
+        self.assertTrue(ReferenceData.is_data_loaded())
+        region = ReferenceData.region_by_code('01')
+        self.assertEqual(region, self.env.ref('l10n_se_hr.region_01'))
+        self.assertEqual(ReferenceData.municipality_by_code('0114'), self.env.ref('l10n_se_hr.municipality_0114'))
+        self.assertFalse(ReferenceData.municipality_by_code('9901'))
+
+        municipality = self.env['res.municipality'].create({
+            'name': 'Testby',
+            'code': '9901',
+            'region_id': region.id,
+            'tax_table_number': '30',
+        })
+        self.assertEqual(ReferenceData.municipality_by_code('9901'), municipality)
+        municipality.code = '9902'
+        self.assertFalse(ReferenceData.municipality_by_code('9901'))
+        self.assertEqual(ReferenceData.municipality_by_code('9902'), municipality)
+
+    def test_rate_lookups_follow_changes(self):
+        municipality = self.env.ref('l10n_se_hr.municipality_0114')
+        parish = self.env['res.parish'].create({'name': 'Testby församling', 'municipality_id': municipality.id})
+        rate = self.env['res.municipality.tax.rate'].create({
+            'municipality_id': municipality.id, 'year': 2030, 'total_tax_rate': 32.0, 'church_tax_rate': 1.0,
+        })
+        church_rate = self.env['res.parish.church.rate'].create({
+            'parish_id': parish.id, 'year': 2030, 'church_tax_rate': 1.1,
+        })
+        on_date = date(2030, 6, 1)
+        self.assertEqual(municipality.rate_at(on_date), (32.0, 1.0))
+        self.assertEqual(parish.church_rate_at(on_date), 1.1)
+
+        rate.total_tax_rate = 33.0
+        church_rate.church_tax_rate = 1.2
+        self.assertEqual(municipality.rate_at(on_date), (33.0, 1.0))
+        self.assertEqual(parish.church_rate_at(on_date), 1.2)
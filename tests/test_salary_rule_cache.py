@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+
+from .common import SwedishHrCase
+
+
+@tagged('post_install', '-at_install')
+class TestSalaryRuleCache(SwedishHrCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.rule = cls.env.ref('l10n_se_hr.hr_salary_rule_se_basic')
+
+    def _compute(self):
+        return self.rule._compute_rule({'contract': self.contract, 'employee': self.employee})
+
+    def test_code_compiled_once(self):
+        Rule = self.env['hr.salary.rule']
+        self.assertEqual(self._compute(), (16800.0, 1.0, 100.0))
+        stats = Rule.get_compiled_code_stats()
+        self.assertEqual(self._compute(), (16800.0, 1.0, 100.0))
+        self.assertEqual(self._compute(), (16800.0, 1.0, 100.0))
+        after = Rule.get_compiled_code_stats()
+        self.assertEqual(after['misses'], stats['misses'])
+        self.assertEqual(after['hits'], stats['hits'] + 2)
+
+    def test_edited_code_recompiled(self):
+        self._compute()
+        # Same transaction, so the same write_date as before the edit
+        self.rule.amount_python_compute = 'result = contract.wage / 2'
+        self.assertEqual(self._compute(), (8400.0, 1.0, 100.0))
+
+    def test_unsafe_code_refused(self):
+        self.rule.amount_python_compute = "result = __import__('os').getpid()"
+        with self.assertRaises(UserError):
+            self._compute()
+        self.rule.amount_python_compute = 'result = contract.'
+        with self.assertRaises(UserError):
+            self._compute()
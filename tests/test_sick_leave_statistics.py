@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from datetime import date, timedelta
+
+from odoo.tests import tagged
+
+from .common import SwedishHrCase
+
+
+@tagged('post_install', '-at_install')
+class TestSickLeaveStatistics(SwedishHrCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.sick_type = cls.env.ref('l10n_se_hr.holiday_status_swedish_sick_leave')
+
+    def test_sick_leave_statistics(self):
+        today = date.today()
+        self._create_leave(self.sick_type, today - timedelta(days=30), today - timedelta(days=29), 2)
+        leave = self._create_leave(self.sick_type, today - timedelta(days=10), today - timedelta(days=8), 3)
+        # Outside the rolling 12 months
+        self._create_leave(self.sick_type, today - timedelta(days=400), today - timedelta(days=399), 2)
+        self.assertEqual(self.employee.sick_leave_counter, 2)
+        self.assertEqual(self.employee.sick_leave_days, 5)
+        self.assertFalse(self.employee.frequently_ill)
+
+        leave.action_refuse()
+        self.assertEqual(self.employee.sick_leave_counter, 1)
+        self.assertEqual(self.employee.sick_leave_days, 2)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+
+from odoo.tests import tagged
+
+from .common import SwedishHrCase
+
+
+@tagged('post_install', '-at_install')
+class TestTaxBatch(SwedishHrCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        structure_type = cls.env['hr.payroll.structure.type'].create({'name': 'Swedish Test'})
+        cls.structure = cls.env['hr.payroll.structure'].create({'name': 'Swedish Test', 'type_id': structure_type.id})
+        cls.rules = {rule.code: rule for rule in cls.structure.rule_ids}
+        cls.rules['TAX'] = cls.env['hr.salary.rule'].create({
+            'name': 'Tax',
+            'code': 'TAX',
+            'sequence': 150,
+            'struct_id': cls.structure.id,
+            'category_id': cls.env.ref('hr_payroll.DED').id,
+        })
+
+    def _create_slip(self, gross):
+        slip = self.env['hr.payslip'].create({
+            'name': 'March 2030',
+            'employee_id': self.employee.id,
+            'contract_id': self.contract.id,
+            'struct_id': self.structure.id,
+            'date_from': date(2030, 3, 1),
+            'date_to': date(2030, 3, 31),
+        })
+        amounts = {'BASIC': gross, 'GROSS': gross, 'TAX': 0.0, 'NET': gross}
+        slip.write({'line_ids': [(0, 0, {
+            'name': rule.name,
+            'code': code,
+            'sequence': rule.sequence,
+            'salary_rule_id': rule.id,
+            'contract_id': self.contract.id,
+            'employee_id': self.employee.id,
+            'amount': amounts[code],
+            'quantity': 1.0,
+            'rate': 100.0,
+        }) for code, rule in self.rules.items()]})
+        return slip
+
+    def _line(self, slip, code):
+        return slip.line_ids.filtered(lambda line: line.code == code)
+
+    def test_default_rates_without_municipality(self):
+        # Same 30% as the SETAX rule, and 1% church tax for members
+        slip = self._create_slip(20000.0)
+        slip._compute_tax_batch()
+        self.assertAlmostEqual(self._line(slip, 'TAX').total, 6000.0)
+        self.assertAlmostEqual(self._line(slip, 'NET').total, 14000.0)
+
+        self.employee.church_member = True
+        slip.invalidate_recordset(['church_tax_applied'])
+        slip._compute_tax_batch()
+        self.assertAlmostEqual(self._line(slip, 'TAX').total, 6200.0)
+
+    def test_net_wage_recomputed(self):
+        slip = self._create_slip(20000.0)
+        self.assertAlmostEqual(slip.net_wage, 20000.0)
+        slip._compute_tax_batch()
+        self.assertAlmostEqual(slip.net_wage, 14000.0)
+        self.assertAlmostEqual(slip.gross_wage, 20000.0)
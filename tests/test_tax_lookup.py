@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('post_install', '-at_install')
+class TestTaxLookup(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.TaxTable = cls.env['hr.swedish.tax.table']
+        table = cls.TaxTable.create({
+            'name': 'Tabell 32 (2030)',
+            'table_number': '32',
+            'year': 2030,
+            'table_type': 'table_29',
+        })
+        column = cls.env['hr.swedish.tax.table.column'].create({
+            'name': 'Kolumn 1',
+            'column_number': 1,
+            'table_id': table.id,
+        })
+        cls.brackets = cls.env['hr.swedish.tax.bracket'].create([
+            {'column_id': column.id, 'lower_limit': 0, 'upper_limit': 1999, 'tax_amount': 0},
+            {'column_id': column.id, 'lower_limit': 2000, 'upper_limit': 2999, 'tax_amount': 150},
+            # Top brackets are a percentage of the income
+            {'column_id': column.id, 'lower_limit': 3000, 'upper_limit': 1e12, 'tax_amount': 30, 'is_percentage': True},
+        ])
+
+    def test_lookup_amount(self):
+        self.assertEqual(self.TaxTable.lookup(2030, '32', 1, 1000), 0)
+        self.assertEqual(self.TaxTable.lookup(2030, '32', 1, 2500), 150)
+        # Limits are inclusive, the column may be given as hr.payslip.tax_column
+        self.assertEqual(self.TaxTable.lookup(2030, 32, 'column_1', 2000), 150)
+        self.assertEqual(self.TaxTable.lookup(2030, '32', 1, 2999), 150)
+
+    def test_lookup_percentage(self):
+        self.assertEqual(self.TaxTable.lookup(2030, '32', 1, 5000), 1500)
+
+    def test_lookup_no_bracket(self):
+        # Between two brackets
+        self.assertIsNone(self.TaxTable.lookup(2030, '32', 1, 2999.5))
+        self.assertIsNone(self.TaxTable.lookup(2030, '32', 2, 2500))
+        self.assertIsNone(self.TaxTable.lookup(2031, '32', 1, 2500))
+        self.assertIsNone(self.TaxTable.lookup(2030, '33', 1, 2500))
+        self.assertIsNone(self.TaxTable.lookup(2030, '32', 1, 2500, table_type='table_30'))
+
+    def test_lookup_follows_edits(self):
+        self.assertEqual(self.TaxTable.lookup(2030, '32', 1, 2500), 150)
+        self.brackets[1].tax_amount = 175
+        self.assertEqual(self.TaxTable.lookup(2030, '32', 1, 2500), 175)
+        self.brackets[1].unlink()
+        self.assertIsNone(self.TaxTable.lookup(2030, '32', 1, 2500))
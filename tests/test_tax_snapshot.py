@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('post_install', '-at_install')
+class TestTaxSnapshot(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.TaxTable = cls.env['hr.swedish.tax.table']
+        cls.TaxTable._load_tax_table_rows([
+            (2030, '32', 'table_29', False, 0.0, 1999.0, [0.0, 0.0, None, None, None, None]),
+            (2030, '32', 'table_29', False, 2000.0, 2999.0, [150.0, 100.0, None, None, None, None]),
+        ])
+        cls.table = cls.TaxTable.search([('year', '=', 2030), ('table_number', '=', '32')])
+
+    def setUp(self):
+        super().setUp()
+        self.version = self.TaxTable._export_tax_snapshot()
+
+    def _get_version(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param('l10n_se_hr.tax_snapshot_version'))
+
+    def test_lookup_from_snapshot(self):
+        snapshot = self.TaxTable._get_tax_snapshot()
+        self.assertEqual(snapshot.version, self.version)
+        lowers, uppers, amounts, percentages = snapshot.get(2030, '32', 'table_29', 2)
+        self.assertEqual(list(lowers), [0.0, 2000.0])
+        self.assertEqual(list(amounts), [0.0, 100.0])
+        self.assertIsNone(snapshot.get(2030, '32', 'table_29', 3))
+        self.assertEqual(self.TaxTable.lookup(2030, '32', 2, 2500), 100.0)
+
+    def test_edit_rebuilds_snapshot(self):
+        bracket = self.table.column_ids.filtered(lambda column: column.column_number == 1).bracket_ids[-1]
+        bracket.tax_amount = 175.0
+        # The transaction reads its own change from the database until commit
+        self.assertIsNone(self.TaxTable._get_tax_snapshot())
+        self.assertEqual(self.TaxTable.lookup(2030, '32', 1, 2500), 175.0)
+        self.assertEqual(self._get_version(), self.version)
+
+        # What the precommit hook does: a new version instead of no snapshot
+        self.TaxTable._export_stale_tax_snapshot()
+        self.assertGreater(self._get_version(), self.version)
+        snapshot = self.TaxTable._get_tax_snapshot()
+        self.assertEqual(snapshot.version, self._get_version())
+        self.assertEqual(list(snapshot.get(2030, '32', 'table_29', 1)[2]), [0.0, 175.0])
+
+    def test_rename_keeps_snapshot(self):
+        self.table.name = 'Tabell 32 (2030), renamed'
+        self.table.column_ids[0].name = 'Column 1'
+        self.assertEqual(self.TaxTable._get_tax_snapshot().version, self.version)
+        self.assertEqual(self._get_version(), self.version)
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+import io
+from unittest.mock import patch
+
+import requests
+
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+TAX_TABLE_CSV = """År;Antal dgr;Tabellnr;Inkomst fr.o.m.;Inkomst t.o.m.;Kolumn 1;Kolumn 2;Kolumn 3;Kolumn 4;Kolumn 5;Kolumn 6
+2030;30B;32;1;200;0;0;0;0;0;0
+2030;30B;32;201;400;25;20;25;25;15;30
+2030;30%;32;400001;;52;48;50;51;49;54
+"""
+
+
+@tagged('post_install', '-at_install')
+class TestTaxTableImport(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+        self.TaxTable = self.env['hr.swedish.tax.table']
+
+    def _rows(self, table_number, amounts_by_column, year=2030):
+        """Three brackets of 100 kr, with the given column 1-6 amounts at the first one"""
+        return [
+            (year, table_number, 'table_29', False, 100.0 * step, 100.0 * step + 99,
+             [None if amount is None else amount + 10 * step for amount in amounts_by_column])
+            for step in range(3)
+        ]
+
+    def _column(self, table_number, column_number, year=2030):
+        return self.env['hr.swedish.tax.table.column'].search([
+            ('table_id.table_number', '=', table_number),
+            ('table_id.year', '=', year),
+            ('column_number', '=', column_number),
+        ])
+
+    def test_import_and_unchanged_reimport(self):
+        rows = self._rows('32', [10, 5, None, None, None, None])
+        stats = self.TaxTable._load_tax_table_rows(rows)
+        self.assertEqual(stats['brackets_added'], 6)
+        self.assertEqual(stats['columns_changed'], 2)
+        column = self._column('32', 1)
+        self.assertEqual(column.bracket_ids.mapped('tax_amount'), [10, 20, 30])
+        self.assertTrue(column.checksum)
+
+        stats = self.TaxTable._load_tax_table_rows(rows)
+        self.assertEqual(stats['columns_unchanged'], 2)
+        self.assertEqual(stats['columns_changed'], 0)
+        self.assertEqual(stats['brackets_added'] + stats['brackets_removed'] + stats['brackets_changed'], 0)
+
+    def test_rows_need_not_be_grouped(self):
+        first = self._rows('32', [10, None, None, None, None, None])
+        second = self._rows('33', [20, None, None, None, None, None])
+        interleaved = [row for pair in zip(first, second) for row in pair]
+        stats = self.TaxTable._load_tax_table_rows(interleaved)
+        self.assertEqual(stats['brackets_added'], 6)
+        self.assertEqual(len(self._column('32', 1).bracket_ids), 3)
+        self.assertEqual(len(self._column('33', 1).bracket_ids), 3)
+
+    def test_parse_csv(self):
+        rows = list(self.TaxTable._parse_tax_table_lines(TAX_TABLE_CSV.splitlines()))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1], (2030, '32', 'table_29', False, 201.0, 400.0, [25.0, 20.0, 25.0, 25.0, 15.0, 30.0]))
+        # Open-ended top bracket in percent
+        self.assertEqual(rows[2][3:6], (True, 400001.0, 1e12))
+
+    def test_year_required_without_year_column(self):
+        lines = [line.split(';', 1)[1] for line in TAX_TABLE_CSV.splitlines()]
+        with self.assertRaises(UserError):
+            list(self.TaxTable._parse_tax_table_lines(lines))
+        rows = list(self.TaxTable._parse_tax_table_lines(lines, year=2031))
+        self.assertEqual({row[0] for row in rows}, {2031})
+
+    def test_download_with_byte_order_mark(self):
+        response = requests.models.Response()
+        response.status_code = 200
+        response.raw = io.BytesIO(('\ufeff' + TAX_TABLE_CSV).encode('utf-8'))
+        with patch.object(requests, 'get', return_value=response):
+            with self.TaxTable._open_tax_table_source('https://example.com/skattetabeller.csv') as lines:
+                rows = list(self.TaxTable._parse_tax_table_lines(lines))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0][:3], (2030, '32', 'table_29'))
+
+    def test_changed_bracket(self):
+        self.TaxTable._load_tax_table_rows(self._rows('32', [10, None, None, None, None, None]))
+        rows = self._rows('32', [10, None, None, None, None, None])
+        rows[1][6][0] = 25
+        stats = self.TaxTable._load_tax_table_rows(rows)
+        self.assertEqual(stats['brackets_changed'], 1)
+        self.assertEqual(self._column('32', 1).bracket_ids.mapped('tax_amount'), [10, 25, 30])
+
+    def test_changed_upper_limit(self):
+        self.TaxTable._load_tax_table_rows(self._rows('32', [10, None, None, None, None, None]))
+        rows = self._rows('32', [10, None, None, None, None, None])
+        rows[2] = rows[2][:5] + (350.0,) + rows[2][6:]
+        stats = self.TaxTable._load_tax_table_rows(rows)
+        self.assertEqual(stats['brackets_added'], 1)
+        self.assertEqual(stats['brackets_removed'], 1)
+        self.assertEqual(self._column('32', 1).bracket_ids.mapped('upper_limit'), [99, 199, 350])
+
+    def test_duplicate_lower_limit_removed(self):
+        rows = self._rows('32', [10, None, None, None, None, None])
+        self.TaxTable._load_tax_table_rows(rows)
+        column = self._column('32', 1)
+        self.env['hr.swedish.tax.bracket'].create({
+            'column_id': column.id, 'lower_limit': 200, 'upper_limit': 250, 'tax_amount': 30,
+        })
+        self.assertEqual(len(column.bracket_ids), 4)
+
+        stats = self.TaxTable._load_tax_table_rows(rows)
+        self.assertEqual(stats['brackets_removed'], 1)
+        self.assertEqual(stats['brackets_changed'] + stats['brackets_added'], 0)
+        column.invalidate_recordset(['bracket_ids'])
+        self.assertEqual(column.bracket_ids.mapped('upper_limit'), [99, 199, 299])
+
+    def test_dropped_column_is_cleared(self):
+        self.TaxTable._load_tax_table_rows(self._rows('32', [10, 5, None, None, None, None]))
+        stats = self.TaxTable._load_tax_table_rows(self._rows('32', [10, None, None, None, None, None]))
+        self.assertEqual(stats['brackets_removed'], 3)
+        column = self._column('32', 2)
+        self.assertFalse(column.bracket_ids)
+        self.assertFalse(column.checksum)
+
+    def test_manual_edit_resets_checksum(self):
+        rows = self._rows('32', [10, None, None, None, None, None])
+        self.TaxTable._load_tax_table_rows(rows)
+        column = self._column('32', 1)
+        column.bracket_ids.filtered(lambda bracket: bracket.lower_limit == 100).tax_amount = 99
+        self.assertFalse(column.checksum)
+
+        # The next import restores the file's amount instead of skipping the column
+        stats = self.TaxTable._load_tax_table_rows(rows)
+        self.assertEqual(stats['columns_changed'], 1)
+        self.assertEqual(stats['brackets_changed'], 1)
+        self.assertEqual(column.bracket_ids.mapped('tax_amount'), [10, 20, 30])
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from datetime import date, timedelta
+
+from odoo.tests import tagged
+
+from .common import SwedishHrCase
+
+
+@tagged('post_install', '-at_install')
+class TestVacationBalance(SwedishHrCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.vacation_type = cls.env.ref('l10n_se_hr.holiday_status_swedish_vacation')
+
+    def test_vacation_balance(self):
+        Balance = self.env['hr.swedish.vacation.balance']
+        vacation_year = Balance._current_vacation_year()
+        year_start = date(int(vacation_year[:4]), 4, 1)
+        for days, saved in ((25, False), (5, True)):
+            self.env['hr.leave.allocation'].create({
+                'name': 'Semester %s' % vacation_year,
+                'employee_id': self.employee.id,
+                'holiday_status_id': self.vacation_type.id,
+                'number_of_days': days,
+                'date_from': year_start,
+                'swedish_saved_days': saved,
+            }).action_validate()
+
+        balance = Balance.search([('employee_id', '=', self.employee.id), ('vacation_year', '=', vacation_year)])
+        self.assertEqual(balance.entitled_days, 25)
+        self.assertEqual(balance.saved_days, 5)
+        self.assertEqual(balance.remaining_days, 30)
+
+        leave = self._create_leave(self.vacation_type, year_start + timedelta(days=90), year_start + timedelta(days=94), 5)
+        self.assertEqual(balance.used_days, 5)
+        self.assertEqual(balance.remaining_days, 25)
+        # Read from the balances, not recomputed by the ORM when they change
+        self.employee.invalidate_recordset(['remaining_swedish_vacation_days'])
+        self.assertEqual(self.employee.remaining_swedish_vacation_days, 25)
+        self.assertIn(self.employee, self.env['hr.employee'].search([('remaining_swedish_vacation_days', '=', 25)]))
+
+        leave.action_refuse()
+        self.assertEqual(balance.used_days, 0)
+        self.assertEqual(balance.remaining_days, 30)